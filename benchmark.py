@@ -0,0 +1,440 @@
+"""Micro-benchmarks for the dungeon code in main.py.
+
+Usage:
+    python benchmark.py astar [--sizes 51 101 201 501] [--queries 20] [--seed 0]
+    python benchmark.py hpa [--sizes 51 101 201 501] [--queries 20] [--seed 0]
+    python benchmark.py repair [--sizes 51 101 201] [--queries 20] [--seed 0]
+    python benchmark.py entities [--count 10000] [--frames 50]
+    python benchmark.py torches [--sizes 51 201 501] [--seed 0] [--legacy-max 201]
+    python benchmark.py generation [--sizes 51 101 201 501] [--levels 5] [--seed 0]
+    python benchmark.py levels [--sizes 51 101] [--levels 3] [--seed 0]
+"""
+import argparse
+import contextlib
+import heapq
+import io
+import math
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import main
+
+
+def legacy_astar(grid, start, goal):
+    """The original astar, which copies the whole path into every heap entry (kept for comparison)."""
+    width, height = len(grid[0]), len(grid)
+    def neighbors(pos):
+        x, z = pos
+        for dx, dz in [(-1,0),(1,0),(0,-1),(0,1)]:
+            nx, nz = x+dx, z+dz
+            if 0 <= nx < width and 0 <= nz < height and grid[nz][nx] == 0:
+                yield (nx, nz)
+    def heuristic(a, b):
+        return abs(a[0]-b[0]) + abs(a[1]-b[1])
+    open_set = []
+    heapq.heappush(open_set, (0 + heuristic(start, goal), 0, start, [start]))
+    visited = set()
+    while open_set:
+        est_total, cost, current, path = heapq.heappop(open_set)
+        if current == goal:
+            return path
+        if current in visited:
+            continue
+        visited.add(current)
+        for neighbor in neighbors(current):
+            if neighbor not in visited:
+                heapq.heappush(open_set, (cost+1+heuristic(neighbor, goal), cost+1, neighbor, path+[neighbor]))
+    return []
+
+
+def make_maze(size, seed):
+    """Tile-flag grid of the rooms, maze and doors from DungeonGenerator, without the slow decoration steps"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return main.build_tile_grid(main.DungeonGenerator(size, size, seed=seed).carve_layout())
+
+
+def walkable_tiles(grid):
+    tile_z, tile_x = ((grid & main.TILE_WALL) == 0).nonzero()
+    return list(zip(tile_x.tolist(), tile_z.tolist()))
+
+
+def time_queries(search, grid, queries):
+    """Total seconds and resulting paths for a list of (start, goal) queries"""
+    paths = []
+    start_time = time.perf_counter()
+    for start, goal in queries:
+        paths.append(search(grid, start, goal))
+    return time.perf_counter() - start_time, paths
+
+
+def bench_astar(args):
+    print(f"{'size':>6} {'queries':>8} {'avg len':>8} {'legacy ms':>10} {'astar ms':>9} {'speedup':>8}")
+    for size in args.sizes:
+        grid = make_maze(size, args.seed)
+        tiles = walkable_tiles(grid)
+        rng = random.Random(args.seed)
+        queries = [(rng.choice(tiles), rng.choice(tiles)) for _ in range(args.queries)]
+        # The legacy search reads nested rows of 0 (floor) and 1 (wall)
+        legacy_time, legacy_paths = time_queries(legacy_astar, (grid & main.TILE_WALL).tolist(), queries)
+        # The game builds the wall mask once per grid (HierarchicalPathfinder.blocked), not per query
+        blocked = ((grid & main.TILE_WALL) != 0).tobytes()
+        new_time, new_paths = time_queries(lambda grid, start, goal: main.astar(grid, start, goal, blocked), grid, queries)
+        # Both are optimal, so only the lengths have to agree (ties may pick different routes)
+        for (start, goal), old, new in zip(queries, legacy_paths, new_paths):
+            if len(old) != len(new):
+                raise AssertionError(f"path length mismatch for {start}->{goal}: {len(old)} vs {len(new)}")
+        avg_len = sum(len(path) for path in new_paths) / len(new_paths)
+        print(f"{size:>6} {len(queries):>8} {avg_len:>8.0f} {legacy_time / len(queries) * 1000:>10.2f} "
+              f"{new_time / len(queries) * 1000:>9.2f} {legacy_time / new_time:>7.1f}x")
+
+
+def bench_hpa(args):
+    print(f"{'size':>6} {'entrances':>10} {'build s':>8} {'astar ms':>9} {'hpa ms':>7} {'speedup':>8} {'len ratio':>10}")
+    for size in args.sizes:
+        grid = make_maze(size, args.seed)
+        start_time = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            pathfinder = main.HierarchicalPathfinder(grid)
+        build_time = time.perf_counter() - start_time
+        tiles = walkable_tiles(grid)
+        rng = random.Random(args.seed)
+        queries = [(rng.choice(tiles), rng.choice(tiles)) for _ in range(args.queries)]
+        # Flat astar gets the prebuilt wall mask too, as the game would pass it
+        astar_time, astar_paths = time_queries(lambda grid, start, goal: main.astar(grid, start, goal, pathfinder.blocked), grid, queries)
+        hpa_time, hpa_paths = time_queries(lambda grid, start, goal: pathfinder.find_path(start, goal), grid, queries)
+        # HPA* paths are near-optimal: check they connect and report how much longer they are
+        ratios = []
+        for (start, goal), best, path in zip(queries, astar_paths, hpa_paths):
+            if bool(best) != bool(path) or (path and (path[0] != start or path[-1] != goal)):
+                raise AssertionError(f"hpa path mismatch for {start}->{goal}")
+            if best:
+                ratios.append(len(path) / len(best))
+        print(f"{size:>6} {len(pathfinder.node_tiles):>10} {build_time:>8.2f} {astar_time / len(queries) * 1000:>9.2f} "
+              f"{hpa_time / len(queries) * 1000:>7.2f} {astar_time / hpa_time:>7.1f}x {sum(ratios) / len(ratios):>10.3f}")
+
+
+def check_path(grid, path, start, goal):
+    """Raise unless path walks from start to goal in single steps over walkable tiles"""
+    if path[0] != start or path[-1] != goal:
+        raise AssertionError(f"path for {start}->{goal} runs {path[0]}->{path[-1]}")
+    for (x0, z0), (x1, z1) in zip(path, path[1:]):
+        if abs(x1 - x0) + abs(z1 - z0) != 1 or grid[z1, x1] & main.TILE_WALL:
+            raise AssertionError(f"path for {start}->{goal} breaks at {(x0, z0)}->{(x1, z1)}")
+
+
+def graph_signature(pathfinder):
+    """Entrance tiles, edges and per-chunk entrances of an HPA* graph, independent of node numbering"""
+    tiles = pathfinder.node_tiles
+    edges = {(tiles[node], tiles[other], cost) for node in pathfinder.node_ids.values() for other, cost in pathfinder.edges[node]}
+    chunks = {chunk: sorted(tiles[node] for node in nodes) for chunk, nodes in pathfinder.chunk_nodes.items() if nodes}
+    return set(pathfinder.node_ids), edges, chunks
+
+
+def bench_repair(args):
+    """Patched paths and HPA* graphs after a wall edit vs. searching and building from scratch"""
+    print(f"{'size':>6} {'queries':>8} {'splice ms':>10} {'astar ms':>9} {'len ratio':>10} {'gave up':>8} "
+          f"{'repair ms':>10} {'astar ms':>9} {'len ratio':>10} {'update ms':>10} {'rebuild ms':>11}")
+    for size in args.sizes:
+        grid = make_maze(size, args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            pathfinder = main.HierarchicalPathfinder(grid)
+        tiles = walkable_tiles(grid)
+        rng = random.Random(args.seed)
+        timings = dict.fromkeys(("splice", "splice_astar", "repair", "repair_astar", "update", "rebuild"), 0.0)
+        splice_ratios, repair_ratios = [], []
+        gave_up = queries = 0
+        while queries < args.queries:
+            start, goal = rng.choice(tiles), rng.choice(tiles)
+            path = main.astar(grid, start, goal, pathfinder.blocked)
+            if len(path) < 8:
+                continue
+            queries += 1
+
+            # A wall drops onto the middle of the path: splice a detour vs. search again
+            x, z = path[len(path) // 2]
+            tile_flags = grid[z, x]
+            grid[z, x] = main.TILE_WALL
+            start_time = time.perf_counter()
+            pathfinder.update_tiles([(x, z)])
+            timings["update"] += time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                fresh = main.HierarchicalPathfinder(grid)
+            timings["rebuild"] += time.perf_counter() - start_time
+            # The patched graph has to be the graph a full build gives
+            if graph_signature(pathfinder) != graph_signature(fresh):
+                raise AssertionError(f"hpa graph mismatch after walling {(x, z)} at size {size}")
+            search = lambda grid, start, goal: main.astar(grid, start, goal, pathfinder.blocked)
+            start_time = time.perf_counter()
+            spliced = main.PathCache().revalidate(grid, path, search)
+            timings["splice"] += time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            best = search(grid, start, goal)
+            timings["splice_astar"] += time.perf_counter() - start_time
+            if spliced:
+                check_path(grid, spliced, start, goal)
+                splice_ratios.append(len(spliced) / len(best))
+            elif best:
+                gave_up += 1  # The splice points got cut off although another route exists
+            grid[z, x] = tile_flags
+            pathfinder.update_tiles([(x, z)])
+            with contextlib.redirect_stdout(io.StringIO()):
+                if graph_signature(pathfinder) != graph_signature(main.HierarchicalPathfinder(grid)):
+                    raise AssertionError(f"hpa graph mismatch after reopening {(x, z)} at size {size}")
+
+            # The NPC took a step and the target stepped aside: repair the path vs. search again
+            moved_start = path[1]
+            steps = [(goal[0] + dx, goal[1] + dz) for dx, dz in ((-1, 0), (1, 0), (0, -1), (0, 1))]
+            steps = [tile for tile in steps if not grid[tile[1], tile[0]] & main.TILE_WALL and tile not in path]
+            moved_goal = rng.choice(steps) if steps else goal
+            start_time = time.perf_counter()
+            repaired = main.PathCache().repair(grid, path, moved_start, moved_goal)
+            timings["repair"] += time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            best = search(grid, moved_start, moved_goal)
+            timings["repair_astar"] += time.perf_counter() - start_time
+            check_path(grid, repaired, moved_start, moved_goal)
+            repair_ratios.append(len(repaired) / len(best))
+        average = {key: value / queries * 1000 for key, value in timings.items()}
+        splice_ratio = f"{sum(splice_ratios) / len(splice_ratios):>10.3f}" if splice_ratios else f"{'-':>10}"
+        print(f"{size:>6} {queries:>8} {average['splice']:>10.3f} {average['splice_astar']:>9.3f} {splice_ratio} {gave_up:>8} "
+              f"{average['repair']:>10.3f} {average['repair_astar']:>9.3f} {sum(repair_ratios) / len(repair_ratios):>10.3f} "
+              f"{average['update']:>10.2f} {average['rebuild']:>11.2f}")
+
+
+def dict_backed(cls):
+    """Copy of a slotted class without __slots__, so instances keep their attributes in a __dict__"""
+    skip = set(cls.__slots__) | {"__slots__", "__dict__", "__weakref__"}
+    # Slot-less bases (NPCBehavior) carry the methods and add no storage, so the copy keeps them
+    return type(cls.__name__ + "Dict", cls.__bases__, {key: value for key, value in vars(cls).items() if key not in skip})
+
+
+def entity_factories():
+    """(name, make(cls, i)) for each entity class the game creates in bulk"""
+    return [
+        ("NPC", main.NPC, lambda cls, i: cls(i, i, i + 0.5, i + 0.5, npc_type="ghoul")),
+        ("DroppedItem", main.DroppedItem, lambda cls, i: cls("health_potion", i + 0.5, i + 0.5)),
+        ("Trapdoor", main.Trapdoor, lambda cls, i: cls(i, i)),
+    ]
+
+
+def bytes_per_instance(make, cls, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [make(cls, i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Leave out the list holding them
+    return (after - before - sys.getsizeof(instances)) / len(instances)
+
+
+def npc_tick(npcs):
+    """The per-NPC attribute traffic of the scalar update_skeletons loop"""
+    for npc in npcs:
+        if npc.is_alive:
+            if npc.flash_timer > 0:
+                npc.flash_timer -= 1
+            if npc.ranged_attack_cooldown > 0:
+                npc.ranged_attack_cooldown -= 1
+            dx = 25.0 - npc.center_x
+            dz = 25.0 - npc.center_z
+            if npc.attack_cooldown > 0:
+                npc.attack_cooldown -= 1
+            if npc.frozen_timer > 0:
+                npc.frozen_timer -= 1
+            npc.center_x += dx * 1e-6
+            npc.center_z += dz * 1e-6
+
+
+def magic_probe(projectiles):
+    """Reading is_magic row by row from the pool next to one mask over the column, as the collision pass does"""
+    count = projectiles.count
+    start_time = time.perf_counter()
+    per_row = sum(1 for row in range(count) if projectiles.is_magic[row])
+    row_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    column = int(np.count_nonzero(projectiles.is_magic[:count]))
+    column_time = time.perf_counter() - start_time
+    assert per_row == column
+    return row_time, column_time
+
+
+def bench_entities(args):
+    print(f"{'class':>12} {'dict B':>8} {'slots B':>8} {'saved':>6}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, cls, make in entity_factories():
+            legacy = bytes_per_instance(make, dict_backed(cls), args.count)
+            slotted = bytes_per_instance(make, cls, args.count)
+            print(f"{name:>12} {legacy:>8.0f} {slotted:>8.0f} {1 - slotted / legacy:>5.0%}", file=sys.__stdout__)
+    print()
+    print(f"{'hot loop':>22} {'dict ns':>8} {'slots ns':>9} {'speedup':>8}")
+    timings = []
+    for cls in (dict_backed(main.NPC), main.NPC):
+        npcs = [cls(i, i, i + 0.5, i + 0.5, npc_type="ghoul") for i in range(args.count)]
+        for i, npc in enumerate(npcs):
+            npc.flash_timer = npc.attack_cooldown = npc.frozen_timer = i % 3
+        start_time = time.perf_counter()
+        for _ in range(args.frames):
+            npc_tick(npcs)
+        timings.append((time.perf_counter() - start_time) / (args.frames * args.count) * 1e9)
+    print(f"{'update_skeletons/NPC':>22} {timings[0]:>8.1f} {timings[1]:>9.1f} {timings[0] / timings[1]:>7.2f}x")
+    projectiles = main.ProjectilePool(capacity=args.count)
+    for i in range(args.count):
+        projectiles.spawn(i + 0.5, i + 0.5, 1.0, 0.0, is_magic=i % 2 == 0)
+    row_time, column_time = magic_probe(projectiles)
+    print(f"{'is_magic probe':>22} {row_time / args.count * 1e9:>8.1f} {column_time / args.count * 1e9:>9.1f} "
+          f"{row_time / column_time:>7.2f}x  (per-row read vs. column mask)")
+
+
+def legacy_place_torches(grid, rng):
+    """The original face scan and torch spacing check against every placed torch (kept for comparison)"""
+    wall_positions = []
+    for z in range(len(grid)):
+        for x in range(len(grid[0])):
+            if grid[z][x] == 1:
+                for dx, dz in [(-1,0), (1,0), (0,-1), (0,1)]:
+                    nx, nz = x + dx, z + dz
+                    if 0 <= nx < len(grid[0]) and 0 <= nz < len(grid) and grid[nz][nx] == 0:
+                        wall_positions.append((x, z, dx, dz, x + 0.5 + dx * 0.55, z + 0.5 + dz * 0.55))
+    placed_torches = []
+    for x, z, dx, dz, face_x, face_z in wall_positions:
+        too_close = False
+        for torch_x, torch_z, _, _, _, _ in placed_torches:
+            if math.sqrt((x - torch_x)**2 + (z - torch_z)**2) < 3.0:
+                too_close = True
+                break
+        if not too_close and rng.random() < 0.6:
+            placed_torches.append((x, z, dx, dz, face_x, face_z))
+    return placed_torches
+
+
+def place_torches(generator):
+    return generator.place_torches(generator.find_torch_faces())
+
+
+def bench_torches(args):
+    print(f"{'size':>6} {'torches':>8} {'legacy ms':>10} {'placed ms':>10} {'speedup':>8} {'generate ms':>12}")
+    for size in args.sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator = main.DungeonGenerator(size, size, seed=args.seed)
+            generator.carve_layout()
+            # The legacy scan is quadratic in torches, so it only runs on the smaller maps
+            runs = [lambda: legacy_place_torches(generator.grid, generator.rng)] if size <= args.legacy_max else []
+            runs.append(lambda: place_torches(generator))
+            timings, results = [], []
+            for place in runs:
+                # Same random stream for both, so they have to place the very same torches
+                state = generator.rng.getstate()
+                start_time = time.perf_counter()
+                results.append(place())
+                timings.append(time.perf_counter() - start_time)
+                generator.rng.setstate(state)
+            if results[0] != results[-1]:
+                raise AssertionError(f"torch placement mismatch at size {size}")
+            start_time = time.perf_counter()
+            main.DungeonGenerator(size, size, seed=args.seed).generate_dungeon()
+            generate_time = time.perf_counter() - start_time
+        legacy = f"{timings[0] * 1000:>10.1f}" if len(timings) == 2 else f"{'-':>10}"
+        speedup = f"{timings[0] / timings[1]:>7.1f}x" if len(timings) == 2 else f"{'-':>8}"
+        print(f"{size:>6} {len(results[-1]):>8} {legacy} {timings[-1] * 1000:>10.1f} {speedup} {generate_time * 1000:>12.1f}")
+
+
+def generate_level(size, seed):
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator = main.DungeonGenerator(size, size, seed=seed)
+        generator.generate_dungeon()
+    return generator
+
+
+def level_signature(generator):
+    return (generator.grid.tobytes(), generator.torch_positions, generator.chest_positions,
+            [(npc.x, npc.z, npc.npc_type) for npc in generator.skeletons])
+
+
+def bench_generation(args):
+    phases = main.DungeonGenerator.PHASES
+    print(f"{'size':>6} {'levels':>7} " + " ".join(f"{phase + ' ms':>11}" for phase in phases) + f" {'total ms':>9}")
+    for size in args.sizes:
+        totals = dict.fromkeys(phases, 0.0)
+        for seed in range(args.seed, args.seed + args.levels):
+            generator = generate_level(size, seed)
+            for phase in phases:
+                totals[phase] += generator.phase_timings[phase]
+        # The same seed has to give the same level, or timings across runs are not comparable
+        if level_signature(generate_level(size, args.seed)) != level_signature(generate_level(size, args.seed)):
+            raise AssertionError(f"generation with seed {args.seed} is not deterministic at size {size}")
+        average = {phase: totals[phase] / args.levels * 1000 for phase in phases}
+        print(f"{size:>6} {args.levels:>7} " + " ".join(f"{average[phase]:>11.2f}" for phase in phases) +
+              f" {sum(average.values()):>9.2f}")
+
+
+def bench_levels(args):
+    """What a descent costs the game loop: building a level in-process vs. receiving a pre-built payload"""
+    print(f"{'size':>6} {'build ms':>9} {'payload KB':>11} {'pickle ms':>10} {'unpickle ms':>12}")
+    for size in args.sizes:
+        build_time = dump_time = load_time = payload_bytes = 0.0
+        for seed in range(args.seed, args.seed + args.levels):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start_time = time.perf_counter()
+                payload = main.build_level(size, size, seed=seed)
+                build_time += time.perf_counter() - start_time
+            # The worker pickles the payload and the game unpickles it; only the second happens on the game loop
+            start_time = time.perf_counter()
+            data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+            dump_time += time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            pickle.loads(data)
+            load_time += time.perf_counter() - start_time
+            payload_bytes += len(data)
+        print(f"{size:>6} {build_time / args.levels * 1000:>9.1f} {payload_bytes / args.levels / 1024:>11.0f} "
+              f"{dump_time / args.levels * 1000:>10.2f} {load_time / args.levels * 1000:>12.2f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    astar_parser = commands.add_parser("astar", help="legacy vs. array-backed astar on growing mazes")
+    astar_parser.add_argument("--sizes", type=int, nargs="+", default=[51, 101, 201, 501])
+    astar_parser.add_argument("--queries", type=int, default=20)
+    astar_parser.add_argument("--seed", type=int, default=0)
+    astar_parser.set_defaults(run=bench_astar)
+    hpa_parser = commands.add_parser("hpa", help="flat astar vs. hierarchical chunk-graph search")
+    hpa_parser.add_argument("--sizes", type=int, nargs="+", default=[51, 101, 201, 501])
+    hpa_parser.add_argument("--queries", type=int, default=20)
+    hpa_parser.add_argument("--seed", type=int, default=0)
+    hpa_parser.set_defaults(run=bench_hpa)
+    repair_parser = commands.add_parser("repair", help="path splicing and HPA* graph patching vs. fresh searches and builds")
+    repair_parser.add_argument("--sizes", type=int, nargs="+", default=[51, 101, 201])
+    repair_parser.add_argument("--queries", type=int, default=20)
+    repair_parser.add_argument("--seed", type=int, default=0)
+    repair_parser.set_defaults(run=bench_repair)
+    entities_parser = commands.add_parser("entities", help="memory and attribute access of slotted entity classes")
+    entities_parser.add_argument("--count", type=int, default=10000)
+    entities_parser.add_argument("--frames", type=int, default=50)
+    entities_parser.set_defaults(run=bench_entities)
+    torches_parser = commands.add_parser("torches", help="legacy vs. stamped-mask torch placement, plus full generation")
+    torches_parser.add_argument("--sizes", type=int, nargs="+", default=[51, 201, 501])
+    torches_parser.add_argument("--seed", type=int, default=0)
+    torches_parser.add_argument("--legacy-max", type=int, default=201, help="largest size to also run the legacy scan on")
+    torches_parser.set_defaults(run=bench_torches)
+    generation_parser = commands.add_parser("generation", help="per-phase timings of seeded level generation")
+    generation_parser.add_argument("--sizes", type=int, nargs="+", default=[51, 101, 201, 501])
+    generation_parser.add_argument("--levels", type=int, default=5)
+    generation_parser.add_argument("--seed", type=int, default=0)
+    generation_parser.set_defaults(run=bench_generation)
+    levels_parser = commands.add_parser("levels", help="in-process level build vs. the cost of a pre-built payload")
+    levels_parser.add_argument("--sizes", type=int, nargs="+", default=[51, 101])
+    levels_parser.add_argument("--levels", type=int, default=3)
+    levels_parser.add_argument("--seed", type=int, default=0)
+    levels_parser.set_defaults(run=bench_levels)
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main_cli()
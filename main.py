@@ -7,33 +7,179 @@ import random
 import math
 from PIL import Image
 import heapq
+from array import array
 import time
+import ctypes
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Tile flags of the uint8 level grid; a wall tile with a torch on it is TILE_WALL | TILE_TORCH
+TILE_WALL = 0x01
+TILE_FLOOR = 0x02
+TILE_CHEST = 0x04
+TILE_TRAPDOOR = 0x08
+TILE_TORCH = 0x10
+
+def build_tile_grid(rows):
+    """uint8 tile-flag grid from nested rows of 0 (floor) and 1 (wall)"""
+    walls = np.asarray(rows, dtype=np.uint8) == 1
+    return np.where(walls, TILE_WALL, TILE_FLOOR).astype(np.uint8)
 
 class DungeonGenerator:
-    def __init__(self, width=51, height=51):
+    PHASES = ("rooms", "maze", "doors", "torches", "chests", "npcs")
+
+    def __init__(self, width=51, height=51, seed=None):
         self.width = width if width % 2 == 1 else width + 1
         self.height = height if height % 2 == 1 else height + 1
+        # Carved as nested lists of 0/1 (cheap scalar writes), then frozen into a uint8 tile-flag array
         self.grid = [[1 for _ in range(self.width)] for _ in range(self.height)]
         # Initialize attributes that will be set in generate_dungeon
         self.rooms = []
         self.torch_positions = []
         self.chest_positions = []
         self.skeletons = []
+        self.npc_pool = NPCPool()
+        # Every random draw of a level comes from this stream, so a seed reproduces the level exactly
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.phase_timings = {}  # phase name -> seconds spent on it by the last generate_dungeon/carve_layout
+
+    def _end_phase(self, name, started):
+        """Record the time since started against a generation phase and return the new start time"""
+        now = time.perf_counter()
+        self.phase_timings[name] = now - started
+        return now
 
     def generate_dungeon(self):
+        self.carve_layout()
+        started = time.perf_counter()
+        
+        # 5. Place torches on walls
+        self.torch_positions = self.place_torches(self.find_torch_faces())
+        started = self._end_phase("torches", started)
+        print(f"Placed {len(self.torch_positions)} torches at positions: {self.torch_positions[:5]}...")  # Show first 5
+        
+        # 6. Place chests in rooms
+        self.chest_positions = []  # Will store (x, z, center_x, center_z)
+        for room_x, room_y, room_w, room_h in self.rooms:
+            # 90% chance to place a chest in each room
+            if self.rng.random() < 0.9:
+                # Try to place chest in center of room
+                chest_x = room_x + room_w // 2
+                chest_z = room_y + room_h // 2
+                if self.grid[chest_z][chest_x] == 0:
+                    center_x = chest_x + 0.5
+                    center_z = chest_z + 0.5
+                    self.chest_positions.append((chest_x, chest_z, center_x, center_z))
+                else:
+                    # Find nearest open tile in the room
+                    found = False
+                    for dz in range(room_h):
+                        for dx in range(room_w):
+                            tx = room_x + dx
+                            tz = room_y + dz
+                            if self.grid[tz][tx] == 0:
+                                center_x = tx + 0.5
+                                center_z = tz + 0.5
+                                self.chest_positions.append((tx, tz, center_x, center_z))
+                                found = True
+                                break
+                        if found:
+                            break
+        
+        print(f"Generated {len(self.rooms)} rooms, placed {len(self.chest_positions)} chests")
+        started = self._end_phase("chests", started)
+        
+        # 7. Place skeletons
+        self.skeletons = []
+        self.npc_pool = NPCPool()
+        player_spawn_x, player_spawn_z = 25, 25  # Default spawn (ignore Y)
+        safe_radius = 8.0
+        for room_x, room_y, room_w, room_h in self.rooms:
+            if self.rng.random() < 0.8:  # 80% chance to spawn a skeleton in a chest room
+                skel_x = room_x + room_w // 2
+                skel_z = room_y + room_h // 2
+                if self.grid[skel_z][skel_x] == 0:
+                    center_x = skel_x + 0.5
+                    center_z = skel_z + 0.5
+                    dist_to_player = math.sqrt((center_x - player_spawn_x)**2 + (center_z - player_spawn_z)**2)
+                    if dist_to_player > safe_radius:
+                        npc_type = self._choose_npc_type()
+                        self.skeletons.append(self.npc_pool.spawn(skel_x, skel_z, center_x, center_z, npc_type=npc_type))
+        # Random chance to spawn skeletons elsewhere
+        for z in range(1, self.height-1):
+            for x in range(1, self.width-1):
+                if self.grid[z][x] == 0 and self.rng.random() < 0.01:
+                    center_x = x + 0.5
+                    center_z = z + 0.5
+                    dist_to_player = math.sqrt((center_x - player_spawn_x)**2 + (center_z - player_spawn_z)**2)
+                    if dist_to_player > safe_radius:
+                        npc_type = self._choose_npc_type()
+                        self.skeletons.append(self.npc_pool.spawn(x, z, center_x, center_z, npc_type=npc_type))
+        print(f"Placed {len(self.skeletons)} skeletons")
+        self._end_phase("npcs", started)
+        
+        # Freeze the carved rows into the tile-flag grid the rest of the game reads
+        self.grid = self.build_tiles()
+        return self.grid
+
+    def find_torch_faces(self):
+        """(x, z, dx, dz) of every wall face next to a walkable tile, row-major with faces in (-x, +x, -z, +z) order"""
+        walls = np.asarray(self.grid, dtype=np.uint8) == 1
+        # Pad with walls so the shifted floor masks line up at the borders
+        floor = np.pad(~walls, 1, constant_values=False)
+        height, width = walls.shape
+        directions = ((-1, 0), (1, 0), (0, -1), (0, 1))
+        faces = np.stack([walls & floor[1 + dz:1 + dz + height, 1 + dx:1 + dx + width] for dx, dz in directions], axis=-1)
+        tile_z, tile_x, face = np.nonzero(faces)
+        print(f"Found {len(face)} wall positions adjacent to walkable areas")
+        return [(x, z) + directions[d] for x, z, d in zip(tile_x.tolist(), tile_z.tolist(), face.tolist())]
+
+    def place_torches(self, faces, min_distance=3.0, chance=0.6):
+        """Torches (x, z, dx, dz, face_x, face_z) on the given faces, at least min_distance tiles apart"""
+        # Placed torches stamp a disk of blocked tiles, so the spacing test is one lookup
+        reach = math.ceil(min_distance) - 1
+        offsets = np.arange(-reach, reach + 1)
+        disk = offsets[None, :] ** 2 + offsets[:, None] ** 2 < min_distance ** 2
+        blocked = np.zeros((self.height + 2 * reach, self.width + 2 * reach), dtype=bool)
+        torches = []
+        for x, z, dx, dz in faces:
+            # Draw only for faces that pass the spacing test, like the scan this replaced
+            if not blocked[z + reach, x + reach] and self.rng.random() < chance:
+                face_x = x + 0.5 + dx * 0.55  # Offset slightly from wall face
+                face_z = z + 0.5 + dz * 0.55
+                torches.append((x, z, dx, dz, face_x, face_z))
+                blocked[z:z + 2 * reach + 1, x:x + 2 * reach + 1] |= disk
+        return torches
+
+    def build_tiles(self):
+        """Tile-flag grid of the carved level with its torches and chests marked"""
+        tiles = build_tile_grid(self.grid)
+        for x, z, _, _, _, _ in self.torch_positions:
+            tiles[z, x] |= TILE_TORCH
+        for x, z, _, _ in self.chest_positions:
+            tiles[z, x] |= TILE_CHEST
+        return tiles
+
+    def carve_layout(self):
+        """Carve rooms, the maze and the room doors into a fresh grid of walls (steps 1-4 of generate_dungeon)"""
+        self.phase_timings = {}
+        started = time.perf_counter()
         # 1. Start with a grid of walls
         self.grid = [[1 for _ in range(self.width)] for _ in range(self.height)]
         
         # 2. Carve out small/medium rooms FIRST
-        num_rooms = random.randint(4, 8)
+        num_rooms = self.rng.randint(4, 8)
         self.rooms = []  # Store room information for chest placement
         attempts = 0
         max_attempts = 100
         while len(self.rooms) < num_rooms and attempts < max_attempts:
-            room_w = random.randint(3, 6)
-            room_h = random.randint(3, 6)
-            x = random.randrange(1, self.width - room_w - 1, 1)
-            y = random.randrange(1, self.height - room_h - 1, 1)
+            room_w = self.rng.randint(3, 6)
+            room_h = self.rng.randint(3, 6)
+            x = self.rng.randrange(1, self.width - room_w - 1, 1)
+            y = self.rng.randrange(1, self.height - room_h - 1, 1)
             # Check for overlap (only within the actual room area)
             overlap = False
             for i in range(x, x+room_w):
@@ -51,6 +197,8 @@ class DungeonGenerator:
                 self.rooms.append((x, y, room_w, room_h))
             attempts += 1
         
+        started = self._end_phase("rooms", started)
+        
         # 3. Generate maze with wider corridors, connecting rooms
         start_x, start_y = 1, 1
         self.grid[start_y][start_x] = 0
@@ -64,7 +212,7 @@ class DungeonGenerator:
                 if 1 <= nx < self.width-2 and 1 <= ny < self.height-1 and self.grid[ny][nx] == 1:
                     neighbors.append((nx, ny))
             if neighbors:
-                nx, ny = random.choice(neighbors)
+                nx, ny = self.rng.choice(neighbors)
                 # Carve 2-tile-wide corridor
                 self.grid[(y+ny)//2][(x+nx)//2] = 0
                 self.grid[(y+ny)//2][(x+nx)//2 + 1] = 0  # Second tile
@@ -74,6 +222,8 @@ class DungeonGenerator:
             else:
                 stack.pop()
         
+        started = self._end_phase("maze", started)
+        
         # 4. Connect rooms to maze by carving a door
         for x, y, room_w, room_h in self.rooms:
             doors = []
@@ -88,111 +238,13 @@ class DungeonGenerator:
                 if x+room_w < self.width-1 and self.grid[j][x+room_w+1] == 0:
                     doors.append((x+room_w, j))
             if doors:
-                door_x, door_y = random.choice(doors)
+                door_x, door_y = self.rng.choice(doors)
                 self.grid[door_y][door_x] = 0
-        
-        # 5. Place torches on walls
-        self.torch_positions = []  # Will store (x, z, dx, dz, face_x, face_z)
-        
-        # Find wall positions that are adjacent to walkable areas
-        wall_positions = []
-        for z in range(len(self.grid)):
-            for x in range(len(self.grid[0])):
-                if self.grid[z][x] == 1:  # Wall
-                    # Check if this wall is adjacent to a walkable area
-                    for dx, dz in [(-1,0), (1,0), (0,-1), (0,1)]:
-                        nx, nz = x + dx, z + dz
-                        if (0 <= nx < len(self.grid[0]) and 
-                            0 <= nz < len(self.grid) and 
-                            self.grid[nz][nx] == 0):  # Adjacent to walkable area
-                            # Calculate face position (slightly offset from wall)
-                            face_x = x + 0.5 + dx * 0.55  # Offset slightly from wall face
-                            face_z = z + 0.5 + dz * 0.55
-                            wall_positions.append((x, z, dx, dz, face_x, face_z))
-        
-        print(f"Found {len(wall_positions)} wall positions adjacent to walkable areas")
-        
-        # Place torches with minimum spacing
-        min_torch_distance = 3.0  # Minimum 3 tiles between torches
-        placed_torches = []
-        for wall_pos in wall_positions:
-            x, z, dx, dz, face_x, face_z = wall_pos
-            # Check if this position is far enough from existing torches
-            too_close = False
-            for torch_pos in placed_torches:
-                torch_x, torch_z, _, _, _, _ = torch_pos
-                distance = math.sqrt((x - torch_x)**2 + (z - torch_z)**2)
-                if distance < min_torch_distance:
-                    too_close = True
-                    break
-            
-            if not too_close and random.random() < 0.6:  # 60% chance to place torch
-                placed_torches.append((x, z, dx, dz, face_x, face_z))
-                self.torch_positions.append((x, z, dx, dz, face_x, face_z))
-        
-        print(f"Placed {len(self.torch_positions)} torches at positions: {self.torch_positions[:5]}...")  # Show first 5
-        
-        # 6. Place chests in rooms
-        self.chest_positions = []  # Will store (x, z, center_x, center_z)
-        for room_x, room_y, room_w, room_h in self.rooms:
-            # 90% chance to place a chest in each room
-            if random.random() < 0.9:
-                # Try to place chest in center of room
-                chest_x = room_x + room_w // 2
-                chest_z = room_y + room_h // 2
-                if self.grid[chest_z][chest_x] == 0:
-                    center_x = chest_x + 0.5
-                    center_z = chest_z + 0.5
-                    self.chest_positions.append((chest_x, chest_z, center_x, center_z))
-                else:
-                    # Find nearest open tile in the room
-                    found = False
-                    for dz in range(room_h):
-                        for dx in range(room_w):
-                            tx = room_x + dx
-                            tz = room_y + dz
-                            if self.grid[tz][tx] == 0:
-                                center_x = tx + 0.5
-                                center_z = tz + 0.5
-                                self.chest_positions.append((tx, tz, center_x, center_z))
-                                found = True
-                                break
-                        if found:
-                            break
-        
-        print(f"Generated {len(self.rooms)} rooms, placed {len(self.chest_positions)} chests")
-        
-        # 7. Place skeletons
-        self.skeletons = []
-        player_spawn_x, player_spawn_z = 25, 25  # Default spawn (ignore Y)
-        safe_radius = 8.0
-        for room_x, room_y, room_w, room_h in self.rooms:
-            if random.random() < 0.8:  # 80% chance to spawn a skeleton in a chest room
-                skel_x = room_x + room_w // 2
-                skel_z = room_y + room_h // 2
-                if self.grid[skel_z][skel_x] == 0:
-                    center_x = skel_x + 0.5
-                    center_z = skel_z + 0.5
-                    dist_to_player = math.sqrt((center_x - player_spawn_x)**2 + (center_z - player_spawn_z)**2)
-                    if dist_to_player > safe_radius:
-                        npc_type = self._choose_npc_type()
-                        self.skeletons.append(NPC(skel_x, skel_z, center_x, center_z, npc_type=npc_type))
-        # Random chance to spawn skeletons elsewhere
-        for z in range(1, self.height-1):
-            for x in range(1, self.width-1):
-                if self.grid[z][x] == 0 and random.random() < 0.01:
-                    center_x = x + 0.5
-                    center_z = z + 0.5
-                    dist_to_player = math.sqrt((center_x - player_spawn_x)**2 + (center_z - player_spawn_z)**2)
-                    if dist_to_player > safe_radius:
-                        npc_type = self._choose_npc_type()
-                        self.skeletons.append(NPC(x, z, center_x, center_z, npc_type=npc_type))
-        print(f"Placed {len(self.skeletons)} skeletons")
-        
+        self._end_phase("doors", started)
         return self.grid
 
     def _choose_npc_type(self):
-        r = random.randint(1, 150)  # 1 to 150 inclusive
+        r = self.rng.randint(1, 150)  # 1 to 150 inclusive
         if r <= 70:
             return "ghoul"
         elif r <= 120:  # 70+50=120
@@ -200,13 +252,646 @@ class DungeonGenerator:
         else:
             return "ghost"
 
+class LevelMesh:
+    """Static level geometry baked into interleaved vertex arrays, one array per material"""
+    # Vertex layout matches GL_T2F_N3F_V3F: u, v, nx, ny, nz, x, y, z
+    FLOATS_PER_VERTEX = 8
+    MATERIALS = ("wall", "floor", "ceiling")
+
+    def __init__(self, dungeon_grid, chunk_size=8, wall_height=2.0, merge_faces=False):
+        self.chunk_size = chunk_size
+        self.wall_height = wall_height
+        # Lighting is per vertex, so merged faces smear torch light across the whole run.
+        # Torch light reaches most of a room, so faces stay one quad per tile unless merge_faces=True.
+        self.merge_faces = merge_faces
+        self.grid_width = len(dungeon_grid[0])
+        self.grid_height = len(dungeon_grid)
+        self.chunks_x = (self.grid_width + chunk_size - 1) // chunk_size
+        self.chunks_z = (self.grid_height + chunk_size - 1) // chunk_size
+        self.vertices = {}  # material -> float32 array of shape (vertex_count, 8)
+        self.chunk_firsts = {}  # material -> first vertex of each chunk, indexed by chunk_z * chunks_x + chunk_x
+        self.chunk_counts = {}  # material -> vertex count of each chunk
+        # Tiles covered by each quad, stored CSR-style: quad i covers quad_cells[quad_cell_offsets[i]:quad_cell_offsets[i + 1]]
+        self.quad_cells = {}  # material -> flat tile indices (z * grid_width + x)
+        self.quad_cell_offsets = {}  # material -> offsets into quad_cells, one per quad plus an end marker
+        self.build(dungeon_grid)
+
+    def build(self, dungeon_grid):
+        """Turn the tile grid into wall, floor and ceiling quads grouped by chunk"""
+        walls = (np.asarray(dungeon_grid) & TILE_WALL) != 0
+        floors = ~walls
+        height = self.wall_height
+        up = (0, height, 0)
+
+        # Walls: only faces that border a walkable tile can ever be seen.
+        # Winding and normals are those of the original per-tile wall quads.
+        padded = np.pad(floors, 1, constant_values=False)
+        wall_faces = [
+            # (visible mask, origin offset, along, normal, runs along x)
+            (walls & padded[:-2, 1:-1], (0, 0, 0), (1, 0, 0), (0, 0, 1), True),   # Front face (plane z)
+            (walls & padded[2:, 1:-1], (0, 0, 1), (1, 0, 0), (0, 0, -1), True),   # Back face (plane z + 1)
+            (walls & padded[1:-1, :-2], (0, 0, 0), (0, 0, 1), (-1, 0, 0), False),  # Left face (plane x)
+            (walls & padded[1:-1, 2:], (1, 0, 0), (0, 0, 1), (1, 0, 0), False),   # Right face (plane x + 1)
+        ]
+        quads = []
+        for visible, offset, along, normal, runs_along_x in wall_faces:
+            if not self.merge_faces:
+                wall_z, wall_x = np.nonzero(visible)
+                lengths = np.ones(len(wall_x))
+            elif runs_along_x:
+                wall_z, wall_x, lengths = self._runs(visible)
+            else:
+                wall_x, wall_z, lengths = self._runs(visible.T)
+            origins = np.stack([wall_x + offset[0], np.full(len(wall_x), offset[1]), wall_z + offset[2]], axis=1)
+            quads.append((wall_x, wall_z, lengths, runs_along_x, self._quads(origins, along, up, lengths, normal)))
+        self._add_material("wall", quads)
+
+        # Floors: one upward-facing quad per walkable tile
+        floor_z, floor_x = np.nonzero(floors)
+        origins = np.stack([floor_x, np.zeros(len(floor_x)), floor_z], axis=1)
+        lengths = np.ones(len(floor_x))
+        self._add_material("floor", [(floor_x, floor_z, lengths, True, self._quads(origins, (1, 0, 0), (0, 0, 1), lengths, (0, 1, 0)))])
+
+        # Ceilings: walls reach the ceiling, so only walkable tiles need a ceiling.
+        # Rows of tiles are merged into slabs that stop at chunk borders.
+        if self.merge_faces:
+            ceiling_z, ceiling_x, lengths = self._runs(floors)
+        else:
+            ceiling_z, ceiling_x = np.nonzero(floors)
+            lengths = np.ones(len(ceiling_x))
+        origins = np.stack([ceiling_x, np.full(len(ceiling_x), height), ceiling_z], axis=1)
+        self._add_material("ceiling", [(ceiling_x, ceiling_z, lengths, True, self._quads(origins, (1, 0, 0), (0, 0, 1), lengths, (0, -1, 0)))])
+
+    def _runs(self, mask):
+        """Greedy-merge each row of a mask into runs, split at chunk borders. Returns (rows, starts, lengths)"""
+        previous = np.zeros_like(mask)
+        previous[:, 1:] = mask[:, :-1]
+        chunk_border = (np.arange(mask.shape[1]) % self.chunk_size) == 0
+        starts = mask & (~previous | chunk_border)
+        # Every masked cell belongs to the run of the last start before it (row-major order)
+        run_ids = np.cumsum(starts.ravel()) - 1
+        lengths = np.bincount(run_ids[mask.ravel()], minlength=int(starts.sum()))
+        rows, cols = np.nonzero(starts)
+        return rows, cols, lengths
+
+    def _quads(self, origins, along, up, lengths, normal):
+        """Build interleaved vertices for quads spanning `lengths` tiles along `along` and one unit of `up`"""
+        origins = np.asarray(origins, dtype=np.float32)
+        along = np.asarray(along, dtype=np.float32)
+        up = np.asarray(up, dtype=np.float32)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        count = len(origins)
+        vertices = np.empty((count, 4, self.FLOATS_PER_VERTEX), dtype=np.float32)
+        span = lengths[:, None] * along
+        # Corners in the same order as the immediate-mode code: (0,0), (1,0), (1,1), (0,1)
+        vertices[:, 0, 5:] = origins
+        vertices[:, 1, 5:] = origins + span
+        vertices[:, 2, 5:] = origins + span + up
+        vertices[:, 3, 5:] = origins + up
+        vertices[:, :, 2:5] = normal
+        # Texture repeats once per tile along the quad so merged faces look like single tiles
+        vertices[:, 0, 0:2] = 0.0
+        vertices[:, 1, 0] = lengths
+        vertices[:, 1, 1] = 0.0
+        vertices[:, 2, 0] = lengths
+        vertices[:, 2, 1] = 1.0
+        vertices[:, 3, 0] = 0.0
+        vertices[:, 3, 1] = 1.0
+        return vertices
+
+    def _add_material(self, material, quad_groups):
+        """Store the quads of a material sorted by chunk and record each chunk's vertex range"""
+        num_chunks = self.chunks_x * self.chunks_z
+        # Each group is (start x, start z, run lengths, runs along x, quads)
+        cells_x = np.concatenate([np.asarray(g[0], dtype=np.int64) for g in quad_groups])
+        cells_z = np.concatenate([np.asarray(g[1], dtype=np.int64) for g in quad_groups])
+        lengths = np.concatenate([np.asarray(g[2], dtype=np.int64) for g in quad_groups])
+        strides = np.concatenate([np.full(len(g[0]), 1 if g[3] else self.grid_width, dtype=np.int64) for g in quad_groups])
+        quads = np.concatenate([g[4] for g in quad_groups])
+        chunk_ids = (cells_z // self.chunk_size) * self.chunks_x + cells_x // self.chunk_size
+        order = np.argsort(chunk_ids, kind="stable")
+        counts = np.bincount(chunk_ids, minlength=num_chunks).astype(np.int32) * 4
+        self.vertices[material] = np.ascontiguousarray(quads[order].reshape(-1, self.FLOATS_PER_VERTEX))
+        self.chunk_counts[material] = counts
+        self.chunk_firsts[material] = (np.cumsum(counts) - counts).astype(np.int32)
+
+        # Expand every run into the tiles it covers, in the same (chunk-sorted) quad order
+        starts = (cells_z * self.grid_width + cells_x)[order]
+        lengths = lengths[order]
+        strides = strides[order]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        steps = np.arange(offsets[-1]) - np.repeat(offsets[:-1], lengths)
+        self.quad_cells[material] = np.repeat(starts, lengths) + steps * np.repeat(strides, lengths)
+        self.quad_cell_offsets[material] = offsets
+
+    def chunk_ids(self, chunks):
+        """Convert (chunk_x, chunk_z) pairs into flat chunk indices"""
+        return np.array([chunk_z * self.chunks_x + chunk_x for chunk_x, chunk_z in chunks], dtype=np.int64)
+
+    def vertex_count(self, material):
+        return len(self.vertices.get(material, ()))
+
+    def visible_ranges(self, material, chunk_ids, visible_tiles):
+        """Vertex (firsts, counts) covering the quads of the given chunks that touch a visible tile"""
+        visible_flat = visible_tiles.ravel()
+        offsets = self.quad_cell_offsets[material]
+        firsts = []
+        counts = []
+        for chunk_id in chunk_ids:
+            first_quad = self.chunk_firsts[material][chunk_id] // 4
+            last_quad = first_quad + self.chunk_counts[material][chunk_id] // 4
+            if first_quad == last_quad:
+                continue
+            # A quad is visible if any tile it covers is visible
+            cells = self.quad_cells[material][offsets[first_quad]:offsets[last_quad]]
+            visible = np.maximum.reduceat(visible_flat[cells], offsets[first_quad:last_quad] - offsets[first_quad])
+            # Merge consecutive visible quads into one vertex range
+            edges = np.diff(np.concatenate(([0], visible.astype(np.int8), [0])))
+            run_starts = np.flatnonzero(edges == 1)
+            run_ends = np.flatnonzero(edges == -1)
+            firsts.append((first_quad + run_starts) * 4)
+            counts.append((run_ends - run_starts) * 4)
+        if not firsts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        return np.concatenate(firsts).astype(np.int32), np.concatenate(counts).astype(np.int32)
+
+class TileVisibility:
+    """Tile-level line-of-sight culling: which tiles can the camera actually see through the maze"""
+    def __init__(self, dungeon_grid, max_distance=10.0, ray_spacing=1.0, step=0.2):
+        self.walls = (np.asarray(dungeon_grid) & TILE_WALL) != 0
+        self.grid_height, self.grid_width = self.walls.shape
+        self.walls_flat = self.walls.ravel()
+        self.max_distance = max_distance
+        self.ray_spacing = math.radians(ray_spacing)  # Angle between rays of the fan
+        self.distances = np.arange(1, int(max_distance / step) + 1) * step  # Sample points along each ray
+        self.cache_key = None
+        self.cached_tiles = None
+
+    def visible_tiles(self, camera_pos, camera_rot, fov_angle=120.0):
+        """Boolean (height, width) mask of tiles visible from the camera inside the view cone"""
+        # Recompute only when the camera moves a quarter tile or turns a few degrees
+        yaw_bucket = round(camera_rot[1] / math.radians(3.0))
+        key = (int(camera_pos[0] * 4), int(camera_pos[2] * 4), yaw_bucket, fov_angle)
+        if key == self.cache_key:
+            return self.cached_tiles
+        # Same widened cone as DungeonRenderer.frustum_mask, plus the yaw bucket and quarter-tile slack
+        half_fov = math.acos(max(-1.0, math.cos(math.radians(fov_angle) / 2) - 0.3)) + math.radians(3.0)
+        num_rays = int(half_fov / self.ray_spacing)
+        angles = yaw_bucket * math.radians(3.0) + np.arange(-num_rays, num_rays + 1) * self.ray_spacing
+        origin_x = (key[0] + 0.5) / 4
+        origin_z = (key[1] + 0.5) / 4
+        visible = self.cast(origin_x, origin_z, angles)
+        self.cache_key = key
+        self.cached_tiles = visible
+        return visible
+
+    def cast(self, origin_x, origin_z, angles):
+        """Cast a fan of rays and mark every tile up to and including the first wall each ray hits"""
+        width, height = self.grid_width, self.grid_height
+        visible = np.zeros(width * height, dtype=bool)
+        # Camera forward for yaw a is (-sin a, -cos a)
+        xs = origin_x - np.sin(angles)[:, None] * self.distances
+        zs = origin_z - np.cos(angles)[:, None] * self.distances
+        tile_x = np.floor(xs).astype(np.int64)
+        tile_z = np.floor(zs).astype(np.int64)
+        inside = (tile_x >= 0) & (tile_x < width) & (tile_z >= 0) & (tile_z < height)
+        cells = np.where(inside, tile_z * width + tile_x, 0)
+        blocked = ~inside | self.walls_flat[cells]
+        # Index of the first blocking sample on each ray (the whole ray if none)
+        first_block = np.where(blocked.any(axis=1), blocked.argmax(axis=1), blocked.shape[1])
+        reached = (np.arange(blocked.shape[1]) <= first_block[:, None]) & inside
+        visible[cells[reached]] = True
+        origin_tile_x, origin_tile_z = int(origin_x), int(origin_z)
+        if 0 <= origin_tile_x < width and 0 <= origin_tile_z < height:
+            visible[origin_tile_z * width + origin_tile_x] = True
+        visible = visible.reshape(height, width)
+        # Grow visible floor by one tile so walls and corners glimpsed between rays are kept
+        floor = visible & ~self.walls
+        padded = np.pad(floor, 1)
+        grown = visible.copy()
+        for dz in range(3):
+            for dx in range(3):
+                grown |= padded[dz:dz + height, dx:dx + width]
+        return grown
+
+class PotentiallyVisibleSet:
+    """Per-tile visibility precomputed at level load, stored as bitsets over a window around each walkable tile"""
+    SAMPLE_OFFSETS = tuple((x, z) for z in (0.05, 0.5, 0.95) for x in (0.05, 0.5, 0.95))  # Ray origins inside each tile
+
+    def __init__(self, dungeon_grid, max_distance=10.0, ray_spacing=0.5, step=0.2, batch_size=64):
+        self.walls = (np.asarray(dungeon_grid) & TILE_WALL) != 0
+        self.grid_height, self.grid_width = self.walls.shape
+        self.max_distance = max_distance
+        self.radius = int(math.ceil(max_distance)) + 2  # Window half-size: ray reach from anywhere in the tile plus growth
+        self.window = 2 * self.radius + 1
+        self.batch_size = batch_size
+        self.build_ray_tree(ray_spacing, step)
+        # Row into self.bits for each tile, -1 for walls
+        self.tile_index = np.full((self.grid_height, self.grid_width), -1, dtype=np.int64)
+        self.bits = None
+        self.build()
+
+    def build_ray_tree(self, ray_spacing, step):
+        """Merge the window cells crossed by every ray into a prefix tree, so shared ray prefixes are tested once"""
+        radius, window = self.radius, self.window
+        angles = np.arange(0.0, 2 * math.pi, math.radians(ray_spacing))
+        distances = np.arange(1, int(self.max_distance / step) + 1) * step
+        offsets = np.array(self.SAMPLE_OFFSETS)
+        # Camera forward for yaw a is (-sin a, -cos a), as in TileVisibility.cast
+        xs = offsets[:, 0][:, None, None] - np.sin(angles)[None, :, None] * distances
+        zs = offsets[:, 1][:, None, None] - np.cos(angles)[None, :, None] * distances
+        cells = ((np.floor(zs).astype(np.int64) + radius) * window + np.floor(xs).astype(np.int64) + radius)
+        root_cell = radius * window + radius
+        children = [{}]  # Per node: cell -> child node
+        node_cell, node_parent, node_depth = [root_cell], [-1], [0]
+        for ray in cells.reshape(-1, len(distances)).tolist():
+            node, cell_before = 0, root_cell
+            for cell in ray:
+                if cell == cell_before:
+                    continue
+                child = children[node].get(cell)
+                if child is None:
+                    child = len(node_cell)
+                    children[node][cell] = child
+                    children.append({})
+                    node_cell.append(cell)
+                    node_parent.append(node)
+                    node_depth.append(node_depth[node] + 1)
+                node, cell_before = child, cell
+        # Order nodes by depth so each level only depends on the one before
+        order = np.argsort(node_depth, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        self.node_cell = np.array(node_cell)[order]
+        self.node_parent = np.where(np.array(node_parent)[order] >= 0, rank[np.maximum(np.array(node_parent)[order], 0)], -1)
+        depths = np.array(node_depth)[order]
+        self.depth_starts = np.searchsorted(depths, np.arange(depths[-1] + 2))
+
+    def build(self):
+        """Trace the ray tree from every walkable tile and pack the visible windows into bitsets"""
+        start_time = time.time()
+        floor_z, floor_x = np.nonzero(~self.walls)
+        self.tile_index[floor_z, floor_x] = np.arange(len(floor_z))
+        # Everything outside the grid blocks sight, like a wall
+        padded_walls = np.pad(self.walls, self.radius, constant_values=True)
+        windows = np.lib.stride_tricks.sliding_window_view(padded_walls, (self.window, self.window))
+        packed = []
+        for start in range(0, len(floor_z), self.batch_size):
+            batch_z = floor_z[start:start + self.batch_size]
+            batch_x = floor_x[start:start + self.batch_size]
+            visible = self.trace(windows[batch_z, batch_x])
+            packed.append(np.packbits(visible.reshape(len(visible), -1), axis=1))
+        self.bits = np.concatenate(packed) if packed else np.zeros((0, (self.window * self.window + 7) // 8), dtype=np.uint8)
+        print(f"PVS built for {len(floor_z)} tiles in {time.time() - start_time:.2f}s ({self.bits.nbytes // 1024} KB)")
+
+    def trace(self, walls):
+        """Visible cells (batch, window, window) given the walls (batch, window, window) around a batch of tiles"""
+        batch, window = len(walls), self.window
+        walls = walls.reshape(batch, -1)
+        open_nodes = ~walls[:, self.node_cell]  # Sight passes on through a node that is not a wall
+        reached = np.zeros(open_nodes.shape, dtype=bool)
+        reached[:, 0] = True
+        for depth in range(1, len(self.depth_starts) - 1):
+            level = slice(self.depth_starts[depth], self.depth_starts[depth + 1])
+            parents = self.node_parent[level]
+            reached[:, level] = reached[:, parents] & open_nodes[:, parents]
+        visible = np.zeros((batch, window * window), dtype=bool)
+        rows, nodes = np.nonzero(reached)
+        visible[rows, self.node_cell[nodes]] = True
+        visible = visible.reshape(batch, window, window)
+        # Grow visible floor by one tile, as TileVisibility.cast does
+        floor = visible & ~walls.reshape(batch, window, window)
+        padded = np.pad(floor, ((0, 0), (1, 1), (1, 1)))
+        grown = visible.copy()
+        for dz in range(3):
+            for dx in range(3):
+                grown |= padded[:, dz:dz + window, dx:dx + window]
+        return grown
+
+    def visible_window(self, tile_x, tile_z):
+        """Unpacked (window, window) visibility around a tile, or None if the tile has no PVS entry"""
+        if not (0 <= tile_x < self.grid_width and 0 <= tile_z < self.grid_height):
+            return None
+        index = self.tile_index[tile_z, tile_x]
+        if index < 0:
+            return None
+        window = self.window
+        return np.unpackbits(self.bits[index], count=window * window).astype(bool).reshape(window, window)
+
+    def visible_tiles(self, camera_pos, camera_rot, fov_angle=120.0):
+        """Boolean (height, width) mask of tiles in the camera tile's PVS that also fall inside the view cone"""
+        tile_x, tile_z = int(camera_pos[0]), int(camera_pos[2])
+        window_mask = self.visible_window(tile_x, tile_z)
+        if window_mask is None:
+            return None
+        radius, window = self.radius, self.window
+        # Keep a tile if any of its corners lies in the widened cone TileVisibility casts into
+        corners = np.arange(window + 1) - radius
+        corner_x = tile_x + corners[None, :] - camera_pos[0]
+        corner_z = tile_z + corners[:, None] - camera_pos[2]
+        distance = np.sqrt(corner_x * corner_x + corner_z * corner_z)
+        forward_x, forward_z = -math.sin(camera_rot[1]), -math.cos(camera_rot[1])
+        half_fov = math.acos(max(-1.0, math.cos(math.radians(fov_angle) / 2) - 0.3)) + math.radians(4.5)
+        in_cone = (corner_x * forward_x + corner_z * forward_z) >= math.cos(min(half_fov, math.pi)) * distance
+        in_cone = in_cone[:-1, :-1] | in_cone[1:, :-1] | in_cone[:-1, 1:] | in_cone[1:, 1:]
+        # Widen by one tile, matching the floor growth applied to the ray casts
+        padded = np.pad(in_cone, 1)
+        for dz in range(3):
+            for dx in range(3):
+                in_cone = in_cone | padded[dz:dz + window, dx:dx + window]
+        window_mask &= in_cone
+        window_mask[radius - 1:radius + 2, radius - 1:radius + 2] = True  # The camera's own neighbourhood
+        # Paste the window into a full-grid mask
+        visible = np.zeros((self.grid_height, self.grid_width), dtype=bool)
+        z0, x0 = tile_z - radius, tile_x - radius
+        gz0, gx0 = max(z0, 0), max(x0, 0)
+        gz1, gx1 = min(z0 + window, self.grid_height), min(x0 + window, self.grid_width)
+        visible[gz0:gz1, gx0:gx1] = window_mask[gz0 - z0:gz1 - z0, gx0 - x0:gx1 - x0]
+        return visible
+
+class ImageCache:
+    """Decoded RGBA pixels of asset images, decoded in parallel and cached on disk keyed by file mtime"""
+    def __init__(self, cache_dir=".texture_cache", max_workers=8):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+
+    def cache_path(self, path):
+        """Cache file for the current version of an image"""
+        stat = os.stat(path)
+        name = path.replace(os.sep, "_").replace("/", "_")
+        return os.path.join(self.cache_dir, f"{name}.{stat.st_mtime_ns}.{stat.st_size}.npy")
+
+    def load(self, path):
+        """(height, width, 4) uint8 pixels of one image, row 0 being the top of the image"""
+        cache_path = self.cache_path(path)
+        if os.path.exists(cache_path):
+            try:
+                return np.load(cache_path), True
+            except (OSError, ValueError):
+                pass  # Unreadable cache entry, decode again
+        image = Image.open(path)
+        pixels = np.asarray(image.convert("RGBA"), dtype=np.uint8)
+        self.store(path, cache_path, pixels)
+        return pixels, False
+
+    def store(self, path, cache_path, pixels):
+        """Write a cache entry and remove entries for older versions of the same file"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            prefix = os.path.basename(cache_path).rsplit(".", 3)[0] + "."
+            for old in os.listdir(self.cache_dir):
+                if old.startswith(prefix) and old.endswith(".npy") and old[len(prefix):-4].count(".") == 1:
+                    os.remove(os.path.join(self.cache_dir, old))
+            temp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, pixels)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"Could not cache decoded {path}: {e}")
+
+    def load_all(self, paths):
+        """Decode every distinct path concurrently; returns path -> pixels"""
+        start_time = time.time()
+        unique = list(dict.fromkeys(paths))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = dict(zip(unique, executor.map(self.load, unique)))
+        cached = sum(1 for _, hit in results.values() if hit)
+        print(f"Decoded {len(unique)} images in {time.time() - start_time:.2f}s ({cached} from cache)")
+        return {path: pixels for path, (pixels, _) in results.items()}
+
+class GLStateCache:
+    """Tracks the fixed-function state the renderer sets and skips calls that would not change it"""
+    def __init__(self):
+        self.texture = None  # Bound GL_TEXTURE_2D
+        self.caps = {}  # glEnable/glDisable capability -> enabled
+        self.blend = None
+        self.env_mode = None
+        self.materials = {}  # GL_FRONT material parameter -> value
+        # Calls issued to GL vs. skipped as redundant, for the current and the last finished frame
+        self.issued = 0
+        self.skipped = 0
+        self.last_frame = (0, 0)
+
+    def begin_frame(self):
+        """Reset the counters, keeping the last frame's (issued, skipped) totals"""
+        self.last_frame = (self.issued, self.skipped)
+        self.issued = 0
+        self.skipped = 0
+
+    def invalidate(self):
+        """Forget everything, for when state was changed without going through the cache"""
+        self.texture = None
+        self.caps = {}
+        self.blend = None
+        self.env_mode = None
+        self.materials = {}
+
+    def bind_texture(self, texture_id):
+        if self.texture == texture_id:
+            self.skipped += 1
+            return
+        glBindTexture(GL_TEXTURE_2D, texture_id)
+        self.texture = texture_id
+        self.issued += 1
+
+    def enable(self, cap):
+        if self.caps.get(cap) is True:
+            self.skipped += 1
+            return
+        glEnable(cap)
+        self.caps[cap] = True
+        self.issued += 1
+
+    def disable(self, cap):
+        if self.caps.get(cap) is False:
+            self.skipped += 1
+            return
+        glDisable(cap)
+        self.caps[cap] = False
+        self.issued += 1
+
+    def blend_func(self, src, dst):
+        if self.blend == (src, dst):
+            self.skipped += 1
+            return
+        glBlendFunc(src, dst)
+        self.blend = (src, dst)
+        self.issued += 1
+
+    def tex_env_mode(self, mode):
+        if self.env_mode == mode:
+            self.skipped += 1
+            return
+        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, mode)
+        self.env_mode = mode
+        self.issued += 1
+
+    def material_fv(self, pname, values):
+        values = tuple(values)
+        if self.materials.get(pname) == values:
+            self.skipped += 1
+            return
+        glMaterialfv(GL_FRONT, pname, values)
+        self.materials[pname] = values
+        self.issued += 1
+
+    def material_f(self, pname, value):
+        if self.materials.get(pname) == value:
+            self.skipped += 1
+            return
+        glMaterialf(GL_FRONT, pname, value)
+        self.materials[pname] = value
+        self.issued += 1
+
+    def material(self, ambient, diffuse, specular, shininess):
+        """Set the four GL_FRONT material parameters the renderer uses"""
+        self.material_fv(GL_AMBIENT, ambient)
+        self.material_fv(GL_DIFFUSE, diffuse)
+        self.material_fv(GL_SPECULAR, specular)
+        self.material_f(GL_SHININESS, shininess)
+
+class SpriteAtlas:
+    """All billboard sprites shelf-packed into one RGBA texture"""
+    def __init__(self, images, max_sprite_size=512, padding=2):
+        self.padding = padding
+        self.regions = {}  # name -> (u0, v0, u1, v1)
+        self.texture_id = None
+        sprites = {}
+        for name, image in images.items():
+            # Big sprites are only ever drawn a fraction of a tile wide, so cap them to keep the atlas small
+            scale = min(1.0, max_sprite_size / max(image.width, image.height))
+            if scale < 1.0:
+                image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BOX)
+            sprites[name] = np.asarray(image.convert("RGBA"), dtype=np.uint8)
+        self.pack(sprites)
+
+    def pack(self, sprites):
+        """Place sprites on shelves, tallest first, and fill the padding with each sprite's edge pixels"""
+        pad = self.padding
+        sizes = {name: (pixels.shape[1] + 2 * pad, pixels.shape[0] + 2 * pad) for name, pixels in sprites.items()}
+        total_area = sum(w * h for w, h in sizes.values())
+        width = 1 << max(6, math.ceil(math.log2(max([math.sqrt(total_area)] + [w for w, _ in sizes.values()]))))
+        positions = {}
+        shelf_x = shelf_y = shelf_height = 0
+        for name in sorted(sprites, key=lambda name: -sizes[name][1]):
+            w, h = sizes[name]
+            if shelf_x + w > width:
+                shelf_x, shelf_y, shelf_height = 0, shelf_y + shelf_height, 0
+            positions[name] = (shelf_x, shelf_y)
+            shelf_x += w
+            shelf_height = max(shelf_height, h)
+        height = 1 << max(6, math.ceil(math.log2(max(1, shelf_y + shelf_height))))
+        self.width, self.height = width, height
+        self.pixels = np.zeros((height, width, 4), dtype=np.uint8)
+        for name, pixels in sprites.items():
+            x, y = positions[name]
+            w, h = pixels.shape[1], pixels.shape[0]
+            self.pixels[y:y + h + 2 * pad, x:x + w + 2 * pad] = np.pad(pixels, ((pad, pad), (pad, pad), (0, 0)), mode="edge")
+            # Image row 0 is texture coordinate t = 0, as with the per-sprite textures
+            self.regions[name] = ((x + pad) / width, (y + pad) / height, (x + pad + w) / width, (y + pad + h) / height)
+
+    def upload(self, gl):
+        """Create the GL texture for the atlas, binding through the renderer's GLStateCache"""
+        max_size = glGetIntegerv(GL_MAX_TEXTURE_SIZE)
+        if max(self.width, self.height) > max_size:
+            print(f"Sprite atlas {self.width}x{self.height} exceeds GL_MAX_TEXTURE_SIZE {max_size}")
+        self.texture_id = glGenTextures(1)
+        gl.bind_texture(self.texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.width, self.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, self.pixels)
+        gl.bind_texture(0)
+        print(f"Sprite atlas loaded: {self.width}x{self.height} with {len(self.regions)} sprites")
+
+class SpriteBatch:
+    """Camera-facing billboards collected over a frame and drawn with one call per blend/lighting/material group"""
+    FLOATS_PER_VERTEX = 12  # GL_T2F_C4F_N3F_V3F
+    ALPHA = "alpha"
+    ADDITIVE = "additive"
+
+    def __init__(self, atlas, gl):
+        self.atlas = atlas
+        self.gl = gl
+        self.groups = {}  # (blend, lit, material) -> list of sprite rows, drawn in insertion order
+
+    def add(self, name, x, y, z, width, height, bottom_t=1.0, color=(1.0, 1.0, 1.0, 1.0), blend=ALPHA, lit=True, material=None):
+        """Queue a sprite whose bottom edge is centred on (x, y, z); bottom_t is the texture t at that edge"""
+        region = self.atlas.regions.get(name) if self.atlas else None
+        if region is None:
+            return False
+        u0, v0, u1, v1 = region
+        v_bottom = v0 + bottom_t * (v1 - v0)
+        v_top = v0 + (1.0 - bottom_t) * (v1 - v0)
+        self.groups.setdefault((blend, lit, material), []).append((x, y, z, width, height, u0, u1, v_bottom, v_top) + tuple(color))
+        return True
+
+    def build(self, rows, camera_pos):
+        """Vertex array (n * 4, 12) of billboards turned about the y axis to face the camera"""
+        rows = np.array(rows, dtype=np.float32)
+        x, y, z, width, height = rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4]
+        if camera_pos:
+            angle = np.arctan2(camera_pos[0] - x, camera_pos[2] - z)
+        else:
+            angle = np.zeros_like(x)
+        # Same as glRotatef(angle, 0, 1, 0): local +x maps to (cos, 0, -sin), the +z normal to (sin, 0, cos)
+        right_x, right_z = np.cos(angle), -np.sin(angle)
+        corner_x = np.array([-0.5, 0.5, 0.5, -0.5], dtype=np.float32)
+        corner_y = np.array([0.0, 0.0, 1.0, 1.0], dtype=np.float32)
+        vertices = np.empty((len(rows), 4, self.FLOATS_PER_VERTEX), dtype=np.float32)
+        vertices[:, :, 0] = np.where(corner_x > 0, rows[:, 6:7], rows[:, 5:6])
+        vertices[:, :, 1] = np.where(corner_y > 0, rows[:, 8:9], rows[:, 7:8])
+        vertices[:, :, 2:6] = rows[:, None, 9:13]
+        vertices[:, :, 6] = np.sin(angle)[:, None]
+        vertices[:, :, 7] = 0.0
+        vertices[:, :, 8] = np.cos(angle)[:, None]
+        offset = corner_x[None, :] * width[:, None]
+        vertices[:, :, 9] = x[:, None] + offset * right_x[:, None]
+        vertices[:, :, 10] = y[:, None] + corner_y[None, :] * height[:, None]
+        vertices[:, :, 11] = z[:, None] + offset * right_z[:, None]
+        return vertices.reshape(-1, self.FLOATS_PER_VERTEX)
+
+    def flush(self, camera_pos=None):
+        """Draw and clear everything queued so far"""
+        if not self.groups:
+            return
+        self.gl.enable(GL_BLEND)
+        self.gl.bind_texture(self.atlas.texture_id)
+        self.gl.tex_env_mode(GL_MODULATE)
+        for (blend, lit, material), rows in self.groups.items():
+            if blend == self.ADDITIVE:
+                self.gl.blend_func(GL_ONE, GL_ONE)
+            else:
+                self.gl.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+            if lit:
+                self.gl.enable(GL_LIGHTING)
+            else:
+                self.gl.disable(GL_LIGHTING)
+            if material:
+                self.gl.material(*material)
+            vertices = self.build(rows, camera_pos)
+            glInterleavedArrays(GL_T2F_C4F_N3F_V3F, 0, vertices)
+            glDrawArrays(GL_QUADS, 0, len(vertices))
+            glDisableClientState(GL_COLOR_ARRAY)
+            glDisableClientState(GL_VERTEX_ARRAY)
+            glDisableClientState(GL_NORMAL_ARRAY)
+            glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        self.groups = {}
+        self.gl.enable(GL_LIGHTING)
+        glColor4f(1.0, 1.0, 1.0, 1.0)
+        self.gl.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        self.gl.bind_texture(0)
+        self.gl.disable(GL_BLEND)
+
 class DungeonRenderer:
     def __init__(self):
+        self.gl = GLStateCache()  # Every texture/blend/lighting/material change goes through here
+        self.image_cache = ImageCache()
         self.texture_id = None
         self.floor_texture_id = None
         self.ceiling_texture_id = None
-        self.torch_texture_id = None
-        self.chest_texture_id = None
         self.interact_texture_id = None
         self.weapon_texture_id = None  # Hotbar icon (rusty)
         self.held_weapon_texture_id = None  # Held weapon (rusty)
@@ -216,642 +901,102 @@ class DungeonRenderer:
         self.health_fill_texture_id = None
         self.mana_bar_texture_id = None
         self.mana_fill_texture_id = None
-        self.skeleton_texture_id = None
-        self.ghoul_texture_id = None
-        self.ghost_texture_id = None
         self.potion_health_texture_id = None
         self.potion_magic_texture_id = None
         self.scroll_fire_texture_id = None
         self.scroll_magic_texture_id = None
         self.spell_fire_texture_id = None
         self.spell_magic_texture_id = None  # Add this line
-        self.fireball_texture_id = None
-        self.magicball_texture_id = None  # Add this line
         self.key_texture_id = None
         self.trapdoor_closed_texture_id = None
         self.trapdoor_open_texture_id = None
+        # Static level geometry (see upload_level_mesh)
+        self.level_mesh = None
+        self.mesh_buffers = {}  # material -> VBO id
+        self.mesh_lists = {}  # material -> first display list id (fallback when VBOs are unavailable)
+        # Tiles the camera can see this frame (None = no line-of-sight culling)
+        self.visible_tiles = None
+        self.pvs = None  # PotentiallyVisibleSet for the current level
+        # Billboard sprites (see SpriteAtlas / SpriteBatch)
+        self.sprite_atlas = None
+        self.sprite_batch = SpriteBatch(None, self.gl)
         self.load_texture()
-        
+
+    # Textures uploaded individually: (attribute, path, flip vertically, wrap mode, label)
+    TEXTURE_MANIFEST = (
+        ("texture_id", "assets/stone.png", False, GL_REPEAT, "Stone texture"),
+        ("floor_texture_id", "assets/floor.png", False, GL_REPEAT, "Floor texture"),
+        ("ceiling_texture_id", "assets/ceiling.png", False, GL_REPEAT, "Ceiling texture"),
+        ("interact_texture_id", "assets/interact.png", False, GL_REPEAT, "Interact texture"),
+        ("weapon_texture_id", "assets/wep_rusty.png", False, GL_REPEAT, "Weapon texture"),
+        ("held_weapon_texture_id", "assets/held_rusty.png", False, GL_REPEAT, "Held weapon texture"),
+        ("health_bar_texture_id", "assets/meter.png", False, GL_CLAMP_TO_EDGE, "Health bar texture"),
+        ("health_fill_texture_id", "assets/health.png", False, GL_CLAMP_TO_EDGE, "Health fill texture"),
+        ("mana_bar_texture_id", "assets/meter.png", False, GL_CLAMP_TO_EDGE, "Mana bar texture"),
+        ("mana_fill_texture_id", "assets/magic.png", False, GL_CLAMP_TO_EDGE, "Mana fill texture"),
+        ("skeleton_sword_texture_id", "assets/wep_skeleton.png", False, GL_REPEAT, "Skeleton sword icon"),
+        ("held_skeleton_sword_texture_id", "assets/held_skeleton.png", False, GL_REPEAT, "Held skeleton sword"),
+        ("potion_health_texture_id", "assets/potion_health.png", False, GL_REPEAT, "Health potion texture"),
+        ("potion_magic_texture_id", "assets/potion_magic.png", False, GL_REPEAT, "Magic potion texture"),
+        ("scroll_fire_texture_id", "assets/scroll_fire.png", False, GL_REPEAT, "Fire scroll texture"),
+        ("scroll_magic_texture_id", "assets/scroll_magic.png", False, GL_REPEAT, "Magic scroll texture"),
+        ("spell_fire_texture_id", "assets/spell_fire.png", False, GL_REPEAT, "Spell fire texture"),
+        ("spell_magic_texture_id", "assets/spell_magic.png", False, GL_REPEAT, "Spell magic texture"),
+        ("key_texture_id", "assets/key.png", True, GL_REPEAT, "Key texture"),
+        ("trapdoor_closed_texture_id", "assets/trapdoor_closed.png", True, GL_REPEAT, "Trapdoor closed texture"),
+        ("trapdoor_open_texture_id", "assets/trapdoor_open.png", True, GL_REPEAT, "Trapdoor open texture"),
+    )
+
     def load_texture(self):
-        """Load the stone, floor, ceiling, and torch textures"""
+        """Load every texture in TEXTURE_MANIFEST plus the sprite atlas, decoding all images up front"""
         try:
-            # Load stone texture for walls
-            image = Image.open("assets/stone.png")
-            image = image.convert("RGBA")
-            image_data = image.tobytes()
-            self.texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, image.width, image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, image_data)
-            print(f"Stone texture loaded: {image.width}x{image.height}")
-            
-            # Load floor texture
-            floor_image = Image.open("assets/floor.png")
-            floor_image = floor_image.convert("RGBA")
-            floor_image_data = floor_image.tobytes()
-            self.floor_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.floor_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, floor_image.width, floor_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, floor_image_data)
-            print(f"Floor texture loaded: {floor_image.width}x{floor_image.height}")
-            
-            # Load ceiling texture
-            ceiling_image = Image.open("assets/ceiling.png")
-            ceiling_image = ceiling_image.convert("RGBA")
-            ceiling_image_data = ceiling_image.tobytes()
-            self.ceiling_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.ceiling_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, ceiling_image.width, ceiling_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, ceiling_image_data)
-            print(f"Ceiling texture loaded: {ceiling_image.width}x{ceiling_image.height}")
-            
-            # Load torch texture (flip vertically for OpenGL)
-            torch_image = Image.open("assets/torch.png")
-            torch_image = torch_image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
-            torch_image = torch_image.convert("RGBA")
-            torch_image_data = torch_image.tobytes()
-            self.torch_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.torch_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, torch_image.width, torch_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, torch_image_data)
-            print(f"Torch texture loaded: {torch_image.width}x{torch_image.height}")
-            
-            # Load chest texture (flip vertically for OpenGL)
-            chest_image = Image.open("assets/chest.png")
-            chest_image = chest_image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
-            chest_image = chest_image.convert("RGBA")
-            chest_image_data = chest_image.tobytes()
-            self.chest_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.chest_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, chest_image.width, chest_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, chest_image_data)
-            print(f"Chest texture loaded: {chest_image.width}x{chest_image.height}")
-            
-            # Load interact texture
-            interact_image = Image.open("assets/interact.png")
-            interact_image = interact_image.convert("RGBA")
-            interact_image_data = interact_image.tobytes()
-            self.interact_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.interact_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, interact_image.width, interact_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, interact_image_data)
-            print(f"Interact texture loaded: {interact_image.width}x{interact_image.height}")
-            
-            # Load weapon texture for hotbar icon
-            weapon_image = Image.open("assets/wep_rusty.png")
-            weapon_image = weapon_image.convert("RGBA")
-            weapon_image_data = weapon_image.tobytes()
-            self.weapon_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.weapon_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, weapon_image.width, weapon_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, weapon_image_data)
-            print(f"Weapon texture loaded: {weapon_image.width}x{weapon_image.height}")
-
-            # Load held weapon texture for first-person view
-            held_weapon_image = Image.open("assets/held_rusty.png")
-            held_weapon_image = held_weapon_image.convert("RGBA")
-            held_weapon_image_data = held_weapon_image.tobytes()
-            self.held_weapon_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.held_weapon_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, held_weapon_image.width, held_weapon_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, held_weapon_image_data)
-            print(f"Held weapon texture loaded: {held_weapon_image.width}x{held_weapon_image.height}")
-            
-            # Load health bar texture
-            health_bar_image = Image.open("assets/meter.png")
-            health_bar_image = health_bar_image.convert("RGBA")
-            health_bar_image_data = health_bar_image.tobytes()
-            self.health_bar_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.health_bar_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, health_bar_image.width, health_bar_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, health_bar_image_data)
-            print(f"Health bar texture loaded: {health_bar_image.width}x{health_bar_image.height}")
-            
-            # Load health fill texture
-            health_fill_image = Image.open("assets/health.png")
-            health_fill_image = health_fill_image.convert("RGBA")
-            health_fill_image_data = health_fill_image.tobytes()
-            self.health_fill_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.health_fill_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, health_fill_image.width, health_fill_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, health_fill_image_data)
-            print(f"Health fill texture loaded: {health_fill_image.width}x{health_fill_image.height}")
-            
-            # Load mana bar texture
-            mana_bar_image = Image.open("assets/meter.png")
-            mana_bar_image = mana_bar_image.convert("RGBA")
-            mana_bar_image_data = mana_bar_image.tobytes()
-            self.mana_bar_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.mana_bar_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, mana_bar_image.width, mana_bar_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, mana_bar_image_data)
-            print(f"Mana bar texture loaded: {mana_bar_image.width}x{mana_bar_image.height}")
+            # Decode each distinct file once, in parallel (or straight from the pixel cache)
+            paths = [path for _, path, _, _, _ in self.TEXTURE_MANIFEST]
+            paths += [path for path, _ in self.SPRITE_FILES.values()]
+            pixels = self.image_cache.load_all(paths)
             
-            # Load mana fill texture
-            mana_fill_image = Image.open("assets/magic.png")
-            mana_fill_image = mana_fill_image.convert("RGBA")
-            mana_fill_image_data = mana_fill_image.tobytes()
-            self.mana_fill_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.mana_fill_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, mana_fill_image.width, mana_fill_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, mana_fill_image_data)
-            print(f"Mana fill texture loaded: {mana_fill_image.width}x{mana_fill_image.height}")
-            
-            # Load skeleton texture
-            skeleton_image = Image.open("assets/skeleton.png")
-            skeleton_image = skeleton_image.convert("RGBA")
-            skeleton_image_data = skeleton_image.tobytes()
-            self.skeleton_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.skeleton_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, skeleton_image.width, skeleton_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, skeleton_image_data)
-            print(f"Skeleton texture loaded: {skeleton_image.width}x{skeleton_image.height}")
-
-            # Load ghoul texture
-            ghoul_image = Image.open("assets/ghoul.png")
-            ghoul_image = ghoul_image.convert("RGBA")
-            ghoul_image_data = ghoul_image.tobytes()
-            self.ghoul_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.ghoul_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, ghoul_image.width, ghoul_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, ghoul_image_data)
-            print(f"Ghoul texture loaded: {ghoul_image.width}x{ghoul_image.height}")
-
-            # Load ghost texture
-            ghost_image = Image.open("assets/ghost.png")
-            ghost_image = ghost_image.convert("RGBA")
-            ghost_image_data = ghost_image.tobytes()
-            self.ghost_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.ghost_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, ghost_image.width, ghost_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, ghost_image_data)
-            print(f"Ghost texture loaded: {ghost_image.width}x{ghost_image.height}")
-            
-            # Load skeleton sword icon
-            skeleton_sword_image = Image.open("assets/wep_skeleton.png")
-            skeleton_sword_image = skeleton_sword_image.convert("RGBA")
-            skeleton_sword_image_data = skeleton_sword_image.tobytes()
-            self.skeleton_sword_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.skeleton_sword_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, skeleton_sword_image.width, skeleton_sword_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, skeleton_sword_image_data)
-            print(f"Skeleton sword icon loaded: {skeleton_sword_image.width}x{skeleton_sword_image.height}")
-            
-            # Load held skeleton sword
-            held_skeleton_sword_image = Image.open("assets/held_skeleton.png")
-            held_skeleton_sword_image = held_skeleton_sword_image.convert("RGBA")
-            held_skeleton_sword_image_data = held_skeleton_sword_image.tobytes()
-            self.held_skeleton_sword_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.held_skeleton_sword_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, held_skeleton_sword_image.width, held_skeleton_sword_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, held_skeleton_sword_image_data)
-            print(f"Held skeleton sword loaded: {held_skeleton_sword_image.width}x{held_skeleton_sword_image.height}")
-            
-            # Load health potion texture
-            potion_health_image = Image.open("assets/potion_health.png")
-            potion_health_image = potion_health_image.convert("RGBA")
-            potion_health_image_data = potion_health_image.tobytes()
-            self.potion_health_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.potion_health_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, potion_health_image.width, potion_health_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, potion_health_image_data)
-            print(f"Health potion texture loaded: {potion_health_image.width}x{potion_health_image.height}")
-            
-            # Load magic potion texture
-            potion_magic_image = Image.open("assets/potion_magic.png")
-            potion_magic_image = potion_magic_image.convert("RGBA")
-            potion_magic_image_data = potion_magic_image.tobytes()
-            self.potion_magic_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.potion_magic_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, potion_magic_image.width, potion_magic_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, potion_magic_image_data)
-            print(f"Magic potion texture loaded: {potion_magic_image.width}x{potion_magic_image.height}")
-            
-            # Load fire scroll texture
-            scroll_fire_image = Image.open("assets/scroll_fire.png")
-            scroll_fire_image = scroll_fire_image.convert("RGBA")
-            scroll_fire_image_data = scroll_fire_image.tobytes()
-            self.scroll_fire_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.scroll_fire_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, scroll_fire_image.width, scroll_fire_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, scroll_fire_image_data)
-            print(f"Fire scroll texture loaded: {scroll_fire_image.width}x{scroll_fire_image.height}")
-            
-            # Load magic scroll texture
-            scroll_magic_image = Image.open("assets/scroll_magic.png")
-            scroll_magic_image = scroll_magic_image.convert("RGBA")
-            scroll_magic_image_data = scroll_magic_image.tobytes()
-            self.scroll_magic_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.scroll_magic_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, scroll_magic_image.width, scroll_magic_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, scroll_magic_image_data)
-            print(f"Magic scroll texture loaded: {scroll_magic_image.width}x{scroll_magic_image.height}")
-            
-            # Load spell fire texture (for held spell)
-            spell_fire_image = Image.open("assets/spell_fire.png")
-            spell_fire_image = spell_fire_image.convert("RGBA")
-            spell_fire_image_data = spell_fire_image.tobytes()
-            self.spell_fire_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.spell_fire_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, spell_fire_image.width, spell_fire_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, spell_fire_image_data)
-            print(f"Spell fire texture loaded: {spell_fire_image.width}x{spell_fire_image.height}")
-            
-            # Load spell magic texture (for held magic spell)
-            spell_magic_image = Image.open("assets/spell_magic.png")
-            spell_magic_image = spell_magic_image.convert("RGBA")
-            spell_magic_image_data = spell_magic_image.tobytes()
-            self.spell_magic_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.spell_magic_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, spell_magic_image.width, spell_magic_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, spell_magic_image_data)
-            print(f"Spell magic texture loaded: {spell_magic_image.width}x{spell_magic_image.height}")
-            
-            # Unbind texture to avoid state issues
-            glBindTexture(GL_TEXTURE_2D, 0)
+            # Only the GL uploads happen here on the main thread
+            for attr, path, flip, wrap, label in self.TEXTURE_MANIFEST:
+                image = pixels[path][::-1] if flip else pixels[path]
+                setattr(self, attr, self.upload_texture(image, wrap))
+                print(f"{label} loaded: {image.shape[1]}x{image.shape[0]}")
             print("All textures loaded successfully")
             print("Starter weapon 'rusty_sword' added to inventory slot 0")
-
-            # Load fireball texture (for fire spell projectile)
-            fireball_image = Image.open("assets/fireball.png")
-            fireball_image = fireball_image.convert("RGBA")
-            fireball_image_data = fireball_image.tobytes()
-            self.fireball_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.fireball_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, fireball_image.width, fireball_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, fireball_image_data)
-            print(f"Fireball texture loaded: {fireball_image.width}x{fireball_image.height}")
-
-            # Load magicball texture (for magic spell projectile)
-            magicball_image = Image.open("assets/magicball.png")
-            magicball_image = magicball_image.convert("RGBA")
-            magicball_image_data = magicball_image.tobytes()
-            self.magicball_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.magicball_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, magicball_image.width, magicball_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, magicball_image_data)
-            print(f"Magicball texture loaded: {magicball_image.width}x{magicball_image.height}")
-
-            # Load key texture (flip vertically for OpenGL)
-            key_image = Image.open("assets/key.png")
-            key_image = key_image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
-            key_image = key_image.convert("RGBA")
-            key_image_data = key_image.tobytes()
-            self.key_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.key_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, key_image.width, key_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, key_image_data)
-            print(f"Key texture loaded: {key_image.width}x{key_image.height}")
-            
-            # Load trapdoor closed texture
-            trapdoor_closed_image = Image.open("assets/trapdoor_closed.png")
-            trapdoor_closed_image = trapdoor_closed_image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
-            trapdoor_closed_image = trapdoor_closed_image.convert("RGBA")
-            trapdoor_closed_image_data = trapdoor_closed_image.tobytes()
-            self.trapdoor_closed_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.trapdoor_closed_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, trapdoor_closed_image.width, trapdoor_closed_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, trapdoor_closed_image_data)
-            print(f"Trapdoor closed texture loaded: {trapdoor_closed_image.width}x{trapdoor_closed_image.height}")
             
-            # Load trapdoor open texture
-            trapdoor_open_image = Image.open("assets/trapdoor_open.png")
-            trapdoor_open_image = trapdoor_open_image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
-            trapdoor_open_image = trapdoor_open_image.convert("RGBA")
-            trapdoor_open_image_data = trapdoor_open_image.tobytes()
-            self.trapdoor_open_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.trapdoor_open_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, trapdoor_open_image.width, trapdoor_open_image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, trapdoor_open_image_data)
-            print(f"Trapdoor open texture loaded: {trapdoor_open_image.width}x{trapdoor_open_image.height}")
+            # Pack the billboard sprites into one atlas so they can be drawn in batches
+            self.sprite_atlas = SpriteAtlas(self.load_sprite_images(pixels))
+            self.sprite_atlas.upload(self.gl)
+            self.sprite_batch.atlas = self.sprite_atlas
             
             # Unbind texture to avoid state issues
-            glBindTexture(GL_TEXTURE_2D, 0)
+            self.gl.bind_texture(0)
         except (OSError, IOError) as e:
             print(f"Error loading texture: {e}")
-            self.texture_id = None
-            self.floor_texture_id = None
-            self.ceiling_texture_id = None
-            self.torch_texture_id = None
-            self.chest_texture_id = None
-            self.interact_texture_id = None
-            self.weapon_texture_id = None
-            self.health_bar_texture_id = None
-            self.health_fill_texture_id = None
-            self.mana_bar_texture_id = None
-            self.mana_fill_texture_id = None
-            self.potion_health_texture_id = None
-            self.potion_magic_texture_id = None
-            self.scroll_fire_texture_id = None
-            self.spell_fire_texture_id = None
-            self.spell_magic_texture_id = None
-            self.fireball_texture_id = None
-            self.key_texture_id = None
-            self.trapdoor_closed_texture_id = None
-            self.trapdoor_open_texture_id = None
-    
-    def render_wall(self, x, z, height=2.0, _camera_pos=None):
-        """Render a wall segment with proper lighting"""
-        # Set material properties for walls
-        glMaterialfv(GL_FRONT, GL_AMBIENT, [0.3, 0.3, 0.3, 1.0])
-        glMaterialfv(GL_FRONT, GL_DIFFUSE, [0.9, 0.9, 0.9, 1.0])
-        glMaterialfv(GL_FRONT, GL_SPECULAR, [0.2, 0.2, 0.2, 1.0])
-        glMaterialf(GL_FRONT, GL_SHININESS, 10.0)
-        
-        if self.texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        
-        # Render each face separately to ensure proper normals and lighting
-        
-        # Front face (facing positive Z)
-        glBegin(GL_QUADS)
-        glNormal3f(0, 0, 1)
-        glTexCoord2f(0, 0); glVertex3f(x, 0, z)
-        glTexCoord2f(1, 0); glVertex3f(x + 1, 0, z)
-        glTexCoord2f(1, 1); glVertex3f(x + 1, height, z)
-        glTexCoord2f(0, 1); glVertex3f(x, height, z)
-        glEnd()
-        
-        # Back face (facing negative Z)
-        glBegin(GL_QUADS)
-        glNormal3f(0, 0, -1)
-        glTexCoord2f(0, 0); glVertex3f(x, 0, z + 1)
-        glTexCoord2f(1, 0); glVertex3f(x + 1, 0, z + 1)
-        glTexCoord2f(1, 1); glVertex3f(x + 1, height, z + 1)
-        glTexCoord2f(0, 1); glVertex3f(x, height, z + 1)
-        glEnd()
-        
-        # Left face (facing negative X)
-        glBegin(GL_QUADS)
-        glNormal3f(-1, 0, 0)
-        glTexCoord2f(0, 0); glVertex3f(x, 0, z)
-        glTexCoord2f(1, 0); glVertex3f(x, 0, z + 1)
-        glTexCoord2f(1, 1); glVertex3f(x, height, z + 1)
-        glTexCoord2f(0, 1); glVertex3f(x, height, z)
-        glEnd()
-        
-        # Right face (facing positive X)
-        glBegin(GL_QUADS)
-        glNormal3f(1, 0, 0)
-        glTexCoord2f(0, 0); glVertex3f(x + 1, 0, z)
-        glTexCoord2f(1, 0); glVertex3f(x + 1, 0, z + 1)
-        glTexCoord2f(1, 1); glVertex3f(x + 1, height, z + 1)
-        glTexCoord2f(0, 1); glVertex3f(x + 1, height, z)
-        glEnd()
-        
-        if self.texture_id:
-            glBindTexture(GL_TEXTURE_2D, 0)
-    
-    def render_floor(self, x, z, _camera_pos=None):
-        """Render a floor segment"""
-        # Set material properties for floors
-        glMaterialfv(GL_FRONT, GL_AMBIENT, [0.3, 0.3, 0.3, 1.0])
-        glMaterialfv(GL_FRONT, GL_DIFFUSE, [0.9, 0.9, 0.9, 1.0])
-        glMaterialfv(GL_FRONT, GL_SPECULAR, [0.1, 0.1, 0.1, 1.0])
-        glMaterialf(GL_FRONT, GL_SHININESS, 5.0)
-        
-        if self.floor_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.floor_texture_id)
-        
-        glBegin(GL_QUADS)
-        glNormal3f(0, 1, 0)
-        glTexCoord2f(0, 0); glVertex3f(x, 0, z)
-        glTexCoord2f(1, 0); glVertex3f(x + 1, 0, z)
-        glTexCoord2f(1, 1); glVertex3f(x + 1, 0, z + 1)
-        glTexCoord2f(0, 1); glVertex3f(x, 0, z + 1)
-        glEnd()
-        
-        if self.floor_texture_id:
-            glBindTexture(GL_TEXTURE_2D, 0)
-    
-    def render_ceiling(self, x, z, height=2.0, _camera_pos=None):
-        """Render a ceiling segment"""
-        # Set material properties for ceilings
-        glMaterialfv(GL_FRONT, GL_AMBIENT, [0.2, 0.2, 0.2, 1.0])
-        glMaterialfv(GL_FRONT, GL_DIFFUSE, [0.8, 0.8, 0.8, 1.0])
-        glMaterialfv(GL_FRONT, GL_SPECULAR, [0.1, 0.1, 0.1, 1.0])
-        glMaterialf(GL_FRONT, GL_SHININESS, 5.0)
-        
-        if self.ceiling_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.ceiling_texture_id)
-        glBegin(GL_QUADS)
-        glNormal3f(0, -1, 0)  # Normal pointing down
-        glTexCoord2f(0, 0); glVertex3f(x, height, z)
-        glTexCoord2f(1, 0); glVertex3f(x + 1, height, z)
-        glTexCoord2f(1, 1); glVertex3f(x + 1, height, z + 1)
-        glTexCoord2f(0, 1); glVertex3f(x, height, z + 1)
-        glEnd()
-        if self.ceiling_texture_id:
-            glBindTexture(GL_TEXTURE_2D, 0)
-    
+            for attr, _, _, _, _ in self.TEXTURE_MANIFEST:
+                setattr(self, attr, None)
+
+    def upload_texture(self, pixels, wrap=GL_REPEAT):
+        """Create a linear-filtered 2D texture from an (height, width, 4) RGBA array"""
+        texture_id = glGenTextures(1)
+        self.gl.bind_texture(texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, wrap)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, wrap)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, pixels.shape[1], pixels.shape[0], 0, GL_RGBA, GL_UNSIGNED_BYTE, np.ascontiguousarray(pixels))
+        return texture_id
+
     def render_torch(self, _x, _z, dx, dz, face_x, face_z, height=1.5, camera_pos=None):
-        """Render a torch on the correct face of the wall with blending enabled and billboarding"""
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        if self.torch_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.torch_texture_id)
-        
-        # Set material properties for torch
-        glMaterialfv(GL_FRONT, GL_AMBIENT, [0.6, 0.3, 0.1, 1.0])
-        glMaterialfv(GL_FRONT, GL_DIFFUSE, [1.0, 0.5, 0.2, 1.0])
-        glMaterialfv(GL_FRONT, GL_SPECULAR, [0.2, 0.1, 0.05, 1.0])
-        glMaterialf(GL_FRONT, GL_SHININESS, 10.0)
-        
+        """Queue a torch billboard in front of its wall face"""
         torch_size = 0.5
-        
-        # Calculate angle to player for billboarding
-        if camera_pos:
-            # Calculate direction from torch to player
-            to_player_x = camera_pos[0] - face_x
-            to_player_z = camera_pos[2] - face_z
-            
-            # Calculate angle to face player
-            angle = math.atan2(to_player_x, to_player_z)
-            
-            # Apply rotation to face player
-            glPushMatrix()
-            glTranslatef(face_x, height, face_z)
-            glRotatef(angle * 180 / math.pi, 0, 1, 0)
-            
-            # Render billboarded torch quad
-            glBegin(GL_QUADS)
-            glNormal3f(0, 0, 1)  # Always face forward
-            glTexCoord2f(0, 0); glVertex3f(-torch_size/2, -torch_size/2, 0)
-            glTexCoord2f(1, 0); glVertex3f(torch_size/2, -torch_size/2, 0)
-            glTexCoord2f(1, 1); glVertex3f(torch_size/2, torch_size/2, 0)
-            glTexCoord2f(0, 1); glVertex3f(-torch_size/2, torch_size/2, 0)
-            glEnd()
-            
-            glPopMatrix()
-        else:
-            # Fallback to wall-mounted torch if no camera position
-            glBegin(GL_QUADS)
-            if dx == 1:  # Torch on left face (walkable is to the right)
-                glNormal3f(1, 0, 0)
-                glTexCoord2f(0, 0); glVertex3f(face_x, height - torch_size/2, face_z - torch_size/2)
-                glTexCoord2f(1, 0); glVertex3f(face_x, height - torch_size/2, face_z + torch_size/2)
-                glTexCoord2f(1, 1); glVertex3f(face_x, height + torch_size/2, face_z + torch_size/2)
-                glTexCoord2f(0, 1); glVertex3f(face_x, height + torch_size/2, face_z - torch_size/2)
-            elif dx == -1:  # Torch on right face (walkable is to the left)
-                glNormal3f(-1, 0, 0)
-                glTexCoord2f(0, 0); glVertex3f(face_x, height - torch_size/2, face_z - torch_size/2)
-                glTexCoord2f(1, 0); glVertex3f(face_x, height - torch_size/2, face_z + torch_size/2)
-                glTexCoord2f(1, 1); glVertex3f(face_x, height + torch_size/2, face_z + torch_size/2)
-                glTexCoord2f(0, 1); glVertex3f(face_x, height + torch_size/2, face_z - torch_size/2)
-            elif dz == 1:  # Torch on front face (walkable is in front)
-                glNormal3f(0, 0, 1)
-                glTexCoord2f(0, 0); glVertex3f(face_x - torch_size/2, height - torch_size/2, face_z)
-                glTexCoord2f(1, 0); glVertex3f(face_x + torch_size/2, height - torch_size/2, face_z)
-                glTexCoord2f(1, 1); glVertex3f(face_x + torch_size/2, height + torch_size/2, face_z)
-                glTexCoord2f(0, 1); glVertex3f(face_x - torch_size/2, height + torch_size/2, face_z)
-            elif dz == -1:  # Torch on back face (walkable is behind)
-                glNormal3f(0, 0, -1)
-                glTexCoord2f(0, 0); glVertex3f(face_x - torch_size/2, height - torch_size/2, face_z)
-                glTexCoord2f(1, 0); glVertex3f(face_x + torch_size/2, height - torch_size/2, face_z)
-                glTexCoord2f(1, 1); glVertex3f(face_x + torch_size/2, height + torch_size/2, face_z)
-                glTexCoord2f(0, 1); glVertex3f(face_x - torch_size/2, height + torch_size/2, face_z)
-            glEnd()
-        
-        if self.torch_texture_id:
-            glBindTexture(GL_TEXTURE_2D, 0)
-        glDisable(GL_BLEND)
+        self.sprite_batch.add("torch", face_x, height - torch_size/2, face_z, torch_size, torch_size,
+                              bottom_t=0.0, material=self.SPRITE_MATERIALS["torch"])
     
     def render_chest(self, _x, _z, center_x, center_z, height=0.1, camera_pos=None):
-        """Render a chest with billboarding (always facing the player)"""
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        if self.chest_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.chest_texture_id)
-        
-        # Set material properties for chest
-        glMaterialfv(GL_FRONT, GL_AMBIENT, [0.4, 0.3, 0.2, 1.0])
-        glMaterialfv(GL_FRONT, GL_DIFFUSE, [0.8, 0.6, 0.4, 1.0])
-        glMaterialfv(GL_FRONT, GL_SPECULAR, [0.1, 0.1, 0.05, 1.0])
-        glMaterialf(GL_FRONT, GL_SHININESS, 5.0)
-        
+        """Queue a chest billboard (always facing the player)"""
         chest_size = 0.4
-        
-        # Calculate angle to player for billboarding
-        if camera_pos:
-            # Calculate direction from chest to player
-            to_player_x = camera_pos[0] - center_x
-            to_player_z = camera_pos[2] - center_z
-            
-            # Calculate angle to face player
-            angle = math.atan2(to_player_x, to_player_z)
-            
-            # Apply rotation to face player
-            glPushMatrix()
-            glTranslatef(center_x, height, center_z)
-            glRotatef(angle * 180 / math.pi, 0, 1, 0)
-            
-            # Render billboarded chest quad
-            glBegin(GL_QUADS)
-            glNormal3f(0, 0, 1)  # Always face forward
-            glTexCoord2f(0, 0); glVertex3f(-chest_size/2, 0, 0)
-            glTexCoord2f(1, 0); glVertex3f(chest_size/2, 0, 0)
-            glTexCoord2f(1, 1); glVertex3f(chest_size/2, chest_size, 0)
-            glTexCoord2f(0, 1); glVertex3f(-chest_size/2, chest_size, 0)
-            glEnd()
-            
-            glPopMatrix()
-        else:
-            # Fallback to simple quad if no camera position
-            glBegin(GL_QUADS)
-            glNormal3f(0, 0, 1)
-            glTexCoord2f(0, 0); glVertex3f(center_x - chest_size/2, height, center_z)
-            glTexCoord2f(1, 0); glVertex3f(center_x + chest_size/2, height, center_z)
-            glTexCoord2f(1, 1); glVertex3f(center_x + chest_size/2, height + chest_size, center_z)
-            glTexCoord2f(0, 1); glVertex3f(center_x - chest_size/2, height + chest_size, center_z)
-            glEnd()
-        
-        if self.chest_texture_id:
-            glBindTexture(GL_TEXTURE_2D, 0)
-        glDisable(GL_BLEND)
+        self.sprite_batch.add("chest", center_x, height, center_z, chest_size, chest_size,
+                              bottom_t=0.0, material=self.SPRITE_MATERIALS["chest"])
     
     def render_interact_prompt(self, screen_width, screen_height):
         """Render the interact prompt centered at the bottom of the screen"""
@@ -863,8 +1008,8 @@ class DungeonRenderer:
         glLoadIdentity()
         
         # Disable depth testing for 2D overlay
-        glDisable(GL_DEPTH_TEST)
-        glDisable(GL_LIGHTING)
+        self.gl.disable(GL_DEPTH_TEST)
+        self.gl.disable(GL_LIGHTING)
         
         # Set up orthographic projection for 2D rendering
         glMatrixMode(GL_PROJECTION)
@@ -874,11 +1019,11 @@ class DungeonRenderer:
         glMatrixMode(GL_MODELVIEW)
         
         # Enable blending for transparency
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        self.gl.enable(GL_BLEND)
+        self.gl.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
         
         # Bind interact texture
-        glBindTexture(GL_TEXTURE_2D, self.interact_texture_id)
+        self.gl.bind_texture(self.interact_texture_id)
         
         # Calculate interact prompt position and size
         prompt_width = 52  # Doubled from 26 to maintain aspect ratio
@@ -895,12 +1040,12 @@ class DungeonRenderer:
         glEnd()
         
         # Unbind texture
-        glBindTexture(GL_TEXTURE_2D, 0)
+        self.gl.bind_texture(0)
         
         # Restore OpenGL state
-        glDisable(GL_BLEND)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
+        self.gl.disable(GL_BLEND)
+        self.gl.enable(GL_DEPTH_TEST)
+        self.gl.enable(GL_LIGHTING)
         
         # Restore projection matrix
         glMatrixMode(GL_PROJECTION)
@@ -908,88 +1053,163 @@ class DungeonRenderer:
         glMatrixMode(GL_MODELVIEW)
         glPopMatrix()
     
-    def render_walls_batch(self, wall_positions, camera_pos=None):
-        """Render multiple walls in a single batch to reduce draw calls"""
-        if not wall_positions:
-            return
-        
-        # Set material properties for walls once
-        glMaterialfv(GL_FRONT, GL_AMBIENT, [0.3, 0.3, 0.3, 1.0])
-        glMaterialfv(GL_FRONT, GL_DIFFUSE, [0.9, 0.9, 0.9, 1.0])
-        glMaterialfv(GL_FRONT, GL_SPECULAR, [0.2, 0.2, 0.2, 1.0])
-        glMaterialf(GL_FRONT, GL_SHININESS, 10.0)
-        
-        if self.texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        
-        # Render all walls in one batch
-        for wall_x, wall_z in wall_positions:
-            # Front face (facing positive Z)
-            glBegin(GL_QUADS)
-            glNormal3f(0, 0, 1)
-            glTexCoord2f(0, 0); glVertex3f(wall_x, 0, wall_z)
-            glTexCoord2f(1, 0); glVertex3f(wall_x + 1, 0, wall_z)
-            glTexCoord2f(1, 1); glVertex3f(wall_x + 1, 2.0, wall_z)
-            glTexCoord2f(0, 1); glVertex3f(wall_x, 2.0, wall_z)
-            glEnd()
-            
-            # Back face (facing negative Z)
-            glBegin(GL_QUADS)
-            glNormal3f(0, 0, -1)
-            glTexCoord2f(0, 0); glVertex3f(wall_x, 0, wall_z + 1)
-            glTexCoord2f(1, 0); glVertex3f(wall_x + 1, 0, wall_z + 1)
-            glTexCoord2f(1, 1); glVertex3f(wall_x + 1, 2.0, wall_z + 1)
-            glTexCoord2f(0, 1); glVertex3f(wall_x, 2.0, wall_z + 1)
-            glEnd()
-            
-            # Left face (facing negative X)
-            glBegin(GL_QUADS)
-            glNormal3f(-1, 0, 0)
-            glTexCoord2f(0, 0); glVertex3f(wall_x, 0, wall_z)
-            glTexCoord2f(1, 0); glVertex3f(wall_x, 0, wall_z + 1)
-            glTexCoord2f(1, 1); glVertex3f(wall_x, 2.0, wall_z + 1)
-            glTexCoord2f(0, 1); glVertex3f(wall_x, 2.0, wall_z)
-            glEnd()
-            
-            # Right face (facing positive X)
-            glBegin(GL_QUADS)
-            glNormal3f(1, 0, 0)
-            glTexCoord2f(0, 0); glVertex3f(wall_x + 1, 0, wall_z)
-            glTexCoord2f(1, 0); glVertex3f(wall_x + 1, 0, wall_z + 1)
-            glTexCoord2f(1, 1); glVertex3f(wall_x + 1, 2.0, wall_z + 1)
-            glTexCoord2f(0, 1); glVertex3f(wall_x + 1, 2.0, wall_z)
-            glEnd()
-        
-        if self.texture_id:
-            glBindTexture(GL_TEXTURE_2D, 0)
-    
-    def render_floors_batch(self, floor_positions, camera_pos=None):
-        """Render multiple floors in a single batch"""
-        if not floor_positions:
+    # Billboard sprites packed into the atlas: name -> (path, flip vertically)
+    SPRITE_FILES = {
+        "torch": ("assets/torch.png", True),
+        "chest": ("assets/chest.png", True),
+        "skeleton": ("assets/skeleton.png", False),
+        "ghoul": ("assets/ghoul.png", False),
+        "ghost": ("assets/ghost.png", False),
+        "skeleton_sword": ("assets/wep_skeleton.png", False),
+        "rusty_sword": ("assets/wep_rusty.png", False),
+        "health_potion": ("assets/potion_health.png", False),
+        "magic_potion": ("assets/potion_magic.png", False),
+        "fire_scroll": ("assets/scroll_fire.png", False),
+        "magic_scroll": ("assets/scroll_magic.png", False),
+        "fireball": ("assets/fireball.png", False),
+        "magicball": ("assets/magicball.png", False),
+        "key": ("assets/key.png", True),
+    }
+    # Billboard (width, height) in world units, using each texture's aspect ratio
+    NPC_SPRITE_SIZES = {
+        "skeleton": (0.7, 0.7 * (984/718)),
+        "ghoul": (0.7, 0.7 * (1152/664)),
+        "ghost": (0.5, 0.5 * (1152/530)),  # Make ghost smaller
+    }
+    ITEM_SPRITE_SIZES = {
+        "skeleton_sword": (0.32, 0.32),
+        "rusty_sword": (0.32, 0.32),
+        "health_potion": (0.25, 0.25 * (160/110)),
+        "magic_potion": (0.25, 0.25 * (160/110)),
+        "fire_scroll": (0.4, 0.4 * (125/111)),
+        "magic_scroll": (0.4, 0.4 * (125/111)),
+        "key": (0.18, 0.18 * (670/344)),
+    }
+    # Lit sprite materials: (ambient, diffuse, specular, shininess); dropped items keep whatever material is current
+    SPRITE_MATERIALS = {
+        "torch": ((0.6, 0.3, 0.1, 1.0), (1.0, 0.5, 0.2, 1.0), (0.2, 0.1, 0.05, 1.0), 10.0),
+        "chest": ((0.4, 0.3, 0.2, 1.0), (0.8, 0.6, 0.4, 1.0), (0.1, 0.1, 0.05, 1.0), 5.0),
+        "fireball": ((0.8, 0.4, 0.1, 1.0), (1.0, 0.5, 0.2, 1.0), (0.2, 0.1, 0.05, 1.0), 10.0),
+        "magicball": ((0.3, 0.3, 0.8, 1.0), (0.5, 0.5, 1.0, 1.0), (0.2, 0.1, 0.05, 1.0), 10.0),
+    }
+
+    def load_sprite_images(self, pixels):
+        """Billboard sprite images from decoded pixels (path -> RGBA array), flipped as listed in SPRITE_FILES"""
+        images = {}
+        for name, (path, flip) in self.SPRITE_FILES.items():
+            images[name] = Image.fromarray(np.ascontiguousarray(pixels[path][::-1] if flip else pixels[path]))
+        return images
+
+    # Material properties for static level geometry: (ambient, diffuse, specular, shininess, texture attribute)
+    MESH_MATERIALS = {
+        "wall": ([0.3, 0.3, 0.3, 1.0], [0.9, 0.9, 0.9, 1.0], [0.2, 0.2, 0.2, 1.0], 10.0, "texture_id"),
+        "floor": ([0.3, 0.3, 0.3, 1.0], [0.9, 0.9, 0.9, 1.0], [0.1, 0.1, 0.1, 1.0], 5.0, "floor_texture_id"),
+        "ceiling": ([0.2, 0.2, 0.2, 1.0], [0.8, 0.8, 0.8, 1.0], [0.1, 0.1, 0.1, 1.0], 5.0, "ceiling_texture_id"),
+    }
+
+    def upload_level_mesh(self, level_mesh):
+        """Upload the baked level geometry to the GPU once per level"""
+        self.release_level_mesh()
+        self.level_mesh = level_mesh
+        use_vbo = bool(glGenBuffers)
+        for material in LevelMesh.MATERIALS:
+            vertices = level_mesh.vertices.get(material)
+            if vertices is None or not len(vertices):
+                continue
+            if use_vbo:
+                try:
+                    vbo = glGenBuffers(1)
+                    glBindBuffer(GL_ARRAY_BUFFER, vbo)
+                    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+                    glBindBuffer(GL_ARRAY_BUFFER, 0)
+                    self.mesh_buffers[material] = vbo
+                    continue
+                except GLError as e:
+                    print(f"VBO upload failed, falling back to display lists: {e}")
+                    use_vbo = False
+            # Display list fallback: one list per chunk so chunk culling still works
+            firsts = level_mesh.chunk_firsts[material]
+            counts = level_mesh.chunk_counts[material]
+            base = glGenLists(len(counts))
+            for chunk_id, (first, count) in enumerate(zip(firsts, counts)):
+                glNewList(base + chunk_id, GL_COMPILE)
+                if count:
+                    glInterleavedArrays(GL_T2F_N3F_V3F, 0, vertices[first:first + count])
+                    glDrawArrays(GL_QUADS, 0, int(count))
+                glEndList()
+            self._disable_mesh_arrays()
+            self.mesh_lists[material] = base
+        print(f"Level mesh uploaded: {', '.join(f'{m} {level_mesh.vertex_count(m) // 4} quads' for m in LevelMesh.MATERIALS)}"
+              f" ({'VBO' if self.mesh_buffers else 'display lists'})")
+
+    def release_level_mesh(self):
+        """Free the GPU resources of the current level mesh"""
+        if self.mesh_buffers:
+            glDeleteBuffers(len(self.mesh_buffers), list(self.mesh_buffers.values()))
+        if self.mesh_lists and self.level_mesh is not None:
+            num_chunks = self.level_mesh.chunks_x * self.level_mesh.chunks_z
+            for base in self.mesh_lists.values():
+                glDeleteLists(base, num_chunks)
+        self.mesh_buffers = {}
+        self.mesh_lists = {}
+        self.level_mesh = None
+
+    def _disable_mesh_arrays(self):
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+
+    def draw_level_mesh(self, material, chunks=None, visible_tiles=None):
+        """Draw one material of the level mesh with a single call, optionally limited to (chunk_x, chunk_z) chunks
+        and to quads touching a tile of the visible_tiles mask"""
+        mesh = self.level_mesh
+        if mesh is None or not mesh.vertex_count(material):
             return
-        
-        # Set material properties for floors once
-        glMaterialfv(GL_FRONT, GL_AMBIENT, [0.3, 0.3, 0.3, 1.0])
-        glMaterialfv(GL_FRONT, GL_DIFFUSE, [0.9, 0.9, 0.9, 1.0])
-        glMaterialfv(GL_FRONT, GL_SPECULAR, [0.1, 0.1, 0.1, 1.0])
-        glMaterialf(GL_FRONT, GL_SHININESS, 5.0)
-        
-        if self.floor_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.floor_texture_id)
-        
-        # Render all floors in one batch
-        for floor_x, floor_z in floor_positions:
-            glBegin(GL_QUADS)
-            glNormal3f(0, 1, 0)
-            glTexCoord2f(0, 0); glVertex3f(floor_x, 0, floor_z)
-            glTexCoord2f(1, 0); glVertex3f(floor_x + 1, 0, floor_z)
-            glTexCoord2f(1, 1); glVertex3f(floor_x + 1, 0, floor_z + 1)
-            glTexCoord2f(0, 1); glVertex3f(floor_x, 0, floor_z + 1)
-            glEnd()
-        
-        if self.floor_texture_id:
-            glBindTexture(GL_TEXTURE_2D, 0)
-    
+        ambient, diffuse, specular, shininess, texture_attr = self.MESH_MATERIALS[material]
+        self.gl.material(ambient, diffuse, specular, shininess)
+        texture_id = getattr(self, texture_attr)
+        if texture_id:
+            self.gl.bind_texture(texture_id)
+
+        if chunks is None:
+            chunk_ids = None
+        else:
+            chunk_ids = mesh.chunk_ids(chunks)
+            chunk_ids = chunk_ids[mesh.chunk_counts[material][chunk_ids] > 0]
+
+        if material in self.mesh_buffers:
+            glBindBuffer(GL_ARRAY_BUFFER, self.mesh_buffers[material])
+            glInterleavedArrays(GL_T2F_N3F_V3F, 0, ctypes.c_void_p(0))
+            if chunk_ids is None and visible_tiles is None:
+                glDrawArrays(GL_QUADS, 0, mesh.vertex_count(material))
+            else:
+                if chunk_ids is None:
+                    chunk_ids = np.nonzero(mesh.chunk_counts[material])[0]
+                if visible_tiles is not None:
+                    firsts, counts = mesh.visible_ranges(material, chunk_ids, visible_tiles)
+                else:
+                    firsts = np.ascontiguousarray(mesh.chunk_firsts[material][chunk_ids], dtype=np.int32)
+                    counts = np.ascontiguousarray(mesh.chunk_counts[material][chunk_ids], dtype=np.int32)
+                if len(firsts):
+                    glMultiDrawArrays(GL_QUADS, firsts, counts, len(firsts))
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+            self._disable_mesh_arrays()
+        elif material in self.mesh_lists:
+            if chunk_ids is None:
+                chunk_ids = np.nonzero(mesh.chunk_counts[material])[0]
+            if visible_tiles is not None:
+                # Display lists are per chunk, so line-of-sight culling works a chunk at a time
+                size = mesh.chunk_size
+                chunk_ids = np.array([chunk_id for chunk_id in chunk_ids
+                                      if visible_tiles[(chunk_id // mesh.chunks_x) * size:(chunk_id // mesh.chunks_x + 1) * size,
+                                                       (chunk_id % mesh.chunks_x) * size:(chunk_id % mesh.chunks_x + 1) * size].any()],
+                                     dtype=np.int64)
+            if len(chunk_ids):
+                glCallLists((self.mesh_lists[material] + chunk_ids).astype(np.uint32))
+
+        if texture_id:
+            self.gl.bind_texture(0)
+
     def create_spatial_grid(self, dungeon_grid, torch_positions, chest_positions, chunk_size=8):
         """Create a spatial grid to organize objects into chunks for efficient rendering"""
         self.chunk_size = chunk_size
@@ -999,19 +1219,9 @@ class DungeonRenderer:
         self.chunks_z = (self.grid_height + chunk_size - 1) // chunk_size
         
         # Initialize chunk storage
-        self.wall_chunks = [[[] for _ in range(self.chunks_x)] for _ in range(self.chunks_z)]
         self.torch_chunks = [[[] for _ in range(self.chunks_x)] for _ in range(self.chunks_z)]
         self.chest_chunks = [[[] for _ in range(self.chunks_x)] for _ in range(self.chunks_z)]
         
-        # Organize walls into chunks
-        for z in range(self.grid_height):
-            for x in range(self.grid_width):
-                if dungeon_grid[z][x] == 1:  # Wall
-                    chunk_x = x // chunk_size
-                    chunk_z = z // chunk_size
-                    if 0 <= chunk_x < self.chunks_x and 0 <= chunk_z < self.chunks_z:
-                        self.wall_chunks[chunk_z][chunk_x].append((x, z))
-        
         # Organize torches into chunks
         if torch_positions:
             for torch_x, torch_z, dx, dz, face_x, face_z in torch_positions:
@@ -1027,6 +1237,31 @@ class DungeonRenderer:
                 chunk_z = int(center_z) // chunk_size
                 if 0 <= chunk_x < self.chunks_x and 0 <= chunk_z < self.chunks_z:
                     self.chest_chunks[chunk_z][chunk_x].append((chest_x, chest_z, center_x, center_z))
+        
+        # Object centres per chunk as NumPy arrays for vectorized culling
+        self.torch_center_chunks = [[np.array([(t[4], t[5]) for t in row_chunk], dtype=np.float64).reshape(-1, 2)
+                                     for row_chunk in row] for row in self.torch_chunks]
+        self.chest_center_chunks = [[np.array([(c[2], c[3]) for c in row_chunk], dtype=np.float64).reshape(-1, 2)
+                                     for row_chunk in row] for row in self.chest_chunks]
+        
+        # Chunk centres and bounding radius for culling static geometry a chunk at a time
+        chunk_x, chunk_z = np.meshgrid(np.arange(self.chunks_x), np.arange(self.chunks_z))
+        self.chunk_centers = np.stack([(chunk_x.ravel() + 0.5) * chunk_size, (chunk_z.ravel() + 0.5) * chunk_size], axis=1)
+        self.chunk_radius = chunk_size * math.sqrt(2) / 2
+        
+        # Line-of-sight culling through the maze
+        self.tile_visibility = TileVisibility(dungeon_grid)
+    
+    def gather_chunk_objects(self, object_chunks, center_chunks, chunks):
+        """Collect the objects of several chunks together with one (n, 2) array of their centres"""
+        objects = []
+        centers = []
+        for chunk_x, chunk_z in chunks:
+            objects.extend(object_chunks[chunk_z][chunk_x])
+            centers.append(center_chunks[chunk_z][chunk_x])
+        if not centers:
+            return objects, np.empty((0, 2))
+        return objects, np.concatenate(centers)
     
     def get_nearby_chunks(self, camera_pos, chunk_size=8):
         """Get the current chunk and adjacent chunks for the player's position"""
@@ -1045,316 +1280,155 @@ class DungeonRenderer:
                     0 <= new_chunk_z < self.chunks_z):
                     nearby_chunks.append((new_chunk_x, new_chunk_z))
         
-        return nearby_chunks
-
-    def is_in_frustum(self, object_x, object_z, camera_pos, camera_rot, fov_angle=120.0, max_distance=10.0):
-        """Check if an object is within the camera's view frustum"""
-        if not camera_pos:
-            return True
-        
-        # Calculate distance to object
-        dx = object_x - camera_pos[0]
-        dz = object_z - camera_pos[2]
-        distance = math.sqrt(dx*dx + dz*dz)
-        
-        # Check if object is too far away
-        if distance > max_distance:
-            return False
-        
-        # Calculate angle to object relative to camera forward direction
-        # Camera forward is -sin(yaw), -cos(yaw) based on your camera setup
-        camera_forward_x = -math.sin(camera_rot[1])
-        camera_forward_z = -math.cos(camera_rot[1])
-        
-        # Normalize the direction to object
-        if distance > 0:
-            object_dir_x = dx / distance
-            object_dir_z = dz / distance
-        else:
-            return True  # Object is at camera position
-        
-        # Calculate dot product between camera forward and object direction
-        dot_product = camera_forward_x * object_dir_x + camera_forward_z * object_dir_z
-        
-        # Convert FOV to radians and calculate the cosine of half the FOV
-        fov_rad = math.radians(fov_angle)
-        cos_half_fov = math.cos(fov_rad / 2)
-        
-        # Add a large buffer to prevent popping (make the frustum much wider)
-        cos_half_fov -= 0.3  # This makes the frustum about 30% wider
-        
-        # Object is in frustum if dot product is greater than cosine of half FOV
-        return dot_product > cos_half_fov
+        return nearby_chunks
+
+    def frustum_mask(self, object_x, object_z, camera_pos, camera_rot, fov_angle=120.0, max_distance=10.0):
+        """Boolean mask of the object centres within max_distance and inside the (widened) view cone"""
+        object_x = np.asarray(object_x, dtype=np.float64)
+        object_z = np.asarray(object_z, dtype=np.float64)
+        if not camera_pos:
+            return np.ones(object_x.shape, dtype=bool)
+        dx = object_x - camera_pos[0]
+        dz = object_z - camera_pos[2]
+        distance = np.sqrt(dx*dx + dz*dz)
+        if camera_rot is None:
+            return distance <= max_distance
+        # Half-FOV cosine widened by 0.3 against popping, compared without normalizing: dot > cos * distance
+        cos_half_fov = math.cos(math.radians(fov_angle) / 2) - 0.3
+        dot = dx * -math.sin(camera_rot[1]) + dz * -math.cos(camera_rot[1])
+        return (distance <= max_distance) & ((distance == 0) | (dot > cos_half_fov * distance))
+
+    def tiles_visible(self, object_x, object_z):
+        """Boolean mask of which positions lie on a tile visible this frame"""
+        object_x = np.asarray(object_x, dtype=np.float64)
+        if self.visible_tiles is None:
+            return np.ones(object_x.shape, dtype=bool)
+        tile_x = np.asarray(object_x, dtype=np.int64)
+        tile_z = np.asarray(object_z, dtype=np.int64)
+        height, width = self.visible_tiles.shape
+        inside = (tile_x >= 0) & (tile_x < width) & (tile_z >= 0) & (tile_z < height)
+        return inside & self.visible_tiles[np.clip(tile_z, 0, height - 1), np.clip(tile_x, 0, width - 1)]
+
+    def cull_chunks(self, chunks, camera_pos, camera_rot, fov_angle=120.0):
+        """Drop (chunk_x, chunk_z) chunks whose bounding circle lies entirely outside the view cone"""
+        if not chunks or not camera_pos or camera_rot is None:
+            return chunks
+        ids = np.array([chunk_z * self.chunks_x + chunk_x for chunk_x, chunk_z in chunks])
+        dx = self.chunk_centers[ids, 0] - camera_pos[0]
+        dz = self.chunk_centers[ids, 1] - camera_pos[2]
+        distance = np.maximum(np.sqrt(dx*dx + dz*dz), 1e-6)
+        dot = (dx * -math.sin(camera_rot[1]) + dz * -math.cos(camera_rot[1])) / distance
+        # Widen the cone by the angle the chunk's bounding circle subtends
+        half_fov = math.acos(max(-1.0, math.cos(math.radians(fov_angle) / 2) - 0.3))
+        margin = np.arcsin(np.clip(self.chunk_radius / distance, 0.0, 1.0))
+        visible = (distance <= self.chunk_radius) | (np.arccos(np.clip(dot, -1.0, 1.0)) < half_fov + margin)
+        return [chunk for chunk, keep in zip(chunks, visible) if keep]
 
     def render_dungeon(self, dungeon_grid, camera_pos=None, torch_positions=None, chest_positions=None, camera_rot=None):
         """Render the entire dungeon using spatial partitioning and batch rendering"""
         # Set texture environment to MODULATE for world rendering
-        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+        self.gl.tex_env_mode(GL_MODULATE)
         # Create spatial grid if not already created
-        if not hasattr(self, 'wall_chunks'):
+        if not hasattr(self, 'torch_chunks'):
             self.create_spatial_grid(dungeon_grid, torch_positions, chest_positions)
         
-        # Get nearby chunks to render
-        nearby_chunks = self.get_nearby_chunks(camera_pos)
-        
-        # Collect visible walls for batch rendering
-        visible_walls = []
-        visible_floors = []
+        # Bake the static level geometry if it has not been uploaded yet
+        if self.level_mesh is None:
+            self.upload_level_mesh(LevelMesh(dungeon_grid))
+        if self.pvs is None:
+            self.pvs = PotentiallyVisibleSet(dungeon_grid)
         
-        if camera_pos and camera_rot and nearby_chunks:
-            wall_render_distance = 6.0  # Only render walls within 6 units
-            for chunk_x, chunk_z in nearby_chunks:
-                for wall_x, wall_z in self.wall_chunks[chunk_z][chunk_x]:
-                    # Calculate distance from wall center to player
-                    wall_center_x = wall_x + 0.5
-                    wall_center_z = wall_z + 0.5
-                    distance = math.sqrt((wall_center_x - camera_pos[0])**2 + (wall_center_z - camera_pos[2])**2)
-                    if distance <= wall_render_distance and self.is_in_frustum(wall_center_x, wall_center_z, camera_pos, camera_rot):
-                        visible_walls.append((wall_x, wall_z))
-        
-        # Collect visible floors for batch rendering (with distance check)
-        if camera_pos:
-            floor_render_distance = 6.0  # Only render floors within 6 units
-            for z in range(len(dungeon_grid)):
-                for x in range(len(dungeon_grid[0])):
-                    if dungeon_grid[z][x] == 0:  # Floor
-                        # Calculate distance from floor center to player
-                        floor_center_x = x + 0.5
-                        floor_center_z = z + 0.5
-                        distance = math.sqrt((floor_center_x - camera_pos[0])**2 + (floor_center_z - camera_pos[2])**2)
-                        if distance <= floor_render_distance:
-                            visible_floors.append((x, z))
+        # Get nearby chunks to render, dropping those behind the camera
+        nearby_chunks = self.get_nearby_chunks(camera_pos)
+        visible_chunks = self.cull_chunks(nearby_chunks, camera_pos, camera_rot)
+        
+        # Find the tiles actually in sight, so walls hidden behind other walls are skipped
+        if camera_pos and camera_rot:
+            # Look up the precomputed set for the camera tile, casting rays only if it has none
+            self.visible_tiles = self.pvs.visible_tiles(camera_pos, camera_rot)
+            if self.visible_tiles is None:
+                self.visible_tiles = self.tile_visibility.visible_tiles(camera_pos, camera_rot)
         else:
-            # Fallback: render all floors if no camera position
-            for z in range(len(dungeon_grid)):
-                for x in range(len(dungeon_grid[0])):
-                    if dungeon_grid[z][x] == 0:  # Floor
-                        visible_floors.append((x, z))
+            self.visible_tiles = None
         
-        # Render walls in batch
-        self.render_walls_batch(visible_walls, camera_pos)
+        # Render walls, floors and ceilings from visible chunks (one draw call each)
+        self.draw_level_mesh("wall", visible_chunks if camera_pos else None, self.visible_tiles)
+        self.draw_level_mesh("floor", visible_chunks if camera_pos else None, self.visible_tiles)
+        self.draw_level_mesh("ceiling", visible_chunks if camera_pos else None, self.visible_tiles)
         
-        # Render floors in batch
-        self.render_floors_batch(visible_floors, camera_pos)
-        
-        # Render all ceilings (always visible)
-        for z in range(len(dungeon_grid)):
-            for x in range(len(dungeon_grid[0])):
-                self.render_ceiling(x, z, _camera_pos=camera_pos)
-        
-        # Render torches only from nearby chunks
+        # Render torches only from nearby chunks (one vectorized culling pass)
         if camera_pos and camera_rot and nearby_chunks:
             render_distance = 5.0  # Only render torches within 5 units
-            for chunk_x, chunk_z in nearby_chunks:
-                for torch_data in self.torch_chunks[chunk_z][chunk_x]:
-                    torch_x, torch_z, dx, dz, face_x, face_z = torch_data
-                    distance = math.sqrt((face_x - camera_pos[0])**2 + (face_z - camera_pos[2])**2)
-                    if distance <= render_distance and self.is_in_frustum(face_x, face_z, camera_pos, camera_rot):
-                        self.render_torch(torch_x, torch_z, dx, dz, face_x, face_z, camera_pos=camera_pos)
-        
-        # Render chests only from nearby chunks
+            torches, centers = self.gather_chunk_objects(self.torch_chunks, self.torch_center_chunks, visible_chunks)
+            visible = self.frustum_mask(centers[:, 0], centers[:, 1], camera_pos, camera_rot, max_distance=render_distance)
+            visible &= self.tiles_visible(centers[:, 0], centers[:, 1])
+            for i in np.flatnonzero(visible):
+                torch_x, torch_z, dx, dz, face_x, face_z = torches[i]
+                self.render_torch(torch_x, torch_z, dx, dz, face_x, face_z, camera_pos=camera_pos)
+            self.sprite_batch.flush(camera_pos)
+        
+        # Render chests only from nearby chunks (one vectorized culling pass)
         if camera_pos and camera_rot and nearby_chunks:
             render_distance = 5.0  # Only render chests within 5 units
-            for chunk_x, chunk_z in nearby_chunks:
-                for chest_data in self.chest_chunks[chunk_z][chunk_x]:
-                    chest_x, chest_z, center_x, center_z = chest_data
-                    distance = math.sqrt((center_x - camera_pos[0])**2 + (center_z - camera_pos[2])**2)
-                    if distance <= render_distance and self.is_in_frustum(center_x, center_z, camera_pos, camera_rot):
-                        self.render_chest(chest_x, chest_z, center_x, center_z, camera_pos=camera_pos)
+            chests, centers = self.gather_chunk_objects(self.chest_chunks, self.chest_center_chunks, visible_chunks)
+            visible = self.frustum_mask(centers[:, 0], centers[:, 1], camera_pos, camera_rot, max_distance=render_distance)
+            visible &= self.tiles_visible(centers[:, 0], centers[:, 1])
+            for i in np.flatnonzero(visible):
+                chest_x, chest_z, center_x, center_z = chests[i]
+                self.render_chest(chest_x, chest_z, center_x, center_z, camera_pos=camera_pos)
+            self.sprite_batch.flush(camera_pos)
 
     def render_npc(self, npc, camera_pos=None):
+        """Queue an NPC billboard; flashing NPCs are drawn additively in red"""
         if not npc.is_alive:
             return
-        glEnable(GL_BLEND)
+        width, height = self.NPC_SPRITE_SIZES.get(npc.npc_type, self.NPC_SPRITE_SIZES["skeleton"])
         if npc.flash_timer > 0:
-            glBlendFunc(GL_ONE, GL_ONE)
+            self.sprite_batch.add(npc.npc_type, npc.center_x, 0.1, npc.center_z, width, height,
+                                  color=(2.0, 0.1, 0.1, 1.0), blend=SpriteBatch.ADDITIVE, lit=False)
         else:
-            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        # Choose texture based on type
-        if npc.npc_type == "ghoul" and self.ghoul_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.ghoul_texture_id)
-        elif npc.npc_type == "ghost" and self.ghost_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.ghost_texture_id)
-        elif npc.npc_type == "skeleton" and self.skeleton_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.skeleton_texture_id)
-        else:
-            glBindTexture(GL_TEXTURE_2D, 0)
-        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
-        if npc.flash_timer > 0:
-            glColor4f(2.0, 0.1, 0.1, 1.0)
-        else:
-            glColor4f(1.0, 1.0, 1.0, 1.0)
-        glDisable(GL_LIGHTING)
-        width = 0.7
-        # Use correct aspect ratios for each NPC type
-        if npc.npc_type == "ghoul":
-            height = width * (1152/664)  # 664x1152 aspect ratio
-        elif npc.npc_type == "ghost":
-            width = 0.5  # Make ghost smaller
-            height = width * (1152/530)  # 530x1152 aspect ratio
-        else:  # skeleton
-            height = width * (984/718)   # 718x984 aspect ratio
-        if camera_pos:
-            to_player_x = camera_pos[0] - npc.center_x
-            to_player_z = camera_pos[2] - npc.center_z
-            angle = math.atan2(to_player_x, to_player_z)
-            glPushMatrix()
-            glTranslatef(npc.center_x, 0.1, npc.center_z)
-            glRotatef(angle * 180 / math.pi, 0, 1, 0)
-            glBegin(GL_QUADS)
-            glNormal3f(0, 0, 1)
-            glTexCoord2f(0, 1); glVertex3f(-width/2, 0, 0)
-            glTexCoord2f(1, 1); glVertex3f(width/2, 0, 0)
-            glTexCoord2f(1, 0); glVertex3f(width/2, height, 0)
-            glTexCoord2f(0, 0); glVertex3f(-width/2, height, 0)
-            glEnd()
-            glPopMatrix()
-        else:
-            glBegin(GL_QUADS)
-            glNormal3f(0, 0, 1)
-            glTexCoord2f(0, 1); glVertex3f(npc.center_x - width/2, 0, npc.center_z)
-            glTexCoord2f(1, 1); glVertex3f(npc.center_x + width/2, 0, npc.center_z)
-            glTexCoord2f(1, 0); glVertex3f(npc.center_x + width/2, height, npc.center_z)
-            glTexCoord2f(0, 0); glVertex3f(npc.center_x - width/2, height, npc.center_z)
-            glEnd()
-        glEnable(GL_LIGHTING)
-        glColor4f(1.0, 1.0, 1.0, 1.0)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        glDisable(GL_BLEND)
+            self.sprite_batch.add(npc.npc_type, npc.center_x, 0.1, npc.center_z, width, height, lit=False)
 
     def render_npcs(self, npcs, camera_pos=None, camera_rot=None):
         if not npcs or camera_pos is None:
             return
         max_distance = 10.0
-        for npc in npcs:
-            dist = math.sqrt((npc.center_x - camera_pos[0])**2 + (npc.center_z - camera_pos[2])**2)
-            if dist > max_distance:
-                continue
-            if camera_rot is not None and not self.is_in_frustum(npc.center_x, npc.center_z, camera_pos, camera_rot, max_distance=max_distance):
-                continue
-            self.render_npc(npc, camera_pos=camera_pos)
+        centers_x = np.fromiter((npc.center_x for npc in npcs), dtype=np.float64, count=len(npcs))
+        centers_z = np.fromiter((npc.center_z for npc in npcs), dtype=np.float64, count=len(npcs))
+        visible = self.frustum_mask(centers_x, centers_z, camera_pos, camera_rot, max_distance=max_distance)
+        visible &= self.tiles_visible(centers_x, centers_z)
+        for i in np.flatnonzero(visible):
+            self.render_npc(npcs[i], camera_pos=camera_pos)
+        self.sprite_batch.flush(camera_pos)
 
     def render_dropped_item(self, item, camera_pos=None):
+        """Queue a dropped item billboard"""
         # Only render if not collected
-        if item.collected:
-            return
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        # Choose texture based on item type
-        if item.item_type == 'skeleton_sword' and self.skeleton_sword_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.skeleton_sword_texture_id)
-            item_size = 0.32  # Smaller dropped skeleton sword
-            item_height = item_size  # 1:1 aspect ratio (125x125)
-        elif item.item_type == 'rusty_sword' and self.weapon_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.weapon_texture_id)  # wep_rusty.png (hotbar icon)
-            item_size = 0.32  # Smaller dropped rusty sword
-            item_height = item_size  # 1:1 aspect ratio (125x125)
-        elif item.item_type == 'health_potion' and self.potion_health_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.potion_health_texture_id)
-            item_size = 0.25
-            item_height = item_size * (160/110)  # Potion aspect ratio (110x160)
-        elif item.item_type == 'magic_potion' and self.potion_magic_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.potion_magic_texture_id)
-            item_size = 0.25
-            item_height = item_size * (160/110)  # Potion aspect ratio (110x160)
-        elif item.item_type == 'fire_scroll' and self.scroll_fire_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.scroll_fire_texture_id)
-            item_size = 0.4
-            item_height = item_size * (125/111)  # Scroll aspect ratio (111x125)
-        elif item.item_type == 'magic_scroll' and hasattr(self, 'scroll_magic_texture_id') and self.scroll_magic_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.scroll_magic_texture_id)
-            item_size = 0.4
-            item_height = item_size * (125/111)  # Same aspect ratio as fire scroll
-        elif item.item_type == 'key' and hasattr(self, 'key_texture_id') and self.key_texture_id:
-            glBindTexture(GL_TEXTURE_2D, self.key_texture_id)
-            item_size = 0.18  # Small-ish
-            item_height = item_size * (670/344)  # Key aspect ratio
-        elif item.item_type == 'key':
-            return
-        else:
+        if item.collected or item.item_type not in self.ITEM_SPRITE_SIZES:
             return
-        # Billboarded sprite
-        y = 0.15
-        angle = 0
-        if camera_pos:
-            to_player_x = camera_pos[0] - item.x
-            to_player_z = camera_pos[2] - item.z
-            angle = math.atan2(to_player_x, to_player_z)
-        glPushMatrix()
-        glTranslatef(item.x, y, item.z)
-        glRotatef(angle * 180 / math.pi, 0, 1, 0)
-        glBegin(GL_QUADS)
-        glNormal3f(0, 0, 1)
-        glTexCoord2f(0, 1); glVertex3f(-item_size/2, 0, 0)
-        glTexCoord2f(1, 1); glVertex3f(item_size/2, 0, 0)
-        glTexCoord2f(1, 0); glVertex3f(item_size/2, item_height, 0)
-        glTexCoord2f(0, 0); glVertex3f(-item_size/2, item_height, 0)
-        glEnd()
-        glPopMatrix()
-        glBindTexture(GL_TEXTURE_2D, 0)
-        glDisable(GL_BLEND)
+        width, height = self.ITEM_SPRITE_SIZES[item.item_type]
+        self.sprite_batch.add(item.item_type, item.x, 0.15, item.z, width, height)
 
     def render_dropped_items(self, dropped_items, camera_pos=None):
         for item in dropped_items:
             self.render_dropped_item(item, camera_pos)
+        self.sprite_batch.flush(camera_pos)
 
-    def render_fireball(self, fireball, camera_pos=None):
-        """Render a fireball as a billboarded sprite"""
-        if not fireball.active:
-            return
-        # Choose texture and color based on fireball type
-        if hasattr(fireball, 'is_magic') and fireball.is_magic:
-            if not hasattr(self, 'magicball_texture_id') or not self.magicball_texture_id:
-                return
-            texture_id = self.magicball_texture_id
-            color_ambient = [0.3, 0.3, 0.8, 1.0]
-            color_diffuse = [0.5, 0.5, 1.0, 1.0]
-        else:
-            if not self.fireball_texture_id:
-                return
-            texture_id = self.fireball_texture_id
-            color_ambient = [0.8, 0.4, 0.1, 1.0]
-            color_diffuse = [1.0, 0.5, 0.2, 1.0]
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
-        # Set material properties
-        glMaterialfv(GL_FRONT, GL_AMBIENT, color_ambient)
-        glMaterialfv(GL_FRONT, GL_DIFFUSE, color_diffuse)
-        glMaterialfv(GL_FRONT, GL_SPECULAR, [0.2, 0.1, 0.05, 1.0])
-        glMaterialf(GL_FRONT, GL_SHININESS, 10.0)
+    def render_fireballs(self, projectiles, camera_pos=None):
+        """Render all active projectiles in a ProjectilePool"""
         # Fireball size and aspect ratio (109x125)
         fireball_size = 0.4
-        fireball_height = fireball_size * (125/109)
-        y = 0.5
-        angle = 0
-        if camera_pos:
-            to_player_x = camera_pos[0] - fireball.x
-            to_player_z = camera_pos[2] - fireball.z
-            angle = math.atan2(to_player_x, to_player_z)
-        glPushMatrix()
-        glTranslatef(fireball.x, y, fireball.z)
-        glRotatef(angle * 180 / math.pi, 0, 1, 0)
-        glBegin(GL_QUADS)
-        glNormal3f(0, 0, 1)
-        glTexCoord2f(0, 1); glVertex3f(-fireball_size/2, 0, 0)
-        glTexCoord2f(1, 1); glVertex3f(fireball_size/2, 0, 0)
-        glTexCoord2f(1, 0); glVertex3f(fireball_size/2, fireball_height, 0)
-        glTexCoord2f(0, 0); glVertex3f(-fireball_size/2, fireball_height, 0)
-        glEnd()
-        glPopMatrix()
-        glBindTexture(GL_TEXTURE_2D, 0)
-        glDisable(GL_BLEND)
-
-    def render_fireballs(self, fireballs, camera_pos=None):
-        """Render all active fireballs"""
-        for fireball in fireballs:
-            self.render_fireball(fireball, camera_pos)
+        for row in range(projectiles.count):
+            if projectiles.active[row]:
+                sprite = "magicball" if projectiles.is_magic[row] else "fireball"
+                self.sprite_batch.add(sprite, float(projectiles.x[row]), 0.5, float(projectiles.z[row]),
+                                      fireball_size, fireball_size * (125/109), material=self.SPRITE_MATERIALS[sprite])
+        self.sprite_batch.flush(camera_pos)
 
     def render_trapdoor(self, trapdoor, camera_pos=None):
         """Render a trapdoor as part of the floor, facing upward"""
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        self.gl.enable(GL_BLEND)
+        self.gl.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
         
         # Choose texture based on state
         if trapdoor.is_unlocked:
@@ -1366,13 +1440,10 @@ class DungeonRenderer:
                 return
             texture_id = self.trapdoor_closed_texture_id
         
-        glBindTexture(GL_TEXTURE_2D, texture_id)
+        self.gl.bind_texture(texture_id)
         
         # Set material properties for trapdoor
-        glMaterialfv(GL_FRONT, GL_AMBIENT, [0.4, 0.3, 0.2, 1.0])
-        glMaterialfv(GL_FRONT, GL_DIFFUSE, [0.8, 0.6, 0.4, 1.0])
-        glMaterialfv(GL_FRONT, GL_SPECULAR, [0.1, 0.1, 0.05, 1.0])
-        glMaterialf(GL_FRONT, GL_SHININESS, 5.0)
+        self.gl.material([0.4, 0.3, 0.2, 1.0], [0.8, 0.6, 0.4, 1.0], [0.1, 0.1, 0.05, 1.0], 5.0)
         
         # Trapdoor size - make it fit within a single tile
         trapdoor_size = 0.9  # Slightly smaller than 1.0 to fit within tile
@@ -1387,36 +1458,710 @@ class DungeonRenderer:
         glTexCoord2f(0, 1); glVertex3f(trapdoor.center_x - trapdoor_size/2, y, trapdoor.center_z + trapdoor_size/2)
         glEnd()
         
-        glBindTexture(GL_TEXTURE_2D, 0)
-        glDisable(GL_BLEND)
+        self.gl.bind_texture(0)
+        self.gl.disable(GL_BLEND)
+
+def astar(grid, start, goal, blocked=None):
+    """A* pathfinding for a 2D grid. Returns a list of (x, z) tiles from start to goal (inclusive), or [] if no path.
 
-def astar(grid, start, goal):
-    """A* pathfinding for a 2D grid. Returns a list of (x, z) tiles from start to goal (inclusive), or [] if no path."""
+    blocked is the grid's flat z * width + x wall mask (nonzero = wall); callers that search the same grid
+    repeatedly should build it once (see HierarchicalPathfinder.blocked) instead of paying O(map) per query.
+    """
+    if start == goal:
+        return [start]
     width, height = len(grid[0]), len(grid)
-    def neighbors(pos):
-        x, z = pos
-        for dx, dz in [(-1,0),(1,0),(0,-1),(0,1)]:
-            nx, nz = x+dx, z+dz
-            if 0 <= nx < width and 0 <= nz < height and grid[nz][nx] == 0:
-                yield (nx, nz)
-    def heuristic(a, b):
-        return abs(a[0]-b[0]) + abs(a[1]-b[1])
-    open_set = []
-    heapq.heappush(open_set, (0 + heuristic(start, goal), 0, start, [start]))
-    visited = set()
+    start_x, start_z = start
+    goal_x, goal_z = goal
+    if not (0 <= start_x < width and 0 <= start_z < height and 0 <= goal_x < width and 0 <= goal_z < height):
+        return []
+    # Flat state indexed by z * width + x; zero-initialised so allocation stays cheap on big maps
+    size = width * height
+    if blocked is None:
+        blocked = ((np.asarray(grid) & TILE_WALL) != 0).tobytes()
+    g_score = array('i', bytes(4 * size))  # Best cost + 1, 0 = not reached yet
+    parent = array('i', bytes(4 * size))  # Parent index + 1, 0 = none
+    closed = bytearray(size)
+    start_index = start_z * width + start_x
+    goal_index = goal_z * width + goal_x
+    g_score[start_index] = 1
+    start_h = abs(start_x - goal_x) + abs(start_z - goal_z)
+    # Ties on f go to the lower heuristic, i.e. the node that has got closer to the goal
+    open_set = [(start_h, start_h, start_index)]
     while open_set:
-        est_total, cost, current, path = heapq.heappop(open_set)
-        if current == goal:
+        _, _, current = heapq.heappop(open_set)
+        if current == goal_index:
+            # Walk the parent pointers back once, at the end
+            path = []
+            while current != start_index:
+                path.append((current % width, current // width))
+                current = parent[current] - 1
+            path.append(start)
+            path.reverse()
             return path
-        if current in visited:
+        if closed[current]:
             continue
-        visited.add(current)
-        for neighbor in neighbors(current):
-            if neighbor not in visited:
-                heapq.heappush(open_set, (cost+1+heuristic(neighbor, goal), cost+1, neighbor, path+[neighbor]))
+        closed[current] = 1
+        x, z = current % width, current // width
+        next_g = g_score[current] + 1
+        for nx, nz, neighbor in ((x - 1, z, current - 1), (x + 1, z, current + 1),
+                                 (x, z - 1, current - width), (x, z + 1, current + width)):
+            if not (0 <= nx < width and 0 <= nz < height) or closed[neighbor] or blocked[neighbor]:
+                continue
+            known = g_score[neighbor]
+            if known and known <= next_g:
+                continue
+            g_score[neighbor] = next_g
+            parent[neighbor] = current + 1
+            h = abs(nx - goal_x) + abs(nz - goal_z)
+            heapq.heappush(open_set, (next_g - 1 + h, h, neighbor))
     return []
 
-class NPC:
+class FlowField:
+    """Breadth-first distance field from the player's tile, shared by every NPC chasing the player"""
+    NEIGHBOR_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))  # Same order as astar
+
+    def __init__(self, grid, max_cost=24):
+        self.width, self.height = len(grid[0]), len(grid)
+        self.walkable = ((np.asarray(grid) & TILE_WALL) == 0).ravel()
+        self.max_cost = max_cost  # Steps from the goal beyond which NPCs fall back to astar
+        self.distances = np.full(self.width * self.height, -1, dtype=np.int32)
+        self.goal = None
+        self.reached = []  # Cells written by the last pass, so the next one only clears those
+
+    def update(self, goal_tile):
+        """Recompute the field if the goal moved to another tile; cost is the area within max_cost"""
+        goal_tile = (int(goal_tile[0]), int(goal_tile[1]))
+        if goal_tile == self.goal:
+            return
+        self.goal = goal_tile
+        distances = self.distances
+        distances[self.reached] = -1
+        width, height = self.width, self.height
+        goal_x, goal_z = goal_tile
+        if not (0 <= goal_x < width and 0 <= goal_z < height) or not self.walkable[goal_z * width + goal_x]:
+            self.reached = []
+            return
+        walkable = self.walkable
+        start = goal_z * width + goal_x
+        distances[start] = 0
+        reached = [start]
+        frontier = [start]
+        for cost in range(1, self.max_cost + 1):
+            next_frontier = []
+            for cell in frontier:
+                x = cell % width
+                # Left, right, up, down; the grid border is always wall, but check anyway
+                for neighbor, inside in ((cell - 1, x > 0), (cell + 1, x < width - 1),
+                                         (cell - width, cell >= width), (cell + width, cell < (height - 1) * width)):
+                    if inside and walkable[neighbor] and distances[neighbor] < 0:
+                        distances[neighbor] = cost
+                        next_frontier.append(neighbor)
+            if not next_frontier:
+                break
+            reached.extend(next_frontier)
+            frontier = next_frontier
+        self.reached = reached
+
+    def distance(self, tile):
+        """Steps from tile to the goal, or -1 if it is outside the field"""
+        x, z = tile
+        if not (0 <= x < self.width and 0 <= z < self.height):
+            return -1
+        return int(self.distances[z * self.width + x])
+
+    def path_from(self, tile):
+        """[tile, next tile downhill] like the head of an astar path, [tile] at the goal, or None if out of range"""
+        cost = self.distance(tile)
+        if cost < 0:
+            return None
+        if cost == 0:
+            return [tile]
+        for dx, dz in self.NEIGHBOR_OFFSETS:
+            neighbor = (tile[0] + dx, tile[1] + dz)
+            if self.distance(neighbor) == cost - 1:
+                return [tile, neighbor]
+        return None
+
+class HierarchicalPathfinder:
+    """HPA* over chunk_size x chunk_size chunks: plans long paths between chunk entrances, then refines them locally"""
+    START = -1  # Abstract node ids of the query's start and goal
+    GOAL = -2
+    # Up to this many tiles on the longer side, flat astar is as fast and its paths are optimal (benchmark.py hpa)
+    MIN_MAP_SIZE = 120
+
+    def __init__(self, grid, chunk_size=8, local_distance=None):
+        self.grid = grid
+        self.width, self.height = len(grid[0]), len(grid)
+        self.read_walls()
+        self.chunk_size = chunk_size
+        self.chunks_x = (self.width + chunk_size - 1) // chunk_size
+        self.chunks_z = (self.height + chunk_size - 1) // chunk_size
+        # Queries this close (Manhattan) go straight to astar
+        self.local_distance = 4 * chunk_size if local_distance is None else local_distance
+        self.node_tiles = []  # Node id -> (x, z) entrance tile
+        self.node_ids = {}  # (x, z) -> node id
+        self.chunk_nodes = {}  # Chunk id -> node ids inside it
+        self.edges = []  # Node id -> [(neighbor id, cost)]
+        self.refined = {}  # (tile, tile) -> tile path inside one chunk, filled on demand
+        start_time = time.time()
+        self.build_entrances()
+        self.build_chunk_edges()
+        print(f"HPA* graph: {len(self.node_tiles)} entrances in {time.time() - start_time:.2f}s")
+
+    def read_walls(self):
+        walls = (np.asarray(self.grid) & TILE_WALL) != 0
+        self.open = (~walls).tobytes()  # Flat z * width + x walkability
+        self.blocked = walls.tobytes()  # The same mask inverted, as astar takes it
+
+    def chunk_of(self, tile):
+        return (tile[1] // self.chunk_size) * self.chunks_x + tile[0] // self.chunk_size
+
+    def chunk_bounds(self, tile):
+        """(x0, z0, x1, z1) of the chunk holding tile, exclusive on the high side"""
+        size = self.chunk_size
+        x0, z0 = tile[0] // size * size, tile[1] // size * size
+        return x0, z0, min(x0 + size, self.width), min(z0 + size, self.height)
+
+    def add_node(self, tile):
+        node = self.node_ids.get(tile)
+        if node is None:
+            node = len(self.node_tiles)
+            self.node_ids[tile] = node
+            self.node_tiles.append(tile)
+            self.edges.append([])
+            self.chunk_nodes.setdefault(self.chunk_of(tile), []).append(node)
+        return node
+
+    def build_entrances(self):
+        """One entrance pair at the middle of every open stretch of each chunk border"""
+        size = self.chunk_size
+        # Borders between horizontally adjacent chunks (crossing in x), then vertically adjacent ones (crossing in z)
+        for border_x in range(size, self.width, size):
+            self.scan_border([((border_x - 1, z), (border_x, z)) for z in range(self.height)])
+        for border_z in range(size, self.height, size):
+            self.scan_border([((x, border_z - 1), (x, border_z)) for x in range(self.width)])
+
+    def scan_border(self, pairs):
+        open_tiles, width, size = self.open, self.width, self.chunk_size
+        run = []
+        for index, (inner, outer) in enumerate(pairs):
+            is_open = open_tiles[inner[1] * width + inner[0]] and open_tiles[outer[1] * width + outer[0]]
+            if is_open:
+                run.append((inner, outer))
+            # A run ends at a wall or where the border passes into the next pair of chunks
+            if run and (not is_open or index + 1 == len(pairs) or (index + 1) % size == 0):
+                inner_tile, outer_tile = run[len(run) // 2]
+                a, b = self.add_node(inner_tile), self.add_node(outer_tile)
+                self.edges[a].append((b, 1))
+                self.edges[b].append((a, 1))
+                run = []
+
+    def chunk_search(self, source, target=None):
+        """Breadth-first search confined to source's chunk: (distances, parents) keyed by tile"""
+        open_tiles, width = self.open, self.width
+        x0, z0, x1, z1 = self.chunk_bounds(source)
+        distances = {source: 0}
+        parents = {source: None}
+        frontier = [source]
+        while frontier:
+            next_frontier = []
+            for x, z in frontier:
+                cost = distances[(x, z)] + 1
+                for neighbor in ((x - 1, z), (x + 1, z), (x, z - 1), (x, z + 1)):
+                    nx, nz = neighbor
+                    if x0 <= nx < x1 and z0 <= nz < z1 and neighbor not in distances and open_tiles[nz * width + nx]:
+                        distances[neighbor] = cost
+                        parents[neighbor] = (x, z)
+                        if neighbor == target:
+                            return distances, parents
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return distances, parents
+
+    def build_chunk_edges(self):
+        """Connect every pair of entrances that can reach each other inside their chunk"""
+        for nodes in self.chunk_nodes.values():
+            self.connect_chunk(nodes)
+
+    def connect_chunk(self, nodes):
+        for node in nodes:
+            distances, _ = self.chunk_search(self.node_tiles[node])
+            for other in nodes:
+                other_tile = self.node_tiles[other]
+                if other != node and other_tile in distances:
+                    self.edges[node].append((other, distances[other_tile]))
+
+    def border_pairs(self, chunk, other):
+        """(inner, outer) tile pairs across the border from chunk to the chunk east or south of it"""
+        size = self.chunk_size
+        chunk_x, chunk_z = chunk % self.chunks_x, chunk // self.chunks_x
+        if other == chunk + 1:
+            border_x = (chunk_x + 1) * size
+            return [((border_x - 1, z), (border_x, z)) for z in range(chunk_z * size, min((chunk_z + 1) * size, self.height))]
+        border_z = (chunk_z + 1) * size
+        return [((x, border_z - 1), (x, border_z)) for x in range(chunk_x * size, min((chunk_x + 1) * size, self.width))]
+
+    def remove_node(self, node):
+        """Unlink an entrance; its id stays unused so the other ids remain valid"""
+        tile = self.node_tiles[node]
+        del self.node_ids[tile]
+        self.chunk_nodes[self.chunk_of(tile)].remove(node)
+        for other, _ in self.edges[node]:
+            self.edges[other] = [(n, cost) for n, cost in self.edges[other] if n != node]
+        self.edges[node] = []
+
+    def update_tiles(self, tiles):
+        """Re-derive the entrances and edges of the chunks holding tiles, whose walkability changed"""
+        self.read_walls()
+        dirty = {self.chunk_of(tile) for tile in tiles}
+        # Every border of a dirty chunk, as (west or north chunk, east or south chunk)
+        borders = set()
+        for chunk in dirty:
+            chunk_x, chunk_z = chunk % self.chunks_x, chunk // self.chunks_x
+            if chunk_x > 0:
+                borders.add((chunk - 1, chunk))
+            if chunk_x + 1 < self.chunks_x:
+                borders.add((chunk, chunk + 1))
+            if chunk_z > 0:
+                borders.add((chunk - self.chunks_x, chunk))
+            if chunk_z + 1 < self.chunks_z:
+                borders.add((chunk, chunk + self.chunks_x))
+        touched = dirty | {chunk for border in borders for chunk in border}
+        # Drop the crossings over those borders, and entrances left without any crossing
+        for chunk in touched:
+            for node in self.chunk_nodes.get(chunk, []):
+                self.edges[node] = [(other, cost) for other, cost in self.edges[node]
+                                    if tuple(sorted((chunk, self.chunk_of(self.node_tiles[other])))) not in borders]
+        for chunk in touched:
+            for node in list(self.chunk_nodes.get(chunk, [])):
+                if not any(self.chunk_of(self.node_tiles[other]) != chunk for other, _ in self.edges[node]):
+                    self.remove_node(node)
+        for chunk, other in sorted(borders):
+            self.scan_border(self.border_pairs(chunk, other))
+        # Entrance sets changed on both sides of each border, so reconnect every touched chunk
+        for chunk in touched:
+            nodes = self.chunk_nodes.get(chunk, [])
+            for node in nodes:
+                self.edges[node] = [(other, cost) for other, cost in self.edges[node]
+                                    if self.chunk_of(self.node_tiles[other]) != chunk]
+            self.connect_chunk(nodes)
+        self.refined = {}
+
+    def chunk_path(self, a, b):
+        """Shortest tile path from a to b without leaving their chunk"""
+        key = (a, b)
+        path = self.refined.get(key)
+        if path is None:
+            _, parents = self.chunk_search(a, b)
+            path = [b]
+            while path[-1] != a:
+                path.append(parents[path[-1]])
+            path.reverse()
+            if a in self.node_ids and b in self.node_ids:
+                self.refined[key] = path
+        return path
+
+    def find_path(self, start, goal):
+        """Same contract as astar: list of (x, z) tiles from start to goal inclusive, or []"""
+        if start == goal:
+            return [start]
+        if abs(start[0] - goal[0]) + abs(start[1] - goal[1]) <= self.local_distance:
+            return astar(self.grid, start, goal, self.blocked)
+        if not (0 <= start[0] < self.width and 0 <= start[1] < self.height and 0 <= goal[0] < self.width and 0 <= goal[1] < self.height):
+            return []
+        if not self.open[start[1] * self.width + start[0]] or not self.open[goal[1] * self.width + goal[0]]:
+            return astar(self.grid, start, goal, self.blocked)
+        abstract = self.abstract_path(start, goal)
+        if abstract is None:
+            return []
+        # Refine: steps between chunks are single moves, everything else is a search inside one chunk
+        path = [start]
+        for a, b in zip(abstract, abstract[1:]):
+            if self.chunk_of(a) != self.chunk_of(b):
+                path.append(b)
+            else:
+                path.extend(self.chunk_path(a, b)[1:])
+        return path
+
+    def abstract_path(self, start, goal):
+        """A* over the entrance graph with start and goal linked into their chunks; list of tiles or None"""
+        start_distances, _ = self.chunk_search(start)
+        goal_distances, _ = self.chunk_search(goal)
+        goal_chunk = self.chunk_of(goal)
+        goal_x, goal_z = goal
+        tiles = self.node_tiles
+        def tile_of(node):
+            return start if node == self.START else goal if node == self.GOAL else tiles[node]
+        def neighbors(node):
+            if node == self.START:
+                links = [(n, start_distances[tiles[n]]) for n in self.chunk_nodes.get(self.chunk_of(start), [])
+                         if tiles[n] in start_distances]
+                if goal in start_distances:
+                    links.append((self.GOAL, start_distances[goal]))
+                return links
+            links = self.edges[node]
+            tile = tiles[node]
+            if self.chunk_of(tile) == goal_chunk and tile in goal_distances:
+                links = links + [(self.GOAL, goal_distances[tile])]
+            return links
+        best = {self.START: 0}
+        parents = {self.START: None}
+        open_set = [(abs(start[0] - goal_x) + abs(start[1] - goal_z), 0, self.START)]
+        closed = set()
+        while open_set:
+            _, cost, node = heapq.heappop(open_set)
+            if node == self.GOAL:
+                route = []
+                while node is not None:
+                    route.append(tile_of(node))
+                    node = parents[node]
+                route.reverse()
+                return route
+            if node in closed:
+                continue
+            closed.add(node)
+            for neighbor, step in neighbors(node):
+                new_cost = cost + step
+                if neighbor in closed or new_cost >= best.get(neighbor, float("inf")):
+                    continue
+                best[neighbor] = new_cost
+                parents[neighbor] = node
+                x, z = tile_of(neighbor)
+                heapq.heappush(open_set, (new_cost + abs(x - goal_x) + abs(z - goal_z), new_cost, neighbor))
+        return None
+
+class PathCache:
+    """Per-NPC astar results keyed by (start, goal), repaired in place as the NPC and its target move"""
+    def __init__(self, max_entries=8, max_repairs=12):
+        self.paths = {}  # (start, goal) -> path, oldest first
+        self.max_entries = max_entries
+        self.max_repairs = max_repairs  # Edits allowed before a fresh search, so detours cannot pile up
+        self.grid_version = None
+        self.current = []  # Last path handed out
+        self.repairs = 0
+        # Counters: cache hits, cheap repairs, full astar searches
+        self.hits = 0
+        self.repaired = 0
+        self.replans = 0
+
+    def get(self, grid, start, goal, grid_version=0, search=astar):
+        """Path from start to goal, reusing the cache or the last path where possible; search(grid, start, goal) plans misses"""
+        if grid_version != self.grid_version:
+            # Cached entries may cross tiles that changed; keep only the last path, fixed where needed
+            self.paths = {}
+            if self.grid_version is not None and self.current:
+                self.current = self.revalidate(grid, self.current, search)
+                self.repairs += 1
+            self.grid_version = grid_version
+        key = (start, goal)
+        path = self.paths.get(key)
+        if path is not None:
+            self.hits += 1
+        else:
+            path = self.repair(grid, self.current, start, goal)
+            if path is not None:
+                self.repairs += 1
+                self.repaired += 1
+            else:
+                path = search(grid, start, goal)
+                self.repairs = 0
+                self.replans += 1
+            if len(self.paths) >= self.max_entries:
+                del self.paths[next(iter(self.paths))]
+            self.paths[key] = path
+        self.current = path
+        return path
+
+    def repair(self, grid, path, start, goal):
+        """Adapt the last path to a start and goal that moved a little, or None if a new search is needed"""
+        if not path or self.repairs >= self.max_repairs:
+            return None
+        # The start usually just advanced along the path
+        if start in path:
+            path = path[path.index(start):]
+        elif abs(start[0] - path[0][0]) + abs(start[1] - path[0][1]) == 1:
+            path = [start] + path
+        else:
+            return None
+        # The goal usually stepped to a neighbouring tile, or back onto the path
+        if path[-1] != goal:
+            if goal in path:
+                path = path[:path.index(goal) + 1]
+            elif abs(goal[0] - path[-1][0]) + abs(goal[1] - path[-1][1]) == 1 and not grid[goal[1]][goal[0]] & TILE_WALL:
+                path = path + [goal]
+            else:
+                return None
+        return path
+
+    def revalidate(self, grid, path, search=astar):
+        """Splice a local detour around every blocked stretch of path; [] if that is not possible"""
+        index = 0
+        while index < len(path):
+            x, z = path[index]
+            if not grid[z][x] & TILE_WALL:
+                index += 1
+                continue
+            end = index
+            while end < len(path) and grid[path[end][1]][path[end][0]] & TILE_WALL:
+                end += 1
+            if index == 0 or end == len(path):
+                return []  # The start or the goal itself is blocked
+            detour = search(grid, path[index - 1], path[end])
+            if not detour:
+                return []
+            path = path[:index - 1] + detour + path[end + 1:]
+            index += len(detour) - 1
+        return path
+
+class LineOfSight:
+    """Tile line of sight over the dungeon grid (Bresenham, endpoints excluded), cached per (from_tile, to_tile)"""
+    def __init__(self, grid, grid_version=0, max_entries=4096):
+        self.max_entries = max_entries
+        self.cache = {}  # (from_tile, to_tile) -> clear
+        self.sync(grid, grid_version)
+
+    def sync(self, grid, grid_version):
+        """Pick up an edited grid; cached answers only hold for the version they were traced on"""
+        self.grid = grid
+        self.walls = (np.asarray(grid) & TILE_WALL) != 0
+        self.grid_version = grid_version
+        self.cache = {}
+
+    def clear(self, start, end):
+        """True if no wall lies strictly between the two tiles"""
+        key = (start, end)
+        visible = self.cache.get(key)
+        if visible is None:
+            visible = self.trace(self.grid, start, end)
+            self.store(key, visible)
+        return visible
+
+    def store(self, key, visible):
+        if len(self.cache) >= self.max_entries:
+            del self.cache[next(iter(self.cache))]
+        self.cache[key] = visible
+
+    @staticmethod
+    def trace(grid, start, end):
+        """Walk the Bresenham line from start to end without building it, stopping at the first wall"""
+        x, y = start
+        x1, y1 = end
+        dx, dy = abs(x1 - x), abs(y1 - y)
+        sx = 1 if x < x1 else -1
+        sy = 1 if y < y1 else -1
+        # Float error term starting at half the major delta, as the original point-list version used
+        if dx > dy:
+            err = dx / 2.0
+            for _ in range(dx - 1):
+                err -= dy
+                if err < 0:
+                    y += sy
+                    err += dx
+                x += sx
+                if grid[y][x] & TILE_WALL:
+                    return False
+        else:
+            err = dy / 2.0
+            for _ in range(dy - 1):
+                err -= dx
+                if err < 0:
+                    x += sx
+                    err += dy
+                y += sy
+                if grid[y][x] & TILE_WALL:
+                    return False
+        return True
+
+    def clear_batch(self, starts, end):
+        """Line of sight from every (x, z) tile in starts to end in one vectorized walk; boolean array"""
+        result = np.ones(len(starts), dtype=bool)
+        missing = []
+        for i, start in enumerate(starts):
+            visible = self.cache.get((start, end))
+            if visible is None:
+                missing.append(i)
+            else:
+                result[i] = visible
+        if not missing:
+            return result
+        tiles = np.array([starts[i] for i in missing], dtype=np.int64).reshape(-1, 2)
+        x, y = tiles[:, 0].copy(), tiles[:, 1].copy()
+        dx, dy = np.abs(end[0] - x), np.abs(end[1] - y)
+        sx = np.where(x < end[0], 1, -1)
+        sy = np.where(y < end[1], 1, -1)
+        x_major = dx > dy
+        major = np.where(x_major, dx, dy)
+        minor = np.where(x_major, dy, dx)
+        err = major / 2.0
+        clear = np.ones(len(tiles), dtype=bool)
+        height, width = self.walls.shape
+        for step in range(1, int(major.max(initial=0))):
+            walking = clear & (step < major)
+            if not walking.any():
+                break
+            err = np.where(walking, err - minor, err)
+            side_step = walking & (err < 0)
+            err = np.where(side_step, err + major, err)
+            # The major axis always advances; the minor one only when the error term wraps
+            x += np.where(walking & (x_major | side_step), sx, 0)
+            y += np.where(walking & (~x_major | side_step), sy, 0)
+            clear &= ~(walking & self.walls[np.clip(y, 0, height - 1), np.clip(x, 0, width - 1)])
+        for i, visible in zip(missing, clear.tolist()):
+            result[i] = visible
+            self.store((starts[i], end), visible)
+        return result
+
+class AIScheduler:
+    """Spreads NPC thinking (path updates, ranged-attack checks) across frames within a per-frame time budget"""
+    def __init__(self, budget_us=2000, tiles_per_frame=2.5, max_interval=8, report_interval=0):
+        self.budget_us = budget_us  # Microseconds of thinking allowed per frame
+        self.tiles_per_frame = tiles_per_frame  # An NPC this many tiles away thinks every other frame, and so on
+        self.max_interval = max_interval
+        self.report_interval = report_interval  # Frames between printed budget summaries; 0 (default) stays quiet
+        self.frame = 0
+        self.next_tick = {}  # NPC -> frame it is next due to think
+        # (microseconds used, tasks run, tasks deferred) for the last finished frame
+        self.last_frame = (0, 0, 0)
+        # Totals since the last report
+        self.report_frames = 0
+        self.total_us = 0
+        self.peak_us = 0
+
+    def interval(self, distance):
+        """Frames between thinks for an NPC this far from the player"""
+        return min(self.max_interval, max(1, int(distance / self.tiles_per_frame)))
+
+    def run(self, tasks):
+        """Run due (distance, npc, think) tasks nearest first until the budget is spent; the rest wait for later frames"""
+        frame = self.frame
+        self.frame += 1
+        queue = []
+        for order, (distance, npc, think) in enumerate(tasks):
+            due = self.next_tick.get(npc, frame)
+            if due <= frame:
+                # NPCs that were deferred move up, so the far ones cannot be starved forever
+                heapq.heappush(queue, (distance / (1 + frame - due), order, distance, npc, think))
+        start = time.perf_counter_ns()
+        budget_ns = self.budget_us * 1000
+        ran = 0
+        while queue and time.perf_counter_ns() - start < budget_ns:
+            _, _, distance, npc, think = heapq.heappop(queue)
+            think()
+            self.next_tick[npc] = frame + self.interval(distance)
+            ran += 1
+        for _, _, _, npc, _ in queue:
+            self.next_tick.setdefault(npc, frame)
+        used_us = (time.perf_counter_ns() - start) // 1000
+        self.last_frame = (used_us, ran, len(queue))
+        self.report_frames += 1
+        self.total_us += used_us
+        self.peak_us = max(self.peak_us, used_us)
+        if self.report_interval and self.report_frames >= self.report_interval:
+            print(self.report())
+            self.report_frames = 0
+            self.total_us = 0
+            self.peak_us = 0
+
+    def budget_used(self):
+        """Fraction of the budget the last frame used"""
+        return self.last_frame[0] / self.budget_us
+
+    def report(self):
+        average = self.total_us / max(1, self.report_frames)
+        return (f"AI budget: avg {average:.0f}us ({average / self.budget_us:.0%}), peak {self.peak_us}us "
+                f"({self.peak_us / self.budget_us:.0%}) of {self.budget_us}us")
+
+    def forget(self, npc):
+        self.next_tick.pop(npc, None)
+
+class NPCPool:
+    """Structure-of-arrays NPC store: positions, health, timers and types live in NumPy arrays, one row per NPC"""
+    TYPES = ("skeleton", "ghoul", "ghost")
+    MELEE_DAMAGE = np.array([7, 5, 10])  # By type id
+    FIELDS = {
+        "x": np.int32, "z": np.int32, "center_x": np.float64, "center_z": np.float64,
+        "type_id": np.int8, "health": np.int32, "alive": np.bool_,
+        "flash_timer": np.int32, "death_timer": np.int32, "attack_cooldown": np.int32,
+        "frozen_timer": np.int32, "ranged_attack_cooldown": np.int32, "ranged_attack_range": np.float64,
+        "listed": np.bool_,  # Still in the level's NPC list; cleared once a death has been handled
+    }
+    OBJECT_FIELDS = ("path", "path_cache", "last_player_tile")  # Per-row Python objects, kept in lists
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.views = []  # Row -> NPCView
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        for name in self.OBJECT_FIELDS:
+            setattr(self, name, [])
+
+    def spawn(self, x, z, center_x, center_z, npc_type="skeleton", health=None):
+        """Add an NPC and return its view; dead rows stay in place until the pool is replaced with the level"""
+        if self.count == len(self.center_x):
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                grown = np.zeros(len(array) * 2, dtype=array.dtype)
+                grown[:self.count] = array[:self.count]
+                setattr(self, name, grown)
+        row = self.count
+        self.count += 1
+        self.listed[row] = True
+        for name in self.OBJECT_FIELDS:
+            getattr(self, name).append(None)
+        view = NPCView(self, row, x, z, center_x, center_z, npc_type=npc_type, health=health)
+        self.views.append(view)
+        return view
+
+    def move_along_paths(self, rows, tiles, speed=0.05):
+        """Step each row's NPC up to speed toward path[1], the next tile of its path; moves into a wall or off the (z, x) tile-flag grid are dropped"""
+        moving, targets = [], []
+        for row in rows:
+            path = self.path[row]
+            if path and len(path) >= 2:
+                moving.append(row)
+                targets.append(path[1])
+        if not moving:
+            return
+        rows = np.array(moving)
+        targets = np.array(targets)
+        center_x, center_z = self.center_x[rows], self.center_z[rows]
+        dx = targets[:, 0] + 0.5 - center_x
+        dz = targets[:, 1] + 0.5 - center_z
+        dist = np.sqrt(dx*dx + dz*dz)
+        # Rows already on the next tile, or at its center, stay put
+        steer = ((targets[:, 0] != center_x.astype(np.int64)) | (targets[:, 1] != center_z.astype(np.int64))) & (dist >= 1e-5)
+        dist = np.where(steer, dist, 1.0)
+        move_dist = np.minimum(speed, dist)
+        new_x = center_x + dx / dist * move_dist
+        new_z = center_z + dz / dist * move_dist
+        grid_x, grid_z = new_x.astype(np.int64), new_z.astype(np.int64)
+        height, width = tiles.shape
+        inside = (grid_x >= 0) & (grid_x < width) & (grid_z >= 0) & (grid_z < height)
+        blocked = ~inside | ((tiles[np.clip(grid_z, 0, height - 1), np.clip(grid_x, 0, width - 1)] & TILE_WALL) != 0)
+        free = rows[steer & ~blocked]
+        self.center_x[free] = new_x[steer & ~blocked]
+        self.center_z[free] = new_z[steer & ~blocked]
+
+def _pool_field(name):
+    """Property reading and writing one NPCPool column at the view's row"""
+    def get(self):
+        return getattr(self.pool, name)[self.row].item()
+    def set(self, value):
+        getattr(self.pool, name)[self.row] = value
+    return property(get, set)
+
+def _pool_object(name):
+    """Property reading and writing one NPCPool object list at the view's row"""
+    def get(self):
+        return getattr(self.pool, name)[self.row]
+    def set(self, value):
+        getattr(self.pool, name)[self.row] = value
+    return property(get, set)
+
+class NPCBehavior:
+    """NPC state and decisions; NPC stores the state in slots, NPCView in an NPCPool row"""
+    __slots__ = ()
+
     def __init__(self, x, z, center_x, center_z, npc_type="skeleton", health=None):
         self.x = x
         self.z = z
@@ -1440,44 +2185,29 @@ class NPC:
         self.attack_cooldown = 0  # Frames until next attack
         self.frozen_timer = 0  # Frames to freeze movement after attack
         self.path = []  # Path of (x, z) tiles to follow
-        self.path_timer = 0  # Frames until next path recalculation
+        self.path_cache = PathCache()  # Reused and repaired astar paths
         self.last_player_tile = None
         # Ghost-specific ranged attack properties
         self.ranged_attack_cooldown = 0  # Frames until next ranged attack (for ghosts)
         self.ranged_attack_range = 8.0  # Maximum range for ranged attacks
 
-    def update_path(self, grid, player_tile):
+    def update_path(self, grid, player_tile, flow_field=None, grid_version=0, pathfinder=None, blocked=None):
         skel_tile = (int(self.center_x), int(self.center_z))
         player_tile = (int(player_tile[0]), int(player_tile[1]))
-        if self.path and self.path[0] != skel_tile:
-            self.path_timer = 0
-        if self.path_timer > 0 and self.last_player_tile == player_tile:
-            self.path_timer -= 1
-            return
+        # Step downhill on the shared field when it covers this tile; it is refreshed every frame for free
+        if flow_field is not None and flow_field.goal == player_tile:
+            path = flow_field.path_from(skel_tile)
+            if path is not None:
+                self.path = path
+                self.last_player_tile = player_tile
+                return
         self.last_player_tile = player_tile
-        self.path = astar(grid, skel_tile, player_tile)
-        self.path_timer = 20
-
-    def move_along_path(self, collision_checker, speed=0.05):
-        if not self.is_alive or not self.path or len(self.path) < 2:
-            return
-        skel_tile = (int(self.center_x), int(self.center_z))
-        next_tile = self.path[1]
-        if next_tile == skel_tile:
-            return
-        dx = next_tile[0] + 0.5 - self.center_x
-        dz = next_tile[1] + 0.5 - self.center_z
-        dist = math.sqrt(dx*dx + dz*dz)
-        if dist < 1e-5:
-            return
-        move_dist = min(speed, dist)
-        move_x = dx / dist * move_dist
-        move_z = dz / dist * move_dist
-        new_x = self.center_x + move_x
-        new_z = self.center_z + move_z
-        if not collision_checker(new_x, new_z):
-            self.center_x = new_x
-            self.center_z = new_z
+        # Long searches go through the chunk graph when the level has one (large maps only)
+        if pathfinder is None:
+            search = lambda grid, start, goal: astar(grid, start, goal, blocked)
+        else:
+            search = lambda grid, start, goal: pathfinder.find_path(start, goal)
+        self.path = self.path_cache.get(grid, skel_tile, player_tile, grid_version, search)
 
     def take_damage(self, amount, knockback_vec=None, collision_checker=None, sound_callback=None, death_callback=None):
         if not self.is_alive:
@@ -1501,7 +2231,7 @@ class NPC:
                 self.center_x = new_x
                 self.center_z = new_z
 
-    def can_perform_ranged_attack(self, player_pos, dungeon_grid=None):
+    def can_perform_ranged_attack(self, player_pos, dungeon_grid=None, line_of_sight=None):
         """Check if ghost can perform a ranged attack, including line of sight."""
         if self.npc_type != "ghost" or not self.is_alive:
             return False
@@ -1514,50 +2244,18 @@ class NPC:
         distance = math.sqrt(dx*dx + dz*dz)
         if not (2.0 <= distance <= 7.0):
             return False
-        # Line of sight check (Bresenham's line algorithm on grid)
+        # Line of sight check (Bresenham's line algorithm on grid), shared and cached when a service is given
+        start = (int(self.center_x), int(self.center_z))
+        end = (int(player_pos[0]), int(player_pos[2]))
+        if line_of_sight is not None:
+            return line_of_sight.clear(start, end)
         if dungeon_grid is not None:
-            x0, y0 = int(self.center_x), int(self.center_z)
-            x1, y1 = int(player_pos[0]), int(player_pos[2])
-            points = self._bresenham_line(x0, y0, x1, y1)
-            for px, py in points:
-                if (px, py) == (x0, y0) or (px, py) == (x1, y1):
-                    continue
-                if dungeon_grid[py][px] == 1:
-                    return False  # Wall blocks line of sight
+            return LineOfSight.trace(dungeon_grid, start, end)
         return True
 
-    def _bresenham_line(self, x0, y0, x1, y1):
-        """Yield grid points from (x0, y0) to (x1, y1) using Bresenham's algorithm."""
-        points = []
-        dx = abs(x1 - x0)
-        dy = abs(y1 - y0)
-        x, y = x0, y0
-        sx = 1 if x0 < x1 else -1
-        sy = 1 if y0 < y1 else -1
-        if dx > dy:
-            err = dx / 2.0
-            while x != x1:
-                points.append((x, y))
-                err -= dy
-                if err < 0:
-                    y += sy
-                    err += dx
-                x += sx
-        else:
-            err = dy / 2.0
-            while y != y1:
-                points.append((x, y))
-                err -= dx
-                if err < 0:
-                    x += sx
-                    err += dy
-                y += sy
-        points.append((x1, y1))
-        return points
-
-    def perform_ranged_attack(self, player_pos, fireball_list, collision_checker, sound_callback=None, dungeon_grid=None):
+    def perform_ranged_attack(self, player_pos, projectiles, sound_callback=None, dungeon_grid=None, line_of_sight=None):
         """Perform a ranged attack (ghost magicball) with line of sight check."""
-        if not self.can_perform_ranged_attack(player_pos, dungeon_grid=dungeon_grid):
+        if not self.can_perform_ranged_attack(player_pos, dungeon_grid=dungeon_grid, line_of_sight=line_of_sight):
             return False
         
         # Calculate direction to player
@@ -1571,20 +2269,16 @@ class NPC:
             direction_z = dz / distance
             
             # Create magicball projectile
-            magicball = Fireball(
+            projectiles.spawn(
                 self.center_x, 
                 self.center_z, 
                 direction_x, 
                 direction_z, 
                 speed=0.2,  # Slightly slower than player spells
                 max_distance=7.0,  # Same range as player magic spell
-                is_magic=True, 
-                collision_checker=collision_checker
+                is_magic=True
             )
             
-            # Add to fireball list
-            fireball_list.append(magicball)
-            
             # Play spell sound
             if sound_callback:
                 sound_callback()
@@ -1598,7 +2292,47 @@ class NPC:
 
 
 
+class NPC(NPCBehavior):
+    """Standalone NPC record"""
+    __slots__ = ("x", "z", "center_x", "center_z", "npc_type", "health", "flash_timer", "is_alive", "death_timer",
+                 "attack_cooldown", "frozen_timer", "path", "path_cache", "last_player_tile",
+                 "ranged_attack_cooldown", "ranged_attack_range")
+
+class NPCView(NPCBehavior):
+    """NPC whose state lives in an NPCPool row; the view itself holds only the pool and the row"""
+    __slots__ = ("pool", "row")
+    x = _pool_field("x")
+    z = _pool_field("z")
+    center_x = _pool_field("center_x")
+    center_z = _pool_field("center_z")
+    health = _pool_field("health")
+    flash_timer = _pool_field("flash_timer")
+    death_timer = _pool_field("death_timer")
+    attack_cooldown = _pool_field("attack_cooldown")
+    frozen_timer = _pool_field("frozen_timer")
+    ranged_attack_cooldown = _pool_field("ranged_attack_cooldown")
+    ranged_attack_range = _pool_field("ranged_attack_range")
+    is_alive = _pool_field("alive")
+    path = _pool_object("path")
+    path_cache = _pool_object("path_cache")
+    last_player_tile = _pool_object("last_player_tile")
+
+    def __init__(self, pool, row, *args, **kwargs):
+        self.pool = pool
+        self.row = row
+        super().__init__(*args, **kwargs)
+
+    @property
+    def npc_type(self):
+        return NPCPool.TYPES[self.pool.type_id[self.row]]
+
+    @npc_type.setter
+    def npc_type(self, value):
+        self.pool.type_id[self.row] = NPCPool.TYPES.index(value)
+
 class DroppedItem:
+    __slots__ = ("item_type", "x", "z", "collected", "spawn_time")
+
     def __init__(self, item_type, x, z):
         self.item_type = item_type
         self.x = x
@@ -1607,6 +2341,8 @@ class DroppedItem:
         self.spawn_time = time.time()
 
 class Trapdoor:
+    __slots__ = ("x", "z", "is_unlocked", "center_x", "center_z")
+
     def __init__(self, x, z):
         self.x = x
         self.z = z
@@ -1614,88 +2350,293 @@ class Trapdoor:
         self.center_x = x + 0.5
         self.center_z = z + 0.5
 
-class Fireball:
-    def __init__(self, x, z, direction_x, direction_z, speed=0.3, max_distance=7.0, is_magic=False, collision_checker=None):
-        self.x = x
-        self.z = z
-        self.direction_x = direction_x
-        self.direction_z = direction_z
-        self.speed = speed
-        self.max_distance = max_distance
-        self.distance_traveled = 0.0
-        self.spawn_x = x
-        self.spawn_z = z
-        self.active = True
-        self.is_magic = is_magic
-        self.collision_checker = collision_checker
-    
-    def update(self):
-        """Update fireball position and check if it should be destroyed"""
-        if not self.active:
-            return
-        # Move fireball in its direction
-        next_x = self.x + self.direction_x * self.speed
-        next_z = self.z + self.direction_z * self.speed
-        # Check for wall collision before moving
-        if self.collision_checker and self.collision_checker(next_x, next_z):
-            self.active = False
+def segment_circle_hit(start_x, start_z, end_x, end_z, center_x, center_z, radius):
+    """Fraction along each segment where it first comes within radius of the center, or inf if it never does"""
+    dx, dz = end_x - start_x, end_z - start_z
+    fx, fz = start_x - center_x, start_z - center_z
+    a = dx*dx + dz*dz
+    b = 2 * (fx*dx + fz*dz)
+    c = fx*fx + fz*fz - radius*radius
+    disc = b*b - 4*a*c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (-b - np.sqrt(np.maximum(disc, 0.0))) / (2*a)
+    # Starting inside the circle counts as touching at once
+    inside = c <= 0
+    hit = inside | ((a > 0) & (disc >= 0) & (t >= 0) & (t <= 1))
+    return np.where(hit, np.where(inside, 0.0, t), np.inf)
+
+class SpatialHash:
+    """Uniform grid index over point rows: range queries only look at the cells the range overlaps"""
+    def __init__(self, cell_size=1.0):
+        self.cell_size = cell_size
+        self.cells = np.zeros(0, dtype=np.int64)  # Occupied cell keys, sorted
+        self.starts = np.zeros(1, dtype=np.int64)  # Slice of self.rows for each occupied cell
+        self.rows = np.zeros(0, dtype=np.int64)  # Indexed rows grouped by cell
+
+    def cell_keys(self, cell_x, cell_z):
+        # Pack both cell coordinates into one sortable key; offset keeps small negatives distinct
+        return (cell_z + (1 << 20)) * (1 << 21) + (cell_x + (1 << 20))
+
+    def rebuild(self, xs, zs, rows):
+        """Index the given rows of the position columns xs, zs"""
+        rows = np.asarray(rows, dtype=np.int64)
+        keys = self.cell_keys(np.floor(xs[rows] / self.cell_size).astype(np.int64),
+                              np.floor(zs[rows] / self.cell_size).astype(np.int64))
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        self.rows = rows[order]
+        self.cells, first = np.unique(keys, return_index=True)
+        self.starts = np.append(first, len(keys))
+
+    def query(self, x, z, radius):
+        """Sorted rows in the cells overlapping the square of half-size radius around (x, z); callers test exact distance"""
+        if not len(self.cells):
+            return self.rows[:0]
+        size = self.cell_size
+        cells_x = np.arange(math.floor((x - radius) / size), math.floor((x + radius) / size) + 1)
+        cells_z = np.arange(math.floor((z - radius) / size), math.floor((z + radius) / size) + 1)
+        keys = self.cell_keys(cells_x[None, :], cells_z[:, None]).ravel()
+        found = np.searchsorted(self.cells, keys)
+        found = found[(found < len(self.cells)) & (self.cells[np.minimum(found, len(self.cells) - 1)] == keys)]
+        if not len(found):
+            return self.rows[:0]
+        return np.sort(np.concatenate([self.rows[self.starts[i]:self.starts[i + 1]] for i in found]))
+
+class ProjectilePool:
+    """Fixed-capacity projectile store in NumPy columns; live projectiles occupy rows [0, count)"""
+    FIELDS = {
+        "x": np.float64, "z": np.float64, "direction_x": np.float64, "direction_z": np.float64,
+        "speed": np.float64, "max_distance": np.float64, "distance_traveled": np.float64,
+        "spawn_x": np.float64, "spawn_z": np.float64, "is_magic": np.bool_, "active": np.bool_,
+    }
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.count = 0
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, x, z, direction_x, direction_z, speed=0.3, max_distance=7.0, is_magic=False):
+        """Take the next free row for a new projectile; returns the row, or None when the pool is full"""
+        if self.count == self.capacity:
+            print("Projectile pool full, dropping projectile")
+            return None
+        row = self.count
+        self.count += 1
+        self.x[row] = self.spawn_x[row] = x
+        self.z[row] = self.spawn_z[row] = z
+        self.direction_x[row] = direction_x
+        self.direction_z[row] = direction_z
+        self.speed[row] = speed
+        self.max_distance[row] = max_distance
+        self.distance_traveled[row] = 0.0
+        self.is_magic[row] = is_magic
+        self.active[row] = True
+        return row
+
+    def update(self, tiles):
+        """Move every live projectile one tick, stopping at the first wall its path crosses in the (z, x) tile-flag grid
+
+        Returns (start_x, start_z, swept): where each row's segment this tick began, and which rows travelled one.
+        """
+        count = self.count
+        live = self.active[:count].copy()
+        start_x, start_z = self.x[:count].copy(), self.z[:count].copy()
+        step_x = self.direction_x[:count] * self.speed[:count]
+        step_z = self.direction_z[:count] * self.speed[:count]
+        if count:
+            # Fly to the end of the step, or up to the wall and no further
+            t_wall = self.sweep_walls(start_x, start_z, step_x, step_z, tiles)
+            blocked = live & (t_wall <= 1.0)
+            t = np.where(blocked, t_wall, 1.0)
+            np.copyto(self.x[:count], start_x + step_x * t, where=live)
+            np.copyto(self.z[:count], start_z + step_z * t, where=live)
+            dx = self.x[:count] - self.spawn_x[:count]
+            dz = self.z[:count] - self.spawn_z[:count]
+            np.copyto(self.distance_traveled[:count], np.sqrt(dx*dx + dz*dz), where=live)
+            self.active[:count] &= ~blocked & (self.distance_traveled[:count] < self.max_distance[:count])
+        return start_x, start_z, live
+
+    @staticmethod
+    def sweep_walls(start_x, start_z, step_x, step_z, tiles):
+        """Grid traversal (DDA) along each segment; fraction of the step where it first enters a wall tile, inf if none"""
+        cell_x = np.floor(start_x).astype(np.int64)
+        cell_z = np.floor(start_z).astype(np.int64)
+        dir_x, dir_z = np.sign(step_x).astype(np.int64), np.sign(step_z).astype(np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Step fraction between successive x (z) tile borders, and to the next one
+            delta_x = np.where(step_x != 0, 1.0 / np.abs(step_x), np.inf)
+            delta_z = np.where(step_z != 0, 1.0 / np.abs(step_z), np.inf)
+            next_x = np.where(step_x > 0, (cell_x + 1 - start_x) * delta_x, np.where(step_x < 0, (start_x - cell_x) * delta_x, np.inf))
+            next_z = np.where(step_z > 0, (cell_z + 1 - start_z) * delta_z, np.where(step_z < 0, (start_z - cell_z) * delta_z, np.inf))
+        height, width = tiles.shape
+        def wall_at(cell_x, cell_z):
+            return (tiles[np.clip(cell_z, 0, height - 1), np.clip(cell_x, 0, width - 1)] & TILE_WALL) != 0
+        # A segment starting inside a wall (a spell cast point-blank at one) is stopped at once
+        inside = (cell_x >= 0) & (cell_x < width) & (cell_z >= 0) & (cell_z < height)
+        pending = inside & ~wall_at(cell_x, cell_z)
+        hit = np.where(pending, np.inf, 0.0)
+        while True:
+            t = np.minimum(next_x, next_z)
+            pending &= t <= 1.0
+            if not pending.any():
+                return hit
+            # On an exact corner x steps first and z on the next pass, so both side tiles are tested
+            along_x = pending & (next_x <= next_z)
+            along_z = pending & ~along_x
+            cell_x += np.where(along_x, dir_x, 0)
+            cell_z += np.where(along_z, dir_z, 0)
+            next_x = np.where(along_x, next_x + delta_x, next_x)
+            next_z = np.where(along_z, next_z + delta_z, next_z)
+            inside = (cell_x >= 0) & (cell_x < width) & (cell_z >= 0) & (cell_z < height)
+            blocked = pending & (~inside | wall_at(cell_x, cell_z))
+            hit[blocked] = t[blocked]
+            pending &= ~blocked
+
+    def compact(self):
+        """Move live projectiles to the front, keeping their order, so spent rows are reused"""
+        count = self.count
+        keep = np.flatnonzero(self.active[:count])
+        if len(keep) == count:
             return
-        self.x = next_x
-        self.z = next_z
-        # Calculate distance traveled
-        dx = self.x - self.spawn_x
-        dz = self.z - self.spawn_z
-        self.distance_traveled = math.sqrt(dx*dx + dz*dz)
-        # Destroy if traveled too far
-        if self.distance_traveled >= self.max_distance:
-            self.active = False
-    
-    def check_collision_with_npc(self, npc, sound_callback=None, death_callback=None):
-        """Check if fireball hits an NPC (ghoul, skeleton, ghost)"""
-        if not self.active or not npc.is_alive:
-            return False
-        
-        # Calculate distance between fireball and NPC
-        dx = self.x - npc.center_x
-        dz = self.z - npc.center_z
-        distance = math.sqrt(dx*dx + dz*dz)
-        
-        # Collision radius (fireball size)
-        collision_radius = 0.3
-        
-        if distance <= collision_radius:
-            # Hit! Apply damage and destroy fireball
-            if hasattr(self, 'is_magic') and self.is_magic:
-                npc.take_damage(20, sound_callback=sound_callback, death_callback=death_callback)  # Magicball deals 20 damage
-            else:
-                npc.take_damage(10, sound_callback=sound_callback, death_callback=death_callback)  # Fireball deals 10 damage
-            self.active = False
-            return True
-        
-        return False
+        for name in self.FIELDS:
+            column = getattr(self, name)
+            column[:len(keep)] = column[keep]
+        self.count = len(keep)
+
+    def clear(self):
+        self.count = 0
+
+def find_spawn_tile(grid):
+    """Walkable tile nearest the grid center by square rings (lowest dx, then dz, on ties), or None"""
+    height, width = grid.shape
+    center_x, center_z = width // 2, height // 2
+    tile_z, tile_x = np.nonzero((grid & TILE_WALL) == 0)
+    if not len(tile_x):
+        return None
+    dx, dz = tile_x - center_x, tile_z - center_z
+    ring = np.maximum(np.abs(dx), np.abs(dz))
+    nearest = np.flatnonzero(ring == ring.min())
+    best = nearest[np.lexsort((dz[nearest], dx[nearest]))[0]]
+    return int(tile_x[best]), int(tile_z[best])
+
+def find_farthest_tile(grid, from_x, from_z):
+    """Walkable tile farthest from (from_x, from_z), the first in row-major order on ties, or None"""
+    tile_z, tile_x = np.nonzero((grid & TILE_WALL) == 0)
+    if not len(tile_x):
+        return None
+    farthest = np.argmax((tile_x - from_x) ** 2 + (tile_z - from_z) ** 2)
+    return int(tile_x[farthest]), int(tile_z[farthest])
+
+def build_level(width=51, height=51, seed=None):
+    """Generate a level plus everything derived from it that needs no GL context, as a picklable payload"""
+    start_time = time.perf_counter()
+    generator = DungeonGenerator(width, height, seed=seed)
+    grid = generator.generate_dungeon()
+    # Player spawn near the center, the key as far from it as possible, the trapdoor anywhere walkable
+    spawn = find_spawn_tile(grid)
+    if spawn is None:
+        spawn = (width // 2, height // 2)
+    tile_z, tile_x = np.nonzero((grid & TILE_WALL) == 0)
+    walkable_tiles = list(zip(tile_x.tolist(), tile_z.tolist()))
+    trapdoor = generator.rng.choice(walkable_tiles) if walkable_tiles else None
+    if trapdoor is not None:
+        grid[trapdoor[1], trapdoor[0]] |= TILE_TRAPDOOR
+    return {
+        "seed": seed,
+        "grid": grid,
+        "rooms": generator.rooms,
+        "torch_positions": generator.torch_positions,
+        "chest_positions": generator.chest_positions,
+        # NPCs travel as spawn records and are re-pooled on load
+        "npcs": [(npc.x, npc.z, npc.center_x, npc.center_z, npc.npc_type) for npc in generator.skeletons],
+        "spawn": spawn,
+        "key": find_farthest_tile(grid, *spawn),
+        "trapdoor": trapdoor,
+        "level_mesh": LevelMesh(grid),
+        "pvs": PotentiallyVisibleSet(grid),
+        "pathfinder": HierarchicalPathfinder(grid) if max(width, height) > HierarchicalPathfinder.MIN_MAP_SIZE else None,
+        "phase_timings": generator.phase_timings,
+        "build_seconds": time.perf_counter() - start_time,
+    }
+
+class LevelPreloader:
+    """Builds the next level in a worker process while the current one is played"""
+    def __init__(self, width=51, height=51):
+        self.width = width
+        self.height = height
+        self.executor = None
+        self.future = None
+        self.seed = None
+        self.stale = []  # Superseded builds that were already running; their payloads are never taken
+
+    def request(self, seed=None):
+        """Start building the level for seed in the background, replacing any earlier request"""
+        # cancel() only stops a build that has not started; a running one has to finish in its worker
+        if self.future is not None and not self.future.cancel():
+            self.stale.append(self.future)
+        self.future = None
+        self.stale = [future for future in self.stale if not future.done()]
+        self.seed = seed
+        try:
+            if self.executor is None:
+                # Spawned rather than forked: this process holds a GL context, audio and texture loader threads.
+                # One worker: a stale build delays the next by at most one build, less than spawning a second worker.
+                self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            self.future = self.executor.submit(build_level, self.width, self.height, seed)
+        except Exception as e:
+            print(f"Could not start level pre-generation: {e}")
+            self.future = None
+
+    def ready(self):
+        return self.future is not None and self.future.done()
+
+    def take(self):
+        """Payload of the requested level; waits for the worker if it is still busy, builds here if it failed"""
+        future, self.future = self.future, None
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                print(f"Level pre-generation failed, building in-process: {e}")
+        return build_level(self.width, self.height, self.seed)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            self.future = None
+            self.stale = []
 
 class DungeonCrawler:
-    def __init__(self):
+    def __init__(self, seed=None, debug_ai=False):
         pygame.init()
         pygame.mixer.init()  # Initialize the mixer for audio
         self.width, self.height = 1200, 800
         pygame.display.set_mode((self.width, self.height), DOUBLEBUF | OPENGL)
         pygame.display.set_caption("3D Dungeon Crawler")
         
-        # Initialize dungeon
-        self.dungeon_generator = DungeonGenerator(51, 51)
-        self.dungeon_grid = self.dungeon_generator.generate_dungeon()
-        # Create collision grid as exact copy
-        self.collision_grid = [row[:] for row in self.dungeon_grid]
-        
-        # Find a valid spawn position for the player
-        spawn_pos = self.find_valid_spawn_position()
-        self.camera_pos = [spawn_pos[0], 1, spawn_pos[1]]
         self.camera_rot = [0, 0]  # [pitch, yaw] - pitch disabled
         self.mouse_sensitivity = 0.2
         self.move_speed = 0.1
         self.renderer = DungeonRenderer()
-        
+        self.gl = self.renderer.gl  # Shared GL state cache for the HUD
+        # Time-sliced NPC decisions, nearest first; debug_ai prints a budget summary every 600 frames
+        self.ai_scheduler = AIScheduler(report_interval=600 if debug_ai else 0)
+        self.grid_version = 0  # Bumped whenever walkability changes, to invalidate cached paths
+        self.npc_hash = SpatialHash()  # NPC rows by tile, for projectile and melee queries
+        self.fireballs = ProjectilePool()  # Fireballs and magicballs in flight
+        
+        # Initialize dungeon: floor 0 is built here, every later one in the background (see descend)
+        self.seed = seed
+        self.depth = 0
+        self.load_level(build_level(51, 51, seed=seed))
+        self.level_preloader = LevelPreloader(51, 51)
+        self.level_preloader.request(self.level_seed(self.depth + 1))
+
         # Load and start background music
         self.load_background_music()
         
@@ -1705,7 +2646,6 @@ class DungeonCrawler:
         
         # Chest interaction variables
         self.nearby_chest = None
-        self.nearby_trapdoor = None
         self.interaction_distance = 2.0  # Distance to trigger interaction
         
         # Hotbar navigation variables
@@ -1738,14 +2678,6 @@ class DungeonCrawler:
         
         # Initialize chest proximity check
         self.check_nearby_chests()
-        
-        # Skeletons
-        self.skeletons = self.dungeon_generator.skeletons
-        self.dropped_items = []
-        self.nearby_item = None  # Track item for interact prompt
-        
-        # Fireballs
-        self.fireballs = []
 
         # Load sound effects
         self.hit_npc_sound = None
@@ -1756,12 +2688,77 @@ class DungeonCrawler:
         self.spell_sound = None
         self.key_sound = None
         self.load_sound_effects()
+    
+    def level_seed(self, depth):
+        """Seed of the floor at depth, so a seeded game replays the same floors; None leaves them random"""
+        return None if self.seed is None else self.seed + depth
 
-        # Spawn the key at the farthest location from the player
-        self.spawn_key_item()
+    def load_level(self, payload):
+        """Swap in a level built by build_level: its grid, NPCs, nav data and GPU geometry"""
+        generator = DungeonGenerator(*payload["grid"].shape[::-1], seed=payload["seed"])
+        generator.grid = payload["grid"]
+        generator.rooms = payload["rooms"]
+        generator.torch_positions = payload["torch_positions"]
+        generator.chest_positions = payload["chest_positions"]
+        generator.phase_timings = payload["phase_timings"]
+        generator.skeletons = [generator.npc_pool.spawn(*npc) for npc in payload["npcs"]]
+        self.dungeon_generator = generator
+        self.dungeon_grid = generator.grid
+        # Collision reads the level's tile flags through a view; no copy to keep in sync
+        self.collision_grid = self.dungeon_grid.view()
+        # Walls as of the last walkability change, so edits that only touch decoration flags are cheap
+        self.wall_mask = (self.dungeon_grid & TILE_WALL) != 0
+        self.blocked = self.wall_mask.tobytes()  # The same walls flattened, as astar takes them
+        # Distance field toward the player shared by all chasing NPCs
+        self.flow_field = FlowField(self.dungeon_grid)
+        # Chunk entrance graph for NPC paths beyond the flow field's reach; None on maps small enough for astar
+        self.pathfinder = payload["pathfinder"]
+        self.grid_version += 1
+        # Cached wall checks for ghost ranged attacks
+        self.line_of_sight = LineOfSight(self.dungeon_grid, self.grid_version)
+        self.ai_scheduler.next_tick.clear()  # The previous floor's NPCs are gone
+        
+        spawn_x, spawn_z = payload["spawn"]
+        self.camera_pos = [spawn_x + 0.5, 1, spawn_z + 0.5]
+        print(f"Player spawned at ({spawn_x + 0.5:.2f}, {spawn_z + 0.5:.2f})")
+        # Bake walls, floors and ceilings into GPU buffers once for this level
+        self.renderer.upload_level_mesh(payload["level_mesh"])
+        self.renderer.pvs = payload["pvs"]
+        self.renderer.create_spatial_grid(self.dungeon_grid, generator.torch_positions, generator.chest_positions)
+        
+        # Skeletons
+        self.skeletons = generator.skeletons
+        self.npc_pool = generator.npc_pool
+        self.dropped_items = []
+        self.nearby_item = None  # Track item for interact prompt
+        self.nearby_trapdoor = None
+        self.fireballs.clear()
         
-        # Spawn the trapdoor at a random location
-        self.spawn_trapdoor()
+        # The key at the farthest location from the player, the trapdoor at a random one
+        self.key_item = None
+        if payload["key"] is not None:
+            self.key_item = DroppedItem('key', payload["key"][0] + 0.5, payload["key"][1] + 0.5)
+            print(f"Key spawned at ({self.key_item.x:.2f}, {self.key_item.z:.2f})")
+        else:
+            print("Failed to spawn key - no walkable tiles found!")
+        self.key_spawned = self.key_item is not None
+        self.trapdoor = None
+        if payload["trapdoor"] is not None:
+            self.trapdoor = Trapdoor(*payload["trapdoor"])
+            print(f"Trapdoor spawned at ({self.trapdoor.center_x:.2f}, {self.trapdoor.center_z:.2f})")
+        else:
+            print("Failed to spawn trapdoor - no walkable tiles found!")
+
+    def descend(self):
+        """Drop through the unlocked trapdoor onto the pre-generated next floor, and start building the one after"""
+        start_time = time.perf_counter()
+        waiting = not self.level_preloader.ready()
+        payload = self.level_preloader.take()
+        self.depth += 1
+        self.load_level(payload)
+        self.level_preloader.request(self.level_seed(self.depth + 1))
+        print(f"Descended to floor {self.depth + 1} in {(time.perf_counter() - start_time) * 1000:.1f} ms"
+              f"{' (waited for the level builder)' if waiting else ''}")
     
     def load_background_music(self):
         """Load and start random background music, and keep looping random tracks when one ends."""
@@ -1790,16 +2787,8 @@ class DungeonCrawler:
         """Load the hotbar texture"""
         try:
             # Load hotbar texture
-            image = Image.open("assets/bar.png")
-            image = image.convert("RGBA")
-            image_data = image.tobytes()
-            self.hotbar_texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, self.hotbar_texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, image.width, image.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, image_data)
+            pixels, _ = self.renderer.image_cache.load("assets/bar.png")
+            self.hotbar_texture_id = self.renderer.upload_texture(pixels, GL_CLAMP_TO_EDGE)
             print("Hotbar texture loaded successfully")
         except Exception as e:
             print(f"Could not load hotbar texture: {e}")
@@ -1837,13 +2826,11 @@ class DungeonCrawler:
     
     def setup_gl(self):
         """Setup OpenGL environment"""
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
-        glEnable(GL_LIGHT0)
-        glEnable(GL_TEXTURE_2D)
-        glEnable(GL_FOG)  # Enable fog
-        # glEnable(GL_CULL_FACE)  # Disable face culling for now
-        # glCullFace(GL_BACK)
+        self.gl.enable(GL_DEPTH_TEST)
+        self.gl.enable(GL_LIGHTING)
+        self.gl.enable(GL_LIGHT0)
+        self.gl.enable(GL_TEXTURE_2D)
+        self.gl.enable(GL_FOG)  # Enable fog
         
         # Set up fog for atmospheric effect
         glFogi(GL_FOG_MODE, GL_LINEAR)
@@ -1857,11 +2844,11 @@ class DungeonCrawler:
         glLightfv(GL_LIGHT0, GL_DIFFUSE, [0.4, 0.4, 0.4, 1])  # Moderate diffuse lighting
         
         # Disable all other lights for now to fix flickering
-        glDisable(GL_LIGHT1)
-        glDisable(GL_LIGHT2)
-        glDisable(GL_LIGHT3)
-        glDisable(GL_LIGHT4)
-        glDisable(GL_LIGHT5)
+        self.gl.disable(GL_LIGHT1)
+        self.gl.disable(GL_LIGHT2)
+        self.gl.disable(GL_LIGHT3)
+        self.gl.disable(GL_LIGHT4)
+        self.gl.disable(GL_LIGHT5)
         
         # Set up perspective
         glMatrixMode(GL_PROJECTION)
@@ -1953,6 +2940,9 @@ class DungeonCrawler:
         self.check_nearby_items()
         # Check for nearby trapdoor
         self.check_nearby_trapdoor()
+        # Drop to the next floor once the player steps onto the unlocked trapdoor
+        if self.trapdoor and self.trapdoor.is_unlocked and (int(self.camera_pos[0]), int(self.camera_pos[2])) == (self.trapdoor.x, self.trapdoor.z):
+            self.descend()
         return True
     
     def check_nearby_trapdoor(self):
@@ -1965,6 +2955,21 @@ class DungeonCrawler:
                 if dist <= self.interaction_distance:
                     self.nearby_trapdoor = self.trapdoor
     
+    def mark_grid_changed(self):
+        """Invalidate everything derived from walkability after the level grid was edited, if walkability changed"""
+        walls = (self.dungeon_grid & TILE_WALL) != 0
+        if np.array_equal(walls, self.wall_mask):
+            return  # Only decoration flags changed; cached paths, the flow field and line of sight still hold
+        changed_z, changed_x = np.nonzero(walls != self.wall_mask)
+        self.wall_mask = walls
+        self.blocked = walls.tobytes()
+        self.grid_version += 1
+        self.flow_field = FlowField(self.dungeon_grid)
+        # Only the chunks around edited tiles get new entrances; the rest of the graph is kept
+        if self.pathfinder is not None:
+            self.pathfinder.update_tiles(list(zip(changed_x.tolist(), changed_z.tolist())))
+        self.line_of_sight.sync(self.dungeon_grid, self.grid_version)
+
     def interact_with_chest(self):
         """Handle chest interaction - drop items and remove the chest from the game"""
         if self.nearby_chest is not None:
@@ -2008,12 +3013,16 @@ class DungeonCrawler:
             if hasattr(self.dungeon_generator, 'chest_positions'):
                 if self.nearby_chest in self.dungeon_generator.chest_positions:
                     self.dungeon_generator.chest_positions.remove(self.nearby_chest)
+                    self.dungeon_grid[self.nearby_chest[1], self.nearby_chest[0]] &= ~TILE_CHEST & 0xFF
                     print(f"Chest opened and removed! Dropped {num_items} items. Remaining chests: {len(self.dungeon_generator.chest_positions)}")
                     
                     # Play chest opening sound
                     if self.chest_sound:
                         self.chest_sound.play()
                     
+                    # Nav data is only rebuilt if the edit changed walkability (clearing TILE_CHEST does not)
+                    self.mark_grid_changed()
+                    
                     # Update the spatial grid to reflect the removed chest
                     if hasattr(self.renderer, 'chest_chunks'):
                         self.renderer.create_spatial_grid(self.dungeon_grid, self.dungeon_generator.torch_positions, self.dungeon_generator.chest_positions)
@@ -2069,25 +3078,25 @@ class DungeonCrawler:
         grid_z = int(z)
         
         # Check bounds
-        if (grid_z < 0 or grid_z >= len(self.collision_grid) or 
-            grid_x < 0 or grid_x >= len(self.collision_grid[0])):
+        height, width = self.collision_grid.shape
+        if grid_z < 0 or grid_z >= height or grid_x < 0 or grid_x >= width:
             return True  # Out of bounds = collision
         
         # Check if position is a wall
-        return self.collision_grid[grid_z][grid_x] == 1
+        return bool(self.collision_grid[grid_z, grid_x] & TILE_WALL)
     
     def render_hotbar(self):
         """Render the hotbar as a 2D overlay at the bottom of the screen"""
         if not self.hotbar_texture_id:
             return
         # Set texture environment to REPLACE for UI
-        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE)
+        self.gl.tex_env_mode(GL_REPLACE)
         # Save current OpenGL state
         glPushMatrix()
         glLoadIdentity()
         # Disable depth testing for 2D overlay
-        glDisable(GL_DEPTH_TEST)
-        glDisable(GL_LIGHTING)
+        self.gl.disable(GL_DEPTH_TEST)
+        self.gl.disable(GL_LIGHTING)
         # Set up orthographic projection for 2D rendering
         glMatrixMode(GL_PROJECTION)
         glPushMatrix()
@@ -2095,15 +3104,15 @@ class DungeonCrawler:
         gluOrtho2D(0, self.width, 0, self.height)
         glMatrixMode(GL_MODELVIEW)
         # Enable blending for transparency
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        self.gl.enable(GL_BLEND)
+        self.gl.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
         # Calculate hotbar position and size
         hotbar_width = 320  # Scaled down from 1024
         hotbar_height = 59   # Scaled down from 189 (maintaining aspect ratio)
         hotbar_x = 20  # Far left position
         hotbar_y = 20  # 20 pixels from bottom
         # Bind hotbar texture
-        glBindTexture(GL_TEXTURE_2D, self.hotbar_texture_id)
+        self.gl.bind_texture(self.hotbar_texture_id)
         # Render hotbar quad
         glBegin(GL_QUADS)
         glTexCoord2f(0, 0); glVertex2f(hotbar_x, hotbar_y)
@@ -2112,7 +3121,7 @@ class DungeonCrawler:
         glTexCoord2f(0, 1); glVertex2f(hotbar_x, hotbar_y + hotbar_height)
         glEnd()
         # Unbind hotbar texture
-        glBindTexture(GL_TEXTURE_2D, 0)
+        self.gl.bind_texture(0)
         # Render inventory items (both rusty_sword and skeleton_sword)
         slot_width = hotbar_width // self.num_slots
         slot_height = hotbar_height * 0.8  # 80% of hotbar height
@@ -2121,72 +3130,72 @@ class DungeonCrawler:
             slot_y = hotbar_y + (hotbar_height - slot_height) / 2  # Center vertically
             item_data = self.inventory[i]
             if item_data["type"] == "rusty_sword" and self.renderer.weapon_texture_id:
-                glBindTexture(GL_TEXTURE_2D, self.renderer.weapon_texture_id)
+                self.gl.bind_texture(self.renderer.weapon_texture_id)
                 glBegin(GL_QUADS)
                 glTexCoord2f(0, 0); glVertex2f(slot_x, slot_y)
                 glTexCoord2f(1, 0); glVertex2f(slot_x + slot_width * 0.8, slot_y)
                 glTexCoord2f(1, 1); glVertex2f(slot_x + slot_width * 0.8, slot_y + slot_height)
                 glTexCoord2f(0, 1); glVertex2f(slot_x, slot_y + slot_height)
                 glEnd()
-                glBindTexture(GL_TEXTURE_2D, 0)
+                self.gl.bind_texture(0)
             elif item_data["type"] == "skeleton_sword" and self.renderer.skeleton_sword_texture_id:
-                glBindTexture(GL_TEXTURE_2D, self.renderer.skeleton_sword_texture_id)
+                self.gl.bind_texture(self.renderer.skeleton_sword_texture_id)
                 glBegin(GL_QUADS)
                 glTexCoord2f(0, 0); glVertex2f(slot_x, slot_y)
                 glTexCoord2f(1, 0); glVertex2f(slot_x + slot_width * 0.8, slot_y)
                 glTexCoord2f(1, 1); glVertex2f(slot_x + slot_width * 0.8, slot_y + slot_height)
                 glTexCoord2f(0, 1); glVertex2f(slot_x, slot_y + slot_height)
                 glEnd()
-                glBindTexture(GL_TEXTURE_2D, 0)
+                self.gl.bind_texture(0)
             elif item_data["type"] == "health_potion" and self.renderer.potion_health_texture_id:
-                glBindTexture(GL_TEXTURE_2D, self.renderer.potion_health_texture_id)
+                self.gl.bind_texture(self.renderer.potion_health_texture_id)
                 glBegin(GL_QUADS)
                 glTexCoord2f(0, 1); glVertex2f(slot_x, slot_y)
                 glTexCoord2f(1, 1); glVertex2f(slot_x + slot_width * 0.8, slot_y)
                 glTexCoord2f(1, 0); glVertex2f(slot_x + slot_width * 0.8, slot_y + slot_height)
                 glTexCoord2f(0, 0); glVertex2f(slot_x, slot_y + slot_height)
                 glEnd()
-                glBindTexture(GL_TEXTURE_2D, 0)
+                self.gl.bind_texture(0)
             elif item_data["type"] == "magic_potion" and self.renderer.potion_magic_texture_id:
-                glBindTexture(GL_TEXTURE_2D, self.renderer.potion_magic_texture_id)
+                self.gl.bind_texture(self.renderer.potion_magic_texture_id)
                 glBegin(GL_QUADS)
                 glTexCoord2f(0, 1); glVertex2f(slot_x, slot_y)
                 glTexCoord2f(1, 1); glVertex2f(slot_x + slot_width * 0.8, slot_y)
                 glTexCoord2f(1, 0); glVertex2f(slot_x + slot_width * 0.8, slot_y + slot_height)
                 glTexCoord2f(0, 0); glVertex2f(slot_x, slot_y + slot_height)
                 glEnd()
-                glBindTexture(GL_TEXTURE_2D, 0)
+                self.gl.bind_texture(0)
             elif item_data["type"] == "fire_scroll" and self.renderer.scroll_fire_texture_id:
-                glBindTexture(GL_TEXTURE_2D, self.renderer.scroll_fire_texture_id)
+                self.gl.bind_texture(self.renderer.scroll_fire_texture_id)
                 glBegin(GL_QUADS)
                 glTexCoord2f(0, 1); glVertex2f(slot_x, slot_y)
                 glTexCoord2f(1, 1); glVertex2f(slot_x + slot_width * 0.8, slot_y)
                 glTexCoord2f(1, 0); glVertex2f(slot_x + slot_width * 0.8, slot_y + slot_height)
                 glTexCoord2f(0, 0); glVertex2f(slot_x, slot_y + slot_height)
                 glEnd()
-                glBindTexture(GL_TEXTURE_2D, 0)
+                self.gl.bind_texture(0)
             elif item_data["type"] == "magic_scroll" and hasattr(self.renderer, 'scroll_magic_texture_id') and self.renderer.scroll_magic_texture_id:
-                glBindTexture(GL_TEXTURE_2D, self.renderer.scroll_magic_texture_id)
+                self.gl.bind_texture(self.renderer.scroll_magic_texture_id)
                 glBegin(GL_QUADS)
                 glTexCoord2f(0, 1); glVertex2f(slot_x, slot_y)
                 glTexCoord2f(1, 1); glVertex2f(slot_x + slot_width * 0.8, slot_y)
                 glTexCoord2f(1, 0); glVertex2f(slot_x + slot_width * 0.8, slot_y + slot_height)
                 glTexCoord2f(0, 0); glVertex2f(slot_x, slot_y + slot_height)
                 glEnd()
-                glBindTexture(GL_TEXTURE_2D, 0)
+                self.gl.bind_texture(0)
             elif item_data["type"] == "key" and hasattr(self.renderer, 'key_texture_id') and self.renderer.key_texture_id:
-                glBindTexture(GL_TEXTURE_2D, self.renderer.key_texture_id)
+                self.gl.bind_texture(self.renderer.key_texture_id)
                 glBegin(GL_QUADS)
                 glTexCoord2f(0, 1); glVertex2f(slot_x, slot_y)
                 glTexCoord2f(1, 1); glVertex2f(slot_x + slot_width * 0.8, slot_y)
                 glTexCoord2f(1, 0); glVertex2f(slot_x + slot_width * 0.8, slot_y + slot_height)
                 glTexCoord2f(0, 0); glVertex2f(slot_x, slot_y + slot_height)
                 glEnd()
-                glBindTexture(GL_TEXTURE_2D, 0)
+                self.gl.bind_texture(0)
         # Restore OpenGL state
-        glDisable(GL_BLEND)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
+        self.gl.disable(GL_BLEND)
+        self.gl.enable(GL_DEPTH_TEST)
+        self.gl.enable(GL_LIGHTING)
         # Restore projection matrix
         glMatrixMode(GL_PROJECTION)
         glPopMatrix()
@@ -2194,7 +3203,7 @@ class DungeonCrawler:
         glPopMatrix()
     
     def render_equipped_weapon(self):
-        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE)
+        self.gl.tex_env_mode(GL_REPLACE)
         if self.inventory[self.selected_slot]["type"] == "rusty_sword":
             if not self.renderer.held_weapon_texture_id:
                 return
@@ -2255,16 +3264,16 @@ class DungeonCrawler:
                 swing_rotation = 0
         glPushMatrix()
         glLoadIdentity()
-        glDisable(GL_DEPTH_TEST)
-        glDisable(GL_LIGHTING)
+        self.gl.disable(GL_DEPTH_TEST)
+        self.gl.disable(GL_LIGHTING)
         glMatrixMode(GL_PROJECTION)
         glPushMatrix()
         glLoadIdentity()
         gluOrtho2D(0, self.width, 0, self.height)
         glMatrixMode(GL_MODELVIEW)
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        glBindTexture(GL_TEXTURE_2D, held_texture_id)
+        self.gl.enable(GL_BLEND)
+        self.gl.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        self.gl.bind_texture(held_texture_id)
         weapon_x = self.width - held_width - 20
         # Move fire spell to the left
         if self.inventory[self.selected_slot]["type"] == "fire_scroll":
@@ -2296,10 +3305,10 @@ class DungeonCrawler:
             glTexCoord2f(0, 0); glVertex2f(weapon_x, weapon_y + held_height)
         glEnd()
         glPopMatrix()
-        glBindTexture(GL_TEXTURE_2D, 0)
-        glDisable(GL_BLEND)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
+        self.gl.bind_texture(0)
+        self.gl.disable(GL_BLEND)
+        self.gl.enable(GL_DEPTH_TEST)
+        self.gl.enable(GL_LIGHTING)
         glMatrixMode(GL_PROJECTION)
         glPopMatrix()
         glMatrixMode(GL_MODELVIEW)
@@ -2310,13 +3319,13 @@ class DungeonCrawler:
         if not self.renderer.health_bar_texture_id:
             return
         # Set texture environment to REPLACE for UI
-        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE)
+        self.gl.tex_env_mode(GL_REPLACE)
         # Save current OpenGL state
         glPushMatrix()
         glLoadIdentity()
         # Disable depth testing for 2D overlay
-        glDisable(GL_DEPTH_TEST)
-        glDisable(GL_LIGHTING)
+        self.gl.disable(GL_DEPTH_TEST)
+        self.gl.disable(GL_LIGHTING)
         # Set up orthographic projection for 2D rendering
         glMatrixMode(GL_PROJECTION)
         glPushMatrix()
@@ -2324,10 +3333,10 @@ class DungeonCrawler:
         gluOrtho2D(0, self.width, 0, self.height)
         glMatrixMode(GL_MODELVIEW)
         # Enable blending for transparency
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        self.gl.enable(GL_BLEND)
+        self.gl.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
         # Bind health bar texture
-        glBindTexture(GL_TEXTURE_2D, self.renderer.health_bar_texture_id)
+        self.gl.bind_texture(self.renderer.health_bar_texture_id)
         # Calculate health bar position and size (top left)
         health_bar_width = 256  # Scaled down from 1024 (1/4 size)
         health_bar_height = 79  # Scaled down from 318 (1/4 size, maintaining aspect ratio)
@@ -2341,11 +3350,11 @@ class DungeonCrawler:
         glTexCoord2f(0, 1); glVertex2f(health_bar_x, health_bar_y + health_bar_height)
         glEnd()
         # Unbind health bar texture
-        glBindTexture(GL_TEXTURE_2D, 0)
+        self.gl.bind_texture(0)
         # Render health fill overlay only if health > 0
         if self.renderer.health_fill_texture_id and self.current_health > 0:
             # Bind health fill texture
-            glBindTexture(GL_TEXTURE_2D, self.renderer.health_fill_texture_id)
+            self.gl.bind_texture(self.renderer.health_fill_texture_id)
             # Calculate health fill size (smaller than meter, maintaining aspect ratio)
             health_fill_scale = 0.8  # Make health fill 80% of meter size
             health_fill_width = health_bar_width * health_fill_scale
@@ -2366,11 +3375,11 @@ class DungeonCrawler:
             glTexCoord2f(0, 1); glVertex2f(health_fill_x, health_fill_y + health_fill_height)
             glEnd()
             # Unbind health fill texture
-            glBindTexture(GL_TEXTURE_2D, 0)
+            self.gl.bind_texture(0)
         # Restore OpenGL state
-        glDisable(GL_BLEND)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
+        self.gl.disable(GL_BLEND)
+        self.gl.enable(GL_DEPTH_TEST)
+        self.gl.enable(GL_LIGHTING)
         # Restore projection matrix
         glMatrixMode(GL_PROJECTION)
         glPopMatrix()
@@ -2382,13 +3391,13 @@ class DungeonCrawler:
         if not self.renderer.mana_bar_texture_id:
             return
         # Set texture environment to REPLACE for UI
-        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE)
+        self.gl.tex_env_mode(GL_REPLACE)
         # Save current OpenGL state
         glPushMatrix()
         glLoadIdentity()
         # Disable depth testing for 2D overlay
-        glDisable(GL_DEPTH_TEST)
-        glDisable(GL_LIGHTING)
+        self.gl.disable(GL_DEPTH_TEST)
+        self.gl.disable(GL_LIGHTING)
         # Set up orthographic projection for 2D rendering
         glMatrixMode(GL_PROJECTION)
         glPushMatrix()
@@ -2396,10 +3405,10 @@ class DungeonCrawler:
         gluOrtho2D(0, self.width, 0, self.height)
         glMatrixMode(GL_MODELVIEW)
         # Enable blending for transparency
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        self.gl.enable(GL_BLEND)
+        self.gl.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
         # Bind mana bar texture
-        glBindTexture(GL_TEXTURE_2D, self.renderer.mana_bar_texture_id)
+        self.gl.bind_texture(self.renderer.mana_bar_texture_id)
         # Calculate mana bar position and size (below health bar)
         mana_bar_width = 256  # Same size as health bar
         mana_bar_height = 79  # Same size as health bar
@@ -2413,11 +3422,11 @@ class DungeonCrawler:
         glTexCoord2f(0, 1); glVertex2f(mana_bar_x, mana_bar_y + mana_bar_height)
         glEnd()
         # Unbind mana bar texture
-        glBindTexture(GL_TEXTURE_2D, 0)
+        self.gl.bind_texture(0)
         # Render mana fill overlay only if mana > 0
         if self.renderer.mana_fill_texture_id and self.current_mana > 0:
             # Bind mana fill texture
-            glBindTexture(GL_TEXTURE_2D, self.renderer.mana_fill_texture_id)
+            self.gl.bind_texture(self.renderer.mana_fill_texture_id)
             # Calculate mana fill size (smaller than meter, maintaining aspect ratio)
             mana_fill_scale = 0.8  # Make mana fill 80% of meter size
             mana_fill_width = mana_bar_width * mana_fill_scale
@@ -2438,11 +3447,11 @@ class DungeonCrawler:
             glTexCoord2f(0, 1); glVertex2f(mana_fill_x, mana_fill_y + mana_fill_height)
             glEnd()
             # Unbind mana fill texture
-            glBindTexture(GL_TEXTURE_2D, 0)
+            self.gl.bind_texture(0)
         # Restore OpenGL state
-        glDisable(GL_BLEND)
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_LIGHTING)
+        self.gl.disable(GL_BLEND)
+        self.gl.enable(GL_DEPTH_TEST)
+        self.gl.enable(GL_LIGHTING)
         # Restore projection matrix
         glMatrixMode(GL_PROJECTION)
         glPopMatrix()
@@ -2451,6 +3460,7 @@ class DungeonCrawler:
     
     def render(self):
         """Render the scene"""
+        self.gl.begin_frame()
         glClear(int(GL_COLOR_BUFFER_BIT) | int(GL_DEPTH_BUFFER_BIT))
         glLoadIdentity()
         
@@ -2481,9 +3491,9 @@ class DungeonCrawler:
             closest_torches = torch_distances[:3]
             
             # Enable lights for closest torches
-            glEnable(GL_LIGHT1)
-            glEnable(GL_LIGHT2)
-            glEnable(GL_LIGHT3)
+            self.gl.enable(GL_LIGHT1)
+            self.gl.enable(GL_LIGHT2)
+            self.gl.enable(GL_LIGHT3)
             
             # Set up torch lights with stable lighting
             torch_lights = [
@@ -2512,15 +3522,15 @@ class DungeonCrawler:
                     glLightfv(light_id, GL_SPOT_DIRECTION, spot_direction)
             
             # Disable unused lights
-            glDisable(GL_LIGHT4)
-            glDisable(GL_LIGHT5)
+            self.gl.disable(GL_LIGHT4)
+            self.gl.disable(GL_LIGHT5)
         else:
             # Disable torch lights if no torches
-            glDisable(GL_LIGHT1)
-            glDisable(GL_LIGHT2)
-            glDisable(GL_LIGHT3)
-            glDisable(GL_LIGHT4)
-            glDisable(GL_LIGHT5)
+            self.gl.disable(GL_LIGHT1)
+            self.gl.disable(GL_LIGHT2)
+            self.gl.disable(GL_LIGHT3)
+            self.gl.disable(GL_LIGHT4)
+            self.gl.disable(GL_LIGHT5)
         
         # Render dungeon
         self.renderer.render_dungeon(self.dungeon_grid, self.camera_pos, self.dungeon_generator.torch_positions, self.dungeon_generator.chest_positions, self.camera_rot)
@@ -2536,7 +3546,7 @@ class DungeonCrawler:
         
         # Always render the key if it exists and hasn't been picked up
         if hasattr(self, 'key_item') and self.key_item and not self.key_item.collected:
-            self.renderer.render_dropped_item(self.key_item, self.camera_pos)
+            self.renderer.render_dropped_items([self.key_item], self.camera_pos)
         
         # Always render the trapdoor if it exists
         if hasattr(self, 'trapdoor') and self.trapdoor:
@@ -2573,122 +3583,147 @@ class DungeonCrawler:
             self.render()
             clock.tick(60)
         
+        self.level_preloader.shutdown()
         pygame.quit()
 
+    def think(self, skel, player_tile, ranged, chasing):
+        """One NPC's scheduled decision work: the ghost ranged attack and the path toward the player"""
+        if ranged:
+            if skel.perform_ranged_attack(self.camera_pos, self.fireballs, 
+                sound_callback=lambda: self.spell_sound.play() if self.spell_sound else None, line_of_sight=self.line_of_sight):
+                print("Ghost launched a magicball!")
+        if chasing:
+            skel.update_path(self.dungeon_grid, player_tile, self.flow_field, self.grid_version, self.pathfinder, self.blocked)
+
     def update_skeletons(self):
-        alive = []
-        player_tile = (int(self.camera_pos[0]), int(self.camera_pos[2]))
-        for skel in self.skeletons:
-            if skel.is_alive:
-                if skel.flash_timer > 0:
-                    skel.flash_timer -= 1
-                
-                # Update ranged attack cooldown for ghosts
-                if skel.ranged_attack_cooldown > 0:
-                    skel.ranged_attack_cooldown -= 1
-                
-                dx = self.camera_pos[0] - skel.center_x
-                dz = self.camera_pos[2] - skel.center_z
-                dist = math.sqrt(dx*dx + dz*dz)
-                activation_radius = 7.0
-                min_distance = 1.7
-                attacked = False
-                
-                # Handle melee attacks for all NPCs
-                if skel.attack_cooldown > 0:
-                    skel.attack_cooldown -= 1
-                else:
-                    if dist < 2.0:
-                        # Set damage based on type
-                        if skel.npc_type == "ghoul":
-                            damage = 5
-                        elif skel.npc_type == "skeleton":
-                            damage = 7
-                        elif skel.npc_type == "ghost":
-                            damage = 10
-                        else:
-                            damage = 5
-                        self.current_health = max(0, self.current_health - damage)
-                        # Play hit sound when player takes damage
-                        if self.hit_player_sound:
-                            self.hit_player_sound.play()
-                        skel.attack_cooldown = 40
-                        skel.frozen_timer = 10
-                        attacked = True
-                
-                # Handle ranged attacks for ghosts
-                if skel.npc_type == "ghost" and not attacked:
-                    if skel.perform_ranged_attack(self.camera_pos, self.fireballs, self.check_collision, 
-                        sound_callback=lambda: self.spell_sound.play() if self.spell_sound else None):
-                        print("Ghost launched a magicball!")
-                
-                if skel.frozen_timer > 0:
-                    skel.frozen_timer -= 1
-                
-                # Only move if not attacking, not frozen, not too close, and within activation radius
-                if not attacked and skel.frozen_timer == 0 and dist < activation_radius and dist > min_distance:
-                    skel.update_path(self.dungeon_grid, player_tile)
-                    skel.move_along_path(self.check_collision, speed=0.05)  # All NPCs move at same speed
-                
-                alive.append(skel)
-            else:
+        pool = self.npc_pool
+        count = pool.count
+        alive = pool.alive[:count]
+        
+        # Drop loot for NPCs that died since the last update and take them off the list
+        dead = np.flatnonzero(~alive & pool.listed[:count])
+        if len(dead):
+            for row in dead:
+                skel = pool.views[row]
                 # Only skeletons can drop skeleton sword
                 if skel.npc_type == "skeleton" and random.random() < 0.4:
                     self.dropped_items.append(DroppedItem('skeleton_sword', skel.center_x, skel.center_z))
                 # Only ghosts can drop magic scroll
                 if skel.npc_type == "ghost" and random.random() < 0.15:
                     self.dropped_items.append(DroppedItem('magic_scroll', skel.center_x, skel.center_z))
+                self.ai_scheduler.forget(skel)
+            pool.listed[dead] = False
+            self.skeletons = [skel for skel in self.skeletons if skel.is_alive]
         
-        # Update fireballs and check for collisions
-        active_fireballs = []
-        for fireball in self.fireballs:
-            fireball.update()
-            
-            # Check collision with skeletons (player projectiles hitting skeletons)
-            # Only check if this is a player projectile (not a ghost projectile)
-            if not hasattr(fireball, 'is_magic') or not fireball.is_magic:
-                for skeleton in self.skeletons:
-                    if fireball.check_collision_with_npc(skeleton, 
-                        sound_callback=lambda: self.hit_npc_sound.play() if self.hit_npc_sound else None,
-                        death_callback=lambda: self.death_npc_sound.play() if self.death_npc_sound else None):
-                        print(f"Player fireball hit {skeleton.npc_type}! Health: {skeleton.health}")
-                        break
-            
-            # Check collision with player (ghost projectiles hitting player)
-            if hasattr(fireball, 'is_magic') and fireball.is_magic:
-                # This is a ghost projectile, check if it hits the player
-                dx = fireball.x - self.camera_pos[0]
-                dz = fireball.z - self.camera_pos[2]
-                distance = math.sqrt(dx*dx + dz*dz)
-                collision_radius = 0.3
-                
-                if distance <= collision_radius:
-                    # Ghost projectile hit player!
-                    damage = 15  # Ghost magicball deals 15 damage
-                    self.current_health = max(0, self.current_health - damage)
-                    print(f"Ghost magicball hit player! Damage: {damage}, Health: {self.current_health}")
-                    
-                    # Play hit sound
-                    if self.hit_player_sound:
-                        self.hit_player_sound.play()
-                    
-                    # Destroy the projectile
-                    fireball.active = False
+        player_tile = (int(self.camera_pos[0]), int(self.camera_pos[2]))
+        self.flow_field.update(player_tile)
+        
+        # Timers count down for every living NPC at once
+        for timer in (pool.flash_timer, pool.ranged_attack_cooldown):
+            timer[:count] -= alive & (timer[:count] > 0)
+        dx = self.camera_pos[0] - pool.center_x[:count]
+        dz = self.camera_pos[2] - pool.center_z[:count]
+        dist = np.sqrt(dx*dx + dz*dz)
+        activation_radius = 7.0
+        min_distance = 1.7
+        
+        # Melee attacks: NPCs off cooldown and within reach hit the player
+        cooldown = pool.attack_cooldown[:count]
+        attacked = alive & (cooldown <= 0) & (dist < 2.0)
+        cooldown -= alive & (cooldown > 0)
+        hits = np.flatnonzero(attacked)
+        if len(hits):
+            damage = int(pool.MELEE_DAMAGE[pool.type_id[hits]].sum())
+            self.current_health = max(0, self.current_health - damage)
+            # Play hit sound when player takes damage
+            if self.hit_player_sound:
+                for _ in hits:
+                    self.hit_player_sound.play()
+            cooldown[hits] = 40
+            pool.frozen_timer[hits] = 10
+        frozen = pool.frozen_timer[:count]
+        frozen -= alive & (frozen > 0)
+        
+        # Ranged attacks for ghosts and path updates are scheduled; movement along the current path is not
+        ranged = alive & ~attacked & (pool.type_id[:count] == NPCPool.TYPES.index("ghost"))
+        chasing = alive & ~attacked & (frozen == 0) & (dist < activation_radius) & (dist > min_distance)
+        # Trace line of sight for every ghost that could fire this frame in one batch; their attacks then hit the cache
+        ready = ranged & (pool.ranged_attack_cooldown[:count] <= 0) & (dist >= 2.0) & (dist <= 7.0)
+        if ready.any():
+            rows = np.flatnonzero(ready)
+            starts = list(zip(pool.center_x[rows].astype(np.int64).tolist(), pool.center_z[rows].astype(np.int64).tolist()))
+            self.line_of_sight.clear_batch(starts, player_tile)
+        
+        thinking = []  # (distance, npc, think) work handed to the AI scheduler
+        for row in np.flatnonzero(ranged | chasing):
+            skel = pool.views[row]
+            thinking.append((float(dist[row]), skel, lambda skel=skel, ranged=bool(ranged[row]), chasing=bool(chasing[row]):
+                             self.think(skel, player_tile, ranged, chasing)))
+        self.ai_scheduler.run(thinking)
+        pool.move_along_paths(np.flatnonzero(chasing), self.collision_grid, speed=0.05)  # All NPCs move at same speed
+        
+        # Update fireballs and check for collisions along the whole path each travelled this tick
+        projectiles = self.fireballs
+        start_x, start_z, swept = projectiles.update(self.collision_grid)
+        count = projectiles.count
+        end_x, end_z = projectiles.x[:count], projectiles.z[:count]
+        collision_radius = 0.3
+        
+        # Ghost projectiles hitting the player
+        player_t = segment_circle_hit(start_x, start_z, end_x, end_z, self.camera_pos[0], self.camera_pos[2], collision_radius)
+        player_hits = swept & projectiles.is_magic[:count] & (player_t <= 1.0)
+        
+        # Player projectiles hitting NPCs: the first NPC along each path, among those hashed near it
+        shots = np.flatnonzero(swept & ~projectiles.is_magic[:count])
+        pool = self.npc_pool
+        if len(shots):
+            self.index_npcs()
+            for shot in shots:
+                mid_x = (start_x[shot] + end_x[shot]) / 2
+                mid_z = (start_z[shot] + end_z[shot]) / 2
+                reach = math.hypot(end_x[shot] - start_x[shot], end_z[shot] - start_z[shot]) / 2 + collision_radius
+                rows = self.npc_hash.query(mid_x, mid_z, reach)
+                rows = rows[pool.alive[rows]]
+                if not len(rows):
+                    continue
+                t = segment_circle_hit(start_x[shot], start_z[shot], end_x[shot], end_z[shot],
+                                       pool.center_x[rows], pool.center_z[rows], collision_radius)
+                first = np.argmin(t)
+                if not np.isfinite(t[first]):
                     continue
+                skeleton = pool.views[rows[first]]
+                skeleton.take_damage(10, sound_callback=lambda: self.hit_npc_sound.play() if self.hit_npc_sound else None,
+                    death_callback=lambda: self.death_npc_sound.play() if self.death_npc_sound else None)  # Fireball deals 10 damage
+                projectiles.active[shot] = False
+                print(f"Player fireball hit {skeleton.npc_type}! Health: {skeleton.health}")
+        
+        for row in np.flatnonzero(player_hits):
+            # Ghost projectile hit player!
+            damage = 15  # Ghost magicball deals 15 damage
+            self.current_health = max(0, self.current_health - damage)
+            print(f"Ghost magicball hit player! Damage: {damage}, Health: {self.current_health}")
             
-            # Keep only active fireballs
-            if fireball.active:
-                active_fireballs.append(fireball)
+            # Play hit sound
+            if self.hit_player_sound:
+                self.hit_player_sound.play()
+            
+            # Destroy the projectile
+            projectiles.active[row] = False
         
-        self.fireballs = active_fireballs
+        # Keep only active projectiles, packed at the front of the pool
+        projectiles.compact()
         
         # Remove dropped items after 120 seconds, but never remove the key
         now = time.time()
         self.dropped_items = [item for item in self.dropped_items if (item.item_type == 'key') or (not item.collected and (now - item.spawn_time) < 120)]
-        self.skeletons = alive
 
 
 
+    def index_npcs(self):
+        """Rebuild the spatial hash over the listed NPCs at their current positions"""
+        pool = self.npc_pool
+        self.npc_hash.rebuild(pool.center_x, pool.center_z, np.flatnonzero(pool.listed[:pool.count]))
+
     def try_attack_skeletons(self):
         # Only attack if a sword is equipped and not already swinging
         if self.inventory[self.selected_slot]["type"] not in ("rusty_sword", "skeleton_sword"):
@@ -2706,7 +3741,10 @@ class DungeonCrawler:
             damage = 10
         else:
             damage = 0
-        for skel in self.skeletons:
+        # Only NPCs hashed near the player can be in reach
+        self.index_npcs()
+        for row in self.npc_hash.query(self.camera_pos[0], self.camera_pos[2], attack_range):
+            skel = self.npc_pool.views[row]
             if not skel.is_alive:
                 continue
             # Vector from player to skeleton
@@ -2749,8 +3787,7 @@ class DungeonCrawler:
         spawn_x = self.camera_pos[0] + direction_x * spawn_distance
         spawn_z = self.camera_pos[2] + direction_z * spawn_distance
         # Create fireball projectile (2D, ignore y for now)
-        fireball = Fireball(spawn_x, spawn_z, direction_x, direction_z, max_distance=7.0, is_magic=False, collision_checker=self.check_collision)
-        self.fireballs.append(fireball)
+        self.fireballs.spawn(spawn_x, spawn_z, direction_x, direction_z, max_distance=7.0, is_magic=False)
         print(f"Fireball spawned at ({spawn_x:.2f}, {spawn_z:.2f})")
 
     def check_nearby_items(self):
@@ -2929,79 +3966,9 @@ class DungeonCrawler:
         direction_z = -math.cos(yaw) * math.cos(pitch)
         spawn_x = self.camera_pos[0] + direction_x * spawn_distance
         spawn_z = self.camera_pos[2] + direction_z * spawn_distance
-        magicball = Fireball(spawn_x, spawn_z, direction_x, direction_z, max_distance=7.0, is_magic=True, collision_checker=self.check_collision)
-        magicball.active = True
-        self.fireballs.append(magicball)
+        self.fireballs.spawn(spawn_x, spawn_z, direction_x, direction_z, max_distance=7.0, is_magic=True)
         print(f"Magicball spawned at ({spawn_x:.2f}, {spawn_z:.2f})")
 
-    def find_valid_spawn_position(self):
-        """Find a valid spawn position for the player (walkable tile near center)"""
-        center_x, center_z = len(self.dungeon_grid[0]) // 2, len(self.dungeon_grid) // 2
-        
-        # Start from center and search in expanding circles
-        for radius in range(0, max(len(self.dungeon_grid), len(self.dungeon_grid[0]))):
-            for dx in range(-radius, radius + 1):
-                for dz in range(-radius, radius + 1):
-                    # Only check positions at the current radius
-                    if abs(dx) == radius or abs(dz) == radius:
-                        x, z = center_x + dx, center_z + dz
-                        # Check bounds
-                        if 0 <= x < len(self.dungeon_grid[0]) and 0 <= z < len(self.dungeon_grid):
-                            if self.dungeon_grid[z][x] == 0:  # Walkable
-                                spawn_x = x + 0.5
-                                spawn_z = z + 0.5
-                                print(f"Player spawned at ({spawn_x:.2f}, {spawn_z:.2f})")
-                                return (spawn_x, spawn_z)
-        
-        # Fallback: find any walkable tile
-        for z in range(len(self.dungeon_grid)):
-            for x in range(len(self.dungeon_grid[0])):
-                if self.dungeon_grid[z][x] == 0:  # Walkable
-                    spawn_x = x + 0.5
-                    spawn_z = z + 0.5
-                    print(f"Player spawned at fallback position ({spawn_x:.2f}, {spawn_z:.2f})")
-                    return (spawn_x, spawn_z)
-        
-        # Last resort: spawn at center
-        print("Warning: No walkable tiles found, spawning at center")
-        return (center_x + 0.5, center_z + 0.5)
-
-    def spawn_key_item(self):
-        # Find the farthest walkable tile from the player
-        max_dist = -1
-        farthest_pos = None
-        player_x, player_z = int(self.camera_pos[0]), int(self.camera_pos[2])
-        for z in range(len(self.dungeon_grid)):
-            for x in range(len(self.dungeon_grid[0])):
-                if self.dungeon_grid[z][x] == 0:  # Walkable
-                    dist = math.sqrt((x - player_x) ** 2 + (z - player_z) ** 2)
-                    if dist > max_dist:
-                        max_dist = dist
-                        farthest_pos = (x + 0.5, z + 0.5)
-        if farthest_pos:
-            self.key_item = DroppedItem('key', farthest_pos[0], farthest_pos[1])
-            self.key_spawned = True
-            print(f"Key spawned at ({farthest_pos[0]:.2f}, {farthest_pos[1]:.2f})")
-        else:
-            print("Failed to spawn key - no walkable tiles found!")
-
-    def spawn_trapdoor(self):
-        """Spawn a trapdoor at a random walkable location"""
-        # Find a random walkable tile
-        walkable_tiles = []
-        for z in range(len(self.dungeon_grid)):
-            for x in range(len(self.dungeon_grid[0])):
-                if self.dungeon_grid[z][x] == 0:  # Walkable
-                    walkable_tiles.append((x, z))
-        
-        if walkable_tiles:
-            # Choose a random walkable tile
-            trapdoor_x, trapdoor_z = random.choice(walkable_tiles)
-            self.trapdoor = Trapdoor(trapdoor_x, trapdoor_z)
-            print(f"Trapdoor spawned at ({trapdoor_x + 0.5:.2f}, {trapdoor_z + 0.5:.2f})")
-        else:
-            print("Failed to spawn trapdoor - no walkable tiles found!")
-
 if __name__ == "__main__":
     game = DungeonCrawler()
     game.run()